@@ -2,36 +2,33 @@ from flask import Flask, render_template, jsonify, request, redirect, url_for, f
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 import random
-import requests
 from datetime import datetime, timedelta
 import json
 import os
 import time
 import asyncio
-import openai
-import anthropic
-import google.generativeai as genai
 from cryptography.fernet import Fernet
 import base64
+import numpy as np
+from draw_store import DrawIndex
+from shared_state import CachedState, create_state_backend
+from draw_stats import DrawStats
+from simulator import STRATEGIES, prefix_counts, simulate
+from wheeling import build_wheel
+from combo_index import DrawMaskIndex, WinningComboIndex, combo_ranks, combos_from_ranks, pairwise_overlaps, random_bonus_numbers, sample_ranks
+from async_runner import AsyncLoopThread
+from provider_clients import ProviderClientCache
+from provider_registry import ProviderRegistry
+from provider_gateway import ProviderGateway, ProviderConfigError
+from combo_stream import collect_stream_combinations
+from job_queue import JobQueue, QueueFullError
+from candidate_pool import RoundCandidatePool, SingleFlight
+from ticket_grading import RANK_TEXTS, TicketGrader, draw_round_for, grade_ticket, grade_tickets, select_rounds
+from draw_sync import create_lotto_session, fetch_draw, sync_draw_history, run_sync_loop, start_background_sync
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_here'  # 실제 서비스에서는 환경변수로 관리하세요
 
-# AI API 설정 (실제 서비스에서는 환경변수로 관리)
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', 'your-openai-api-key-here')
-ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY', 'your-anthropic-api-key-here')
-GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY', 'your-google-api-key-here')
-
-# AI 클라이언트 초기화
-try:
-    anthropic_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-    genai.configure(api_key=GOOGLE_API_KEY)
-    gemini_model = genai.GenerativeModel('gemini-1.5-flash')
-    print("AI API 클라이언트 초기화 완료")
-except Exception as e:
-    print(f"AI API 초기화 실패: {e}")
-    print("AI API 키를 설정하지 않으면 기존 분석 방식을 사용합니다.")
-
 
 # Flask-Login 설정
 login_manager = LoginManager()
@@ -41,104 +38,115 @@ login_manager.login_view = 'login'
 
 
 # 사용자 및 로또 선택 정보 파일 경로
-USER_DATA_FILE = './data/user_data.json'
-MY_LOTTO_FILE = './data/my_lotto.json'
-API_KEYS_FILE = './data/api_keys.json'
-LOTTO_CACHE_FILE = './data/lotto_cache.json'
+DATA_DB_FILE = './data/lotto.db'
+USER_DATA_FILE = './data/user_data.json'  # 이전 형식 (DB 생성 시 가져오기용)
+MY_LOTTO_FILE = './data/my_lotto.json'  # 이전 형식 (DB 생성 시 가져오기용)
+API_KEYS_FILE = './data/api_keys.json'  # 이전 형식 (DB 생성 시 가져오기용)
+LOTTO_CACHE_FILE = './data/lotto_cache.json'  # 이전 형식 (아카이브 생성 시 가져오기용)
+LOTTO_LEGACY_PICKLE_FILE = './data/lotto_data.pkl'  # 이전 형식 (아카이브 생성 시 가져오기용)
+LOTTO_ARCHIVE_FILE = './data/lotto_draws.bin'
+LOTTO_CACHE_JOURNAL_FILE = './data/lotto_cache.journal'
+WINNING_BITMAP_FILE = './data/winning_bitmap.bin'
 
 # 암호화 키 생성 (실제 서비스에서는 환경변수로 관리)
 ENCRYPTION_KEY = base64.urlsafe_b64encode(b'your-32-byte-encryption-key-here')[:32]
 FERNET = Fernet(base64.urlsafe_b64encode(ENCRYPTION_KEY))
 
+# 사용자/저장 번호/API 키 공유 상태
+# 여러 워커 프로세스/노드가 같은 저장소를 쓰고, 각 프로세스는 버전 카운터로 무효화되는 캐시에서 읽음
+# STATE_BACKEND=sqlite (기본, data/lotto.db, 처음 실행 시 기존 JSON 파일 가져오기) 또는 redis (STATE_REDIS_URL)
+STATE = CachedState(create_state_backend(
+    os.getenv('STATE_BACKEND', 'sqlite'), DATA_DB_FILE,
+    redis_url=os.getenv('STATE_REDIS_URL'), redis_prefix=os.getenv('STATE_REDIS_PREFIX', 'lotto:'),
+    legacy_users_file=USER_DATA_FILE, legacy_my_lotto_file=MY_LOTTO_FILE, legacy_api_keys_file=API_KEYS_FILE))
+
 # 사용자 정보 로드/저장 함수
 def load_users():
-    if os.path.exists(USER_DATA_FILE):
-        try:
-            with open(USER_DATA_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            pass
-    # 기본 admin 계정
-    return {'admin': {'password': 'admin1234', 'is_admin': True}}
+    """{사용자: 정보} (캐시, 읽기 전용)"""
+    return STATE.users()
+
+def get_user(username):
+    """사용자 정보 사본 (없으면 None)"""
+    return STATE.get_user(username)
 
-def save_users(users):
-    with open(USER_DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(users, f, ensure_ascii=False, indent=2)
+def save_user(username, user):
+    """사용자 한 명 저장 (추가/비밀번호 변경)"""
+    STATE.save_user(username, user)
+
+def delete_user(username):
+    STATE.delete_user(username)
 
 # 내가 선택한 로또 번호 저장/불러오기
-def load_my_lotto():
-    if os.path.exists(MY_LOTTO_FILE):
-        try:
-            with open(MY_LOTTO_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return {}
+def load_my_lotto(user_id):
+    """사용자의 저장 번호 목록 (저장 순서, 캐시, 읽기 전용)"""
+    return STATE.tickets(user_id)
 
-def save_my_lotto(my_lotto):
-    with open(MY_LOTTO_FILE, 'w', encoding='utf-8') as f:
-        json.dump(my_lotto, f, ensure_ascii=False, indent=2)
+def add_my_lotto(user_id, item):
+    """번호 한 건 저장 (item 에 행 ID 'id' 가 채워짐)"""
+    return STATE.add_ticket(user_id, item)
+
+def delete_my_lotto(user_id, ticket_id):
+    """번호 한 건 삭제 (다른 사용자의 번호면 False)"""
+    return STATE.delete_ticket(user_id, ticket_id)
 
 # 로또 캐시 관리 함수들
+# 회차 인덱스는 프로세스당 한 번만 로드하고, 새 회차는 저널에 추가로 기록
+# 확정된 회차는 만료 없이 보관하고, 조회 실패 회차만 10분 후 재조회
+FAILED_ROUND_RETRY_SECONDS = 600
+DRAW_INDEX = DrawIndex(LOTTO_ARCHIVE_FILE, LOTTO_CACHE_JOURNAL_FILE,
+                       legacy_files=(LOTTO_CACHE_FILE, LOTTO_LEGACY_PICKLE_FILE),
+                       retry_seconds=FAILED_ROUND_RETRY_SECONDS)
+
+# 동행복권 API 설정 (로컬 대체 서버로 테스트할 때 DHLOTTERY_API_URL 변경)
+DHLOTTERY_API_URL = os.getenv('DHLOTTERY_API_URL', 'https://www.dhlottery.co.kr/common.do')
+LOTTO_SYNC_WORKERS = int(os.getenv('LOTTO_SYNC_WORKERS', '8'))
+LOTTO_SYNC_INTERVAL_SECONDS = float(os.getenv('LOTTO_SYNC_INTERVAL_SECONDS', '3600'))
+LOTTO_HTTP_SESSION = create_lotto_session(pool_size=LOTTO_SYNC_WORKERS)
+
+# 역대 1등 조합 비트맵 색인 (새 회차가 추가되면 자동 갱신)
+WINNING_INDEX = WinningComboIndex(DRAW_INDEX, WINNING_BITMAP_FILE)
+DRAW_INDEX.subscribe(WINNING_INDEX.on_new_draw)
+DRAW_INDEX.subscribe_reset(WINNING_INDEX.reset)
+
+# 역대 회차 45비트 마스크 색인 (당첨번호와 몇 개 겹치는지 계산)
+DRAW_MASKS = DrawMaskIndex(DRAW_INDEX)
+DRAW_INDEX.subscribe(DRAW_MASKS.on_new_draw)
+DRAW_INDEX.subscribe_reset(DRAW_MASKS.reset)
+
+# 번호별 출현 횟수/동시 출현/미출현 기간/최근 출현 통계 (새 회차마다 증분 갱신)
+DRAW_STATS_WINDOW = int(os.getenv('DRAW_STATS_WINDOW', '52'))
+DRAW_STATS = DrawStats(DRAW_INDEX, window=DRAW_STATS_WINDOW)
+DRAW_INDEX.subscribe(DRAW_STATS.on_new_draw)
+DRAW_INDEX.subscribe_reset(DRAW_STATS.reset)
+
+# 새 회차가 들어오면 그 회차를 기다리던 저장 번호를 자동 채점
+TICKET_GRADER = TicketGrader(STATE, DRAW_INDEX)
+DRAW_INDEX.subscribe(TICKET_GRADER.on_new_draw)
+DRAW_INDEX.subscribe_reset(TICKET_GRADER.reset)
+
 def load_lotto_cache():
     """로또 당첨번호 캐시 로드"""
-    if os.path.exists(LOTTO_CACHE_FILE):
-        try:
-            with open(LOTTO_CACHE_FILE, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-                # 캐시 유효성 검사 (24시간 이내)
-                cache_time = datetime.fromisoformat(cache_data.get('last_updated', '2000-01-01'))
-                if (datetime.now() - cache_time).total_seconds() < 24 * 3600:  # 24시간
-                    return cache_data.get('data', {})
-                else:
-                    print("캐시가 만료되었습니다. 새로 조회합니다.")
-        except Exception as e:
-            print(f"캐시 로드 실패: {e}")
-    return {}
+    return DRAW_INDEX.as_dict()
 
 def save_lotto_cache(cache_data):
     """로또 당첨번호 캐시 저장"""
-    try:
-        # data 디렉토리가 없으면 생성
-        os.makedirs('./data', exist_ok=True)
-        
-        cache_structure = {
-            'last_updated': datetime.now().isoformat(),
-            'data': cache_data
-        }
-        
-        with open(LOTTO_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache_structure, f, ensure_ascii=False, indent=2)
-        print(f"로또 캐시 저장 완료: {len(cache_data)}개 회차")
-    except Exception as e:
-        print(f"캐시 저장 실패: {e}")
+    DRAW_INDEX.replace_all(cache_data)
 
 def get_cached_lotto_data(round_number):
     """캐시에서 특정 회차 데이터 조회"""
-    cache = load_lotto_cache()
-    round_key = str(round_number)
-    return cache.get(round_key)
+    return DRAW_INDEX.get(round_number)
 
 def cache_lotto_data(round_number, numbers, bonus, date):
     """특정 회차 데이터를 캐시에 저장"""
     try:
-        cache = load_lotto_cache()
-        round_key = str(round_number)
-        cache[round_key] = {
-            'numbers': numbers,
-            'bonus': bonus,
-            'date': date,
-            'cached_at': datetime.now().isoformat()
-        }
-        save_lotto_cache(cache)
+        DRAW_INDEX.add(round_number, numbers, bonus, date)
     except Exception as e:
         print(f"캐시 저장 실패 ({round_number}회차): {e}")
 
 def clear_lotto_cache():
     """로또 캐시 삭제 (관리용)"""
     try:
-        if os.path.exists(LOTTO_CACHE_FILE):
-            os.remove(LOTTO_CACHE_FILE)
+        if DRAW_INDEX.clear():
             print("로또 캐시가 삭제되었습니다.")
         else:
             print("삭제할 캐시 파일이 없습니다.")
@@ -148,15 +156,16 @@ def clear_lotto_cache():
 def get_cache_stats():
     """캐시 통계 정보 반환"""
     try:
-        cache = load_lotto_cache()
-        if not cache:
+        stats = DRAW_INDEX.stats()
+        if not stats['rounds']:
             return "캐시가 비어있습니다."
         
-        cache_file_size = os.path.getsize(LOTTO_CACHE_FILE) if os.path.exists(LOTTO_CACHE_FILE) else 0
-        cache_data = json.load(open(LOTTO_CACHE_FILE, 'r', encoding='utf-8')) if os.path.exists(LOTTO_CACHE_FILE) else {}
-        last_updated = cache_data.get('last_updated', '알 수 없음')
-        
-        return f"캐시된 회차: {len(cache)}개, 파일 크기: {cache_file_size/1024:.1f}KB, 마지막 업데이트: {last_updated}"
+        winning_stats = WINNING_INDEX.stats()
+        return (f"캐시된 회차: {stats['rounds']}개, 파일 크기: {stats['file_size']/1024:.1f}KB, "
+                f"저널: {stats['journal_entries']}건, 재조회 대기: {len(stats['failed_rounds'])}개, "
+                f"당첨 조합 색인: {winning_stats['winning_combinations']}개, "
+                f"자동 채점 완료 회차: {STATE.graded_round()}회, "
+                f"마지막 업데이트: {stats['last_updated']}")
     except Exception as e:
         return f"캐시 통계 조회 실패: {e}"
 
@@ -178,48 +187,61 @@ def decrypt_api_key(encrypted_key):
 
 def load_user_api_keys(user_id):
     """사용자 API 키 로드"""
-    if os.path.exists(API_KEYS_FILE):
-        try:
-            with open(API_KEYS_FILE, 'r', encoding='utf-8') as f:
-                api_keys_data = json.load(f)
-                user_keys = api_keys_data.get(user_id, {})
-                return {
-                    'openai': decrypt_api_key(user_keys.get('openai', '')),
-                    'anthropic': decrypt_api_key(user_keys.get('anthropic', '')),
-                    'google': decrypt_api_key(user_keys.get('google', ''))
-                }
-        except Exception as e:
-            print(f"API 키 로드 실패: {e}")
+    try:
+        user_keys = STATE.load_api_keys(user_id)
+        return {
+            'openai': decrypt_api_key(user_keys.get('openai', '')),
+            'anthropic': decrypt_api_key(user_keys.get('anthropic', '')),
+            'google': decrypt_api_key(user_keys.get('google', ''))
+        }
+    except Exception as e:
+        print(f"API 키 로드 실패: {e}")
     return {'openai': '', 'anthropic': '', 'google': ''}
 
 def save_user_api_keys(user_id, openai_key, anthropic_key, google_key):
-    """사용자 API 키 저장"""
+    """사용자 API 키 저장 (암호화 후 해당 사용자 행만 갱신)"""
     try:
-        # 기존 데이터 로드
-        api_keys_data = {}
-        if os.path.exists(API_KEYS_FILE):
-            with open(API_KEYS_FILE, 'r', encoding='utf-8') as f:
-                api_keys_data = json.load(f)
-        
-        # 사용자 키 업데이트 (암호화)
-        api_keys_data[user_id] = {
+        STATE.save_api_keys(user_id, {
             'openai': encrypt_api_key(openai_key),
             'anthropic': encrypt_api_key(anthropic_key),
             'google': encrypt_api_key(google_key)
-        }
-        
-        # 저장
-        with open(API_KEYS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(api_keys_data, f, ensure_ascii=False, indent=2)
-        
+        })
         return True
     except Exception as e:
         print(f"API 키 저장 실패: {e}")
         return False
 
-# 전역 사용자/로또 정보
-USERS = load_users()
-MY_LOTTO = load_my_lotto()
+# AI SDK 클라이언트 생성 함수들 (사용자 키별로 한 번만 생성되어 재사용됨)
+# SDK 모듈은 PROVIDER_REGISTRY 가 처음 사용할 때 불러와 인자로 넘겨줌
+# 게이트웨이 제한 시간이 지나 기다리던 코루틴이 취소되어도 to_thread 의 SDK 호출은 계속 돌므로
+# SDK 자체 제한 시간을 같게 두고 재시도는 하지 않음 (재시도/차단은 AI_GATEWAYS 가 담당)
+AI_SDK_MAX_RETRIES = int(os.getenv('AI_SDK_MAX_RETRIES', '0'))
+GEMINI_MODEL = 'models/gemini-1.5-flash'
+
+def create_openai_client(api_key, openai):
+    return openai.OpenAI(api_key=api_key, timeout=AI_PROVIDER_TIMEOUT_SECONDS, max_retries=AI_SDK_MAX_RETRIES)
+
+def create_anthropic_client(api_key, anthropic):
+    return anthropic.Anthropic(api_key=api_key, timeout=AI_PROVIDER_TIMEOUT_SECONDS, max_retries=AI_SDK_MAX_RETRIES)
+
+def create_gemini_client(api_key, glm):
+    """사용자 키 전용 Gemini 클라이언트 (전역 genai.configure 를 바꾸지 않음)"""
+    return glm.GenerativeServiceClient(client_options={'api_key': api_key})
+
+# AI SDK 등록소 (SDK는 첫 사용 시 import)
+PROVIDER_REGISTRY = ProviderRegistry()
+PROVIDER_REGISTRY.register('openai', ['openai'], create_openai_client)
+PROVIDER_REGISTRY.register('anthropic', ['anthropic'], create_anthropic_client)
+PROVIDER_REGISTRY.register('google', ['google.ai.generativelanguage'], create_gemini_client)
+
+# 사용자별 복호화된 키 + 클라이언트 캐시 (키 저장 시 무효화)
+PROVIDER_CLIENTS = ProviderClientCache(
+    load_user_api_keys,
+    PROVIDER_REGISTRY,
+    max_entries=int(os.getenv('AI_CLIENT_CACHE_SIZE', '256')),
+    ttl_seconds=int(os.getenv('AI_CLIENT_CACHE_TTL', '1800')),
+    version_fn=STATE.api_keys_version
+)
 
 # 회원가입
 @app.route('/register', methods=['GET', 'POST'])
@@ -227,11 +249,10 @@ def register():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        if username in USERS:
+        if get_user(username) is not None:
             flash('이미 존재하는 아이디입니다.', 'danger')
         else:
-            USERS[username] = {'password': generate_password_hash(password), 'is_admin': False}
-            save_users(USERS)
+            save_user(username, {'password': generate_password_hash(password), 'is_admin': False})
             flash('회원가입이 완료되었습니다. 로그인 해주세요.', 'success')
             return redirect(url_for('login'))
     return render_template('register.html')
@@ -243,18 +264,18 @@ def change_password():
     if request.method == 'POST':
         old_pw = request.form['old_password']
         new_pw = request.form['new_password']
-        user = USERS.get(current_user.get_id())
+        user = get_user(current_user.get_id())
         if user:
             if user.get('is_admin'):
                 if user['password'] == old_pw:
                     user['password'] = new_pw
-                    save_users(USERS)
+                    save_user(current_user.get_id(), user)
                     flash('비밀번호가 변경되었습니다.', 'success')
                     return redirect(url_for('index'))
             else:
                 if check_password_hash(user['password'], old_pw):
                     user['password'] = generate_password_hash(new_pw)
-                    save_users(USERS)
+                    save_user(current_user.get_id(), user)
                     flash('비밀번호가 변경되었습니다.', 'success')
                     return redirect(url_for('index'))
         flash('기존 비밀번호가 일치하지 않습니다.', 'danger')
@@ -272,6 +293,7 @@ def api_settings():
         google_key = request.form.get('google_key', '').strip()
         
         if save_user_api_keys(user_id, openai_key, anthropic_key, google_key):
+            PROVIDER_CLIENTS.invalidate(user_id)
             flash('AI API 키가 성공적으로 저장되었습니다.', 'success')
         else:
             flash('API 키 저장 중 오류가 발생했습니다.', 'danger')
@@ -279,7 +301,7 @@ def api_settings():
         return redirect(url_for('api_settings'))
     
     # 기존 키 로드 (보안을 위해 마스킹)
-    user_keys = load_user_api_keys(user_id)
+    user_keys = PROVIDER_CLIENTS.get_keys(user_id)
     masked_keys = {}
     for key, value in user_keys.items():
         if value:
@@ -294,7 +316,7 @@ def api_settings():
 @login_required
 def user_list():
     # 관리자만 접근 가능
-    user = USERS.get(current_user.get_id())
+    user = get_user(current_user.get_id())
     if not user or not user.get('is_admin'):
         flash('관리자만 접근할 수 있습니다.', 'danger')
         return redirect(url_for('index'))
@@ -304,13 +326,12 @@ def user_list():
             flash('본인은 삭제할 수 없습니다.', 'danger')
         elif del_user == 'admin':
             flash('기본 관리자는 삭제할 수 없습니다.', 'danger')
-        elif del_user in USERS:
-            USERS.pop(del_user)
-            save_users(USERS)
+        elif get_user(del_user) is not None:
+            delete_user(del_user)
             flash(f'{del_user} 계정이 삭제되었습니다.', 'success')
         else:
             flash('존재하지 않는 사용자입니다.', 'danger')
-    filtered_users = {k: v for k, v in USERS.items() if k != 'admin'}
+    filtered_users = {k: v for k, v in load_users().items() if k != 'admin'}
     return render_template('user_list.html', users=filtered_users)
 
 # 캐시 관리 엔드포인트 (관리자용)
@@ -318,7 +339,7 @@ def user_list():
 @login_required
 def cache_stats():
     # 관리자만 접근 가능
-    user = USERS.get(current_user.get_id())
+    user = get_user(current_user.get_id())
     if not user or not user.get('is_admin'):
         flash('관리자만 접근할 수 있습니다.', 'danger')
         return redirect(url_for('index'))
@@ -330,7 +351,7 @@ def cache_stats():
 @login_required
 def clear_cache():
     # 관리자만 접근 가능
-    user = USERS.get(current_user.get_id())
+    user = get_user(current_user.get_id())
     if not user or not user.get('is_admin'):
         return jsonify({'success': False, 'error': '관리자만 접근할 수 있습니다.'}), 403
     
@@ -350,105 +371,153 @@ class User(UserMixin):
 
 @login_manager.user_loader
 def load_user(user_id):
-    if user_id in USERS:
+    if get_user(user_id) is not None:
         return User(user_id)
     return None
 
 
 # AI 연동 함수들
-async def ask_gpt_for_lotto_numbers(user_id):
-    """GPT에게 로또 번호 5개 요청"""
+# AI별 응답 제한 시간(초)과, 이만큼 유효한 후보가 모이면 나머지 AI를 기다리지 않는 정족수
+AI_PROVIDER_TIMEOUT_SECONDS = float(os.getenv('AI_PROVIDER_TIMEOUT_SECONDS', '30'))
+AI_QUORUM_CANDIDATES = int(os.getenv('AI_QUORUM_CANDIDATES', '10'))
+# 역대 당첨번호/다른 후보와 이 개수 이상 겹치는 후보는 제외 (6: 완전히 같은 조합만 제외)
+AI_WINNER_OVERLAP_LIMIT = int(os.getenv('AI_WINNER_OVERLAP_LIMIT', '6'))
+AI_CANDIDATE_OVERLAP_LIMIT = int(os.getenv('AI_CANDIDATE_OVERLAP_LIMIT', '6'))
+# AI별로 이만큼 유효 조합을 받으면 응답 스트림을 닫음 (나머지 토큰은 생성/과금되지 않음)
+AI_STREAM_TARGET_COMBINATIONS = int(os.getenv('AI_STREAM_TARGET_COMBINATIONS', '5'))
+
+# AI 서비스별 호출 관문 (동시 호출 수, 초당 요청 수, 연속 실패 시 일시 차단)
+AI_GATEWAYS = {
+    name: ProviderGateway(
+        name,
+        max_concurrency=int(os.getenv('AI_PROVIDER_MAX_CONCURRENCY', '8')),
+        rate_per_second=float(os.getenv('AI_PROVIDER_RATE_PER_SECOND', '2')),
+        burst=int(os.getenv('AI_PROVIDER_BURST', '10')),
+        failure_threshold=int(os.getenv('AI_BREAKER_FAILURES', '5')),
+        reset_seconds=float(os.getenv('AI_BREAKER_RESET_SECONDS', '60')),
+        timeout=AI_PROVIDER_TIMEOUT_SECONDS,
+        max_queue_seconds=float(os.getenv('AI_GATEWAY_QUEUE_SECONDS', '2'))
+    )
+    for name in ('GPT', 'Claude', 'Gemini')
+}
+
+# 모든 요청이 공유하는 AI 작업용 이벤트 루프 (요청마다 루프를 만들지 않음)
+AI_THREAD_POOL_SIZE = int(os.getenv('AI_THREAD_POOL_SIZE', '32'))
+AI_REQUEST_TIMEOUT_SECONDS = float(os.getenv('AI_REQUEST_TIMEOUT_SECONDS', '120'))
+AI_LOOP = AsyncLoopThread(name='ai-loop', max_workers=AI_THREAD_POOL_SIZE)
+SSE_HEARTBEAT_SECONDS = 15
+
+# 회차별 AI 후보 풀 (프롬프트가 사용자와 무관하므로 같은 사용자의 요청 간에 재사용, 키 주인별로 분리)
+AI_POOL_MIN_CANDIDATES = int(os.getenv('AI_POOL_MIN_CANDIDATES', '6'))
+AI_POOL_TAKE_PER_REQUEST = int(os.getenv('AI_POOL_TAKE_PER_REQUEST', '15'))
+AI_CANDIDATE_POOL = RoundCandidatePool(max_size=int(os.getenv('AI_POOL_MAX_SIZE', '100')))
+AI_SINGLE_FLIGHT = SingleFlight()
+POOL_REFILL_TASKS = set()
+
+AI_PROMPT_STATS = os.getenv('AI_PROMPT_STATS', '1') == '1'
+
+def with_draw_stats(prompt):
+    """프롬프트 뒤에 역대 당첨번호 통계 요약을 붙임 (AI_PROMPT_STATS=0 이면 그대로)"""
+    if not AI_PROMPT_STATS:
+        return prompt
+    summary = DRAW_STATS.prompt_summary()
+    return f"{prompt}\n\n{summary}" if summary else prompt
+
+def stream_gpt_combinations(client, on_combo=None):
+    """GPT 응답을 스트리밍으로 읽으며 유효 조합이 모이면 바로 연결을 닫음"""
+    stream = client.chat.completions.create(
+        model="gpt-4",
+        messages=[
+            {"role": "system", "content": "당신은 로또 번호 분석 전문가입니다. 과거 데이터와 통계를 기반으로 로또 번호를 추천해주세요."},
+            {"role": "user", "content": with_draw_stats("이번 주 로또 당첨 가능성이 높은 번호 조합 5개를 추천해주세요. 각 조합은 1~45 사이의 중복 없는 6개 숫자로 구성되어야 합니다. JSON 형식으로 응답해주세요: {\"combinations\": [[1,2,3,4,5,6], ...]}")}
+        ],
+        temperature=0.7,
+        stream=True
+    )
+    chunks = (chunk.choices[0].delta.content or '' for chunk in stream if chunk.choices)
+    return collect_stream_combinations(chunks, validate_lotto_combination, AI_STREAM_TARGET_COMBINATIONS,
+                                       on_combo, close=stream.close)
+
+async def ask_gpt_for_lotto_numbers(user_id, on_combo=None):
+    """GPT에게 로또 번호 5개 요청 (조합이 완성될 때마다 on_combo 호출)"""
     try:
-        user_keys = load_user_api_keys(user_id)
+        user_keys = PROVIDER_CLIENTS.get_keys(user_id)
         openai_key = user_keys.get('openai', '')
         
         if not openai_key:
-            raise Exception("OpenAI API 키가 설정되지 않았습니다.")
+            raise ProviderConfigError("OpenAI API 키가 설정되지 않았습니다.")
         
-        from openai import OpenAI
-        client = OpenAI(api_key=openai_key)
+        client = PROVIDER_CLIENTS.get_client(user_id, 'openai')
         
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "당신은 로또 번호 분석 전문가입니다. 과거 데이터와 통계를 기반으로 로또 번호를 추천해주세요."},
-                {"role": "user", "content": "이번 주 로또 당첨 가능성이 높은 번호 조합 5개를 추천해주세요. 각 조합은 1~45 사이의 중복 없는 6개 숫자로 구성되어야 합니다. JSON 형식으로 응답해주세요: {\"combinations\": [[1,2,3,4,5,6], ...]}"}
-            ],
-            temperature=0.7
-        )
-        
-        content = response.choices[0].message.content
-        import json
-        # JSON 부분만 추출
-        json_start = content.find('{')
-        json_end = content.rfind('}') + 1
-        if json_start != -1 and json_end != -1:
-            json_content = content[json_start:json_end]
-            data = json.loads(json_content)
-            return data.get('combinations', [])
-        return []
+        # 동기 SDK 스트림은 스레드에서 읽어 다른 AI 호출과 동시에 진행
+        combinations, stopped_early = await asyncio.to_thread(stream_gpt_combinations, client, on_combo)
+        if stopped_early:
+            print(f"GPT 응답 스트림: 유효 조합 {len(combinations)}개 확보 후 조기 종료")
+        return combinations
     except Exception as e:
         print(f"GPT API 호출 실패: {e}")
         raise e
 
-async def ask_claude_for_lotto_numbers(user_id):
-    """Claude에게 로또 번호 5개 요청"""
+def stream_claude_combinations(client, on_combo=None):
+    """Claude 응답을 스트리밍으로 읽으며 유효 조합이 모이면 바로 연결을 닫음"""
+    with client.messages.stream(
+        model="claude-3-5-sonnet-20241022",
+        max_tokens=1000,
+        messages=[
+            {"role": "user", "content": with_draw_stats("로또 번호 분석 전문가로서, 이번 주 당첨 가능성이 높은 로또 번호 조합 5개를 추천해주세요. 각 조합은 1~45 사이의 중복 없는 6개 숫자로 구성되어야 합니다. JSON 형식으로 응답해주세요: {\"combinations\": [[1,2,3,4,5,6], ...]}")}
+        ]
+    ) as stream:
+        # with 블록을 벗어나면 스트림 연결이 닫힘
+        return collect_stream_combinations(stream.text_stream, validate_lotto_combination,
+                                           AI_STREAM_TARGET_COMBINATIONS, on_combo)
+
+async def ask_claude_for_lotto_numbers(user_id, on_combo=None):
+    """Claude에게 로또 번호 5개 요청 (조합이 완성될 때마다 on_combo 호출)"""
     try:
-        user_keys = load_user_api_keys(user_id)
+        user_keys = PROVIDER_CLIENTS.get_keys(user_id)
         anthropic_key = user_keys.get('anthropic', '')
         
         if not anthropic_key:
-            raise Exception("Anthropic API 키가 설정되지 않았습니다.")
+            raise ProviderConfigError("Anthropic API 키가 설정되지 않았습니다.")
         
-        client = anthropic.Anthropic(api_key=anthropic_key)
-        message = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=1000,
-            messages=[
-                {"role": "user", "content": "로또 번호 분석 전문가로서, 이번 주 당첨 가능성이 높은 로또 번호 조합 5개를 추천해주세요. 각 조합은 1~45 사이의 중복 없는 6개 숫자로 구성되어야 합니다. JSON 형식으로 응답해주세요: {\"combinations\": [[1,2,3,4,5,6], ...]}"}
-            ]
-        )
-        
-        content = message.content[0].text
-        import json
-        # JSON 부분만 추출
-        json_start = content.find('{')
-        json_end = content.rfind('}') + 1
-        if json_start != -1 and json_end != -1:
-            json_content = content[json_start:json_end]
-            data = json.loads(json_content)
-            return data.get('combinations', [])
-        return []
+        client = PROVIDER_CLIENTS.get_client(user_id, 'anthropic')
+        combinations, stopped_early = await asyncio.to_thread(stream_claude_combinations, client, on_combo)
+        if stopped_early:
+            print(f"Claude 응답 스트림: 유효 조합 {len(combinations)}개 확보 후 조기 종료")
+        return combinations
     except Exception as e:
         print(f"Claude API 호출 실패: {e}")
         raise e
 
-async def ask_gemini_for_lotto_numbers(user_id):
-    """Gemini에게 로또 번호 5개 요청"""
+def gemini_chunk_text(chunk):
+    # 안전 필터 등으로 후보/텍스트가 없는 조각은 빈 문자열
+    if not chunk.candidates:
+        return ''
+    return ''.join(part.text for part in chunk.candidates[0].content.parts)
+
+def stream_gemini_combinations(client, on_combo=None):
+    """Gemini 응답을 스트리밍으로 읽으며 유효 조합이 모이면 바로 읽기를 멈춤"""
+    prompt = with_draw_stats("로또 번호 분석 전문가로서, 이번 주 당첨 가능성이 높은 로또 번호 조합 5개를 추천해주세요. 각 조합은 1~45 사이의 중복 없는 6개 숫자로 구성되어야 합니다. JSON 형식으로 응답해주세요: {\"combinations\": [[1,2,3,4,5,6], ...]}")
+    request = {'model': GEMINI_MODEL, 'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+    response = client.stream_generate_content(request=request, timeout=AI_PROVIDER_TIMEOUT_SECONDS, retry=None)
+    chunks = (gemini_chunk_text(chunk) for chunk in response)
+    return collect_stream_combinations(chunks, validate_lotto_combination, AI_STREAM_TARGET_COMBINATIONS,
+                                       on_combo, close=chunks.close)
+
+async def ask_gemini_for_lotto_numbers(user_id, on_combo=None):
+    """Gemini에게 로또 번호 5개 요청 (조합이 완성될 때마다 on_combo 호출)"""
     try:
-        user_keys = load_user_api_keys(user_id)
+        user_keys = PROVIDER_CLIENTS.get_keys(user_id)
         google_key = user_keys.get('google', '')
         
         if not google_key:
-            raise Exception("Google API 키가 설정되지 않았습니다.")
-        
-        genai.configure(api_key=google_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        prompt = "로또 번호 분석 전문가로서, 이번 주 당첨 가능성이 높은 로또 번호 조합 5개를 추천해주세요. 각 조합은 1~45 사이의 중복 없는 6개 숫자로 구성되어야 합니다. JSON 형식으로 응답해주세요: {\"combinations\": [[1,2,3,4,5,6], ...]}"
-        
-        response = model.generate_content(prompt)
-        content = response.text
+            raise ProviderConfigError("Google API 키가 설정되지 않았습니다.")
         
-        import json
-        # JSON 부분만 추출
-        json_start = content.find('{')
-        json_end = content.rfind('}') + 1
-        if json_start != -1 and json_end != -1:
-            json_content = content[json_start:json_end]
-            data = json.loads(json_content)
-            return data.get('combinations', [])
-        return []
+        client = PROVIDER_CLIENTS.get_client(user_id, 'google')
+        combinations, stopped_early = await asyncio.to_thread(stream_gemini_combinations, client, on_combo)
+        if stopped_early:
+            print(f"Gemini 응답 스트림: 유효 조합 {len(combinations)}개 확보 후 조기 종료")
+        return combinations
     except Exception as e:
         print(f"Gemini API 호출 실패: {e}")
         raise e
@@ -456,20 +525,21 @@ async def ask_gemini_for_lotto_numbers(user_id):
 async def ask_claude_for_final_selection(candidate_numbers, user_id):
     """Claude에게 최종 선택 요청"""
     try:
-        user_keys = load_user_api_keys(user_id)
+        user_keys = PROVIDER_CLIENTS.get_keys(user_id)
         anthropic_key = user_keys.get('anthropic', '')
         
         if not anthropic_key:
-            raise Exception("Anthropic API 키가 설정되지 않았습니다.")
+            raise ProviderConfigError("Anthropic API 키가 설정되지 않았습니다.")
         
         candidates_str = "\n".join([f"{i+1}. {nums}" for i, nums in enumerate(candidate_numbers)])
         
-        client = anthropic.Anthropic(api_key=anthropic_key)
-        message = client.messages.create(
+        client = PROVIDER_CLIENTS.get_client(user_id, 'anthropic')
+        message = await asyncio.to_thread(
+            client.messages.create,
             model="claude-3-5-sonnet-20241022",
             max_tokens=500,
             messages=[
-                {"role": "user", "content": f"다음 3개의 로또 번호 조합 중에서 가장 당첨 가능성이 높다고 생각하는 1개를 선택하고 그 이유를 설명해주세요:\n\n{candidates_str}\n\n응답은 JSON 형식으로 해주세요: {{\"selected_index\": 0, \"reason\": \"선택 이유\"}}"}
+                {"role": "user", "content": with_draw_stats(f"다음 3개의 로또 번호 조합 중에서 가장 당첨 가능성이 높다고 생각하는 1개를 선택하고 그 이유를 설명해주세요:\n\n{candidates_str}\n\n응답은 JSON 형식으로 해주세요: {{\"selected_index\": 0, \"reason\": \"선택 이유\"}}")}
             ]
         )
         
@@ -503,45 +573,79 @@ def get_analysis_message(analysis_type, confidence_score):
     """분석 타입에 따른 메시지 생성"""
     messages = {
         "랜덤": f"🎲 랜덤으로 생성된 행운의 번호입니다! (신뢰도: {confidence_score}%)",
-        "AI 협업": f"🤖🧠💎 AI 협업을 통해 선별된 번호입니다! (신뢰도: {confidence_score}%)"
+        "AI 협업": f"🤖🧠💎 AI 협업을 통해 선별된 번호입니다! (신뢰도: {confidence_score}%)",
+        "대체 번호": "⚠️ AI 서비스를 사용할 수 없어 역대 1등 조합을 피한 무작위 대체 번호를 드립니다. (AI가 고른 번호가 아닙니다)"
     }
     return messages.get(analysis_type, f"🍀 분석을 통해 선별된 번호입니다! (신뢰도: {confidence_score}%)")
 
 
+# 내 번호 목록 페이지 크기와 종류 필터 값
+MY_LOTTO_PAGE_SIZE = 20
+MY_LOTTO_MAX_PAGE_SIZE = 100
+MY_LOTTO_TYPES = {'generated': '생성된 번호', 'checked': '조회된 번호'}
+
+def parse_my_lotto_filters(args):
+    """쿼리 문자열의 type/round/rank 필터를 ticket_page 인자로 변환 (잘못된 값은 무시)"""
+    filters = {}
+    if args.get('type') in MY_LOTTO_TYPES:
+        filters['ticket_type'] = MY_LOTTO_TYPES[args['type']]
+    round_number = args.get('round', type=int)
+    if round_number is not None:
+        filters['round_number'] = round_number
+    rank = args.get('rank', type=int)
+    if rank is not None:
+        filters['rank'] = rank
+    return filters
+
 # 내 번호 목록 및 삭제 페이지/기능 추가
 @app.route('/my-lotto', methods=['GET', 'POST'])
 @login_required
 def my_lotto():
     user_id = current_user.get_id()
-    if user_id not in MY_LOTTO:
-        MY_LOTTO[user_id] = []
     if request.method == 'POST':
-        # 삭제 요청 처리
-        idx = request.form.get('delete_idx')
-        if idx is not None:
+        # 삭제 요청 처리 (번호 ID 기준이라 다른 워커에서 추가/삭제가 있어도 안전)
+        ticket_id = request.form.get('delete_id')
+        if ticket_id is not None:
             try:
-                idx = int(idx)
-                if 0 <= idx < len(MY_LOTTO[user_id]):
-                    deleted_item = MY_LOTTO[user_id][idx]
-                    del MY_LOTTO[user_id][idx]
-                    save_my_lotto(MY_LOTTO)
+                if delete_my_lotto(user_id, int(ticket_id)):
                     flash('선택한 번호가 삭제되었습니다.', 'success')
-                    print(f"삭제된 항목: {deleted_item.get('numbers', 'Unknown')} (인덱스: {idx})")
+                    print(f"삭제된 항목 ID: {ticket_id}")
                 else:
-                    flash(f'잘못된 인덱스입니다. (요청: {idx}, 범위: 0-{len(MY_LOTTO[user_id])-1})', 'danger')
+                    flash(f'삭제할 번호를 찾을 수 없습니다. (ID: {ticket_id})', 'danger')
             except Exception as e:
                 flash(f'삭제 중 오류가 발생했습니다: {str(e)}', 'danger')
                 print(f"삭제 오류: {e}")
     
-    # 최신순으로 보여주기 (인덱스와 함께)
-    original_list = MY_LOTTO[user_id]
-    lotto_list_with_index = []
-    for i, item in enumerate(reversed(original_list)):
-        item_with_original_idx = item.copy()
-        item_with_original_idx['original_index'] = len(original_list) - 1 - i
-        lotto_list_with_index.append(item_with_original_idx)
+    # 최신순 첫 페이지만 요약으로 보여주기 (다음 페이지는 /my-lotto/history)
+    lotto_list, next_cursor = STATE.ticket_page(user_id, limit=MY_LOTTO_PAGE_SIZE,
+                                                **parse_my_lotto_filters(request.args))
     
-    return render_template('my_lotto.html', lotto_list=lotto_list_with_index)
+    return render_template('my_lotto.html', lotto_list=lotto_list, next_cursor=next_cursor, filters=request.args)
+
+@app.route('/my-lotto/history')
+@login_required
+def my_lotto_history():
+    """내 번호 목록 다음 페이지 (JSON, before=이전 페이지의 next_cursor)"""
+    user_id = current_user.get_id()
+    before = request.args.get('before', type=int)
+    limit = max(1, min(request.args.get('limit', MY_LOTTO_PAGE_SIZE, type=int), MY_LOTTO_MAX_PAGE_SIZE))
+    items, next_cursor = STATE.ticket_page(user_id, before_id=before, limit=limit,
+                                           **parse_my_lotto_filters(request.args))
+    return jsonify({
+        'success': True,
+        'items': items,
+        'next_cursor': next_cursor,
+        'html': render_template('my_lotto_items.html', lotto_list=items)
+    })
+
+@app.route('/my-lotto/<int:ticket_id>')
+@login_required
+def my_lotto_detail(ticket_id):
+    """저장 번호 한 건 전체 (생성 과정 process_info 포함)"""
+    item = STATE.get_ticket(current_user.get_id(), ticket_id)
+    if item is None:
+        return jsonify({'success': False, 'error': '번호를 찾을 수 없습니다.'}), 404
+    return jsonify({'success': True, 'item': item})
 
 def fetch_lotto_data(round_number):
     """동행복권 API에서 로또 당첨 번호 가져오기 (캐시 포함)"""
@@ -551,29 +655,28 @@ def fetch_lotto_data(round_number):
         print(f"캐시에서 {round_number}회차 데이터 로드")
         return cached_data['numbers'], cached_data['bonus'], cached_data['date']
     
+    # 최근에 조회 실패한 회차(미발표 최신 회차 등)는 재조회 간격이 지날 때까지 건너뜀
+    if not DRAW_INDEX.should_fetch(round_number):
+        return None, None, None
+    
     # 캐시에 없으면 API 호출
     try:
         print(f"API에서 {round_number}회차 데이터 조회 중...")
-        url = f"https://www.dhlottery.co.kr/common.do?method=getLottoNumber&drwNo={round_number}"
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        result = fetch_draw(LOTTO_HTTP_SESSION, round_number, DHLOTTERY_API_URL, timeout=10, retries=1)
         
-        if data.get('returnValue') == 'success':
-            numbers = [
-                data['drwtNo1'], data['drwtNo2'], data['drwtNo3'],
-                data['drwtNo4'], data['drwtNo5'], data['drwtNo6']
-            ]
-            bonus = data['bnusNo']
-            date = data['drwNoDate']
+        if result:
+            numbers, bonus, date = result
             
             # 성공적으로 조회한 데이터를 캐시에 저장
             cache_lotto_data(round_number, numbers, bonus, date)
             print(f"{round_number}회차 데이터 캐시에 저장 완료")
             
             return numbers, bonus, date
+        DRAW_INDEX.mark_failed(round_number)
         return None, None, None
     except Exception as e:
         print(f"API 호출 실패 ({round_number}회차): {e}")
+        DRAW_INDEX.mark_failed(round_number)
         return None, None, None
 
 def get_latest_round():
@@ -603,153 +706,270 @@ def get_all_winning_combinations():
     
     print(f"기존 당첨번호 조회 중... (1회차 ~ {latest_round}회차)")
     
-    # 최근 100회차만 조회 (API 부하 고려)
-    start_round = max(1, latest_round - 99)
-    
-    # 캐시를 한 번에 로드
-    cache = load_lotto_cache()
-    api_calls_made = 0
-    cache_hits = 0
-    
-    for round_num in range(start_round, latest_round + 1):
-        # 캐시 먼저 확인
-        round_key = str(round_num)
-        if round_key in cache:
-            cached_data = cache[round_key]
-            numbers = cached_data['numbers']
-            cache_hits += 1
-        else:
-            # 캐시에 없으면 API 호출
-            numbers, bonus, date = fetch_lotto_data(round_num)
-            api_calls_made += 1
-        
-        if numbers:
+    # 인덱스에 없는 회차는 연결 풀을 공유하는 병렬 동기화로 한 번에 채움
+    summary = sync_draw_history(DRAW_INDEX, latest_round, DHLOTTERY_API_URL,
+                                max_workers=LOTTO_SYNC_WORKERS, session=LOTTO_HTTP_SESSION)
+    
+    for round_num in range(1, latest_round + 1):
+        cached_data = DRAW_INDEX.get(round_num)
+        if cached_data:
             # 메인 번호 6개를 튜플로 변환하여 set에 추가
-            combination = tuple(sorted(numbers))
-            winning_combinations.add(combination)
-            
-            if round_num % 10 == 0:  # 10회차마다 진행상황 출력
-                print(f"{round_num}회차까지 조회 완료... (캐시: {cache_hits}회, API: {api_calls_made}회)")
+            winning_combinations.add(tuple(sorted(cached_data['numbers'])))
     
     print(f"총 {len(winning_combinations)}개의 기존 당첨번호 조합 수집 완료")
-    print(f"성능 통계 - 캐시 히트: {cache_hits}회, API 호출: {api_calls_made}회 (캐시 효율: {cache_hits/(cache_hits+api_calls_made)*100:.1f}%)")
+    print(f"성능 통계 - 캐시 히트: {summary['cached']}회, API 호출: {summary['requested']}회")
     return winning_combinations
 
-def filter_ai_suggestions_against_winners(ai_suggestions):
-    """AI 제안 번호에서 기존 당첨번호와 중복되는 것들을 제거"""
-    winning_combinations = get_all_winning_combinations()
+def start_draw_sync_on_startup():
+    """앱 시작 시 전체 회차 백그라운드 동기화 (LOTTO_SYNC_ON_STARTUP=0 으로 끔)
+
+    이후 LOTTO_SYNC_INTERVAL_SECONDS 마다 다시 실행해 새 회차를 채웁니다 (0 이면 한 번만).
+    """
+    if os.getenv('LOTTO_SYNC_ON_STARTUP', '1') != '1':
+        return None
+    return start_background_sync(DRAW_INDEX, get_latest_round, api_url=DHLOTTERY_API_URL,
+                                 max_workers=LOTTO_SYNC_WORKERS, on_complete=TICKET_GRADER.grade_pending,
+                                 interval=LOTTO_SYNC_INTERVAL_SECONDS)
+
+def filter_ai_suggestions_against_winners(ai_suggestions, overlap_limit=None):
+    """AI 제안 번호에서 기존 당첨번호와 중복되는 것들을 제거
+
+    overlap_limit(기본 AI_WINNER_OVERLAP_LIMIT)이 6보다 작으면 어느 회차든
+    당첨번호(보너스 제외)와 그 개수 이상 겹치는 번호도 제외합니다.
+    당첨 조합 색인은 백그라운드 동기화와 새 회차 알림으로 갱신되므로 여기서는
+    API를 호출하지 않습니다 (이벤트 루프에서는 asyncio.to_thread 로 호출).
+    """
+    if overlap_limit is None:
+        overlap_limit = AI_WINNER_OVERLAP_LIMIT
+    DRAW_INDEX.refresh()  # 다른 프로세스(동기화 작업 등)가 저널에 추가한 회차만 반영
+    winning_index = WINNING_INDEX
+    if overlap_limit < 6 and ai_suggestions:
+        overlaps, overlap_rounds = DRAW_MASKS.max_overlaps(ai_suggestions)
     filtered_suggestions = []
     
-    for suggestion in ai_suggestions:
-        combination = tuple(sorted(suggestion))
-        if combination not in winning_combinations:
-            filtered_suggestions.append(suggestion)
-        else:
+    for i, suggestion in enumerate(ai_suggestions):
+        if winning_index.contains(suggestion):
             print(f"기존 당첨번호와 중복되어 제외: {suggestion}")
+        elif overlap_limit < 6 and overlaps[i] >= overlap_limit:
+            print(f"{overlap_rounds[i]}회차 당첨번호와 {overlaps[i]}개 겹쳐 제외: {suggestion}")
+        else:
+            filtered_suggestions.append(suggestion)
     
     print(f"AI 제안 {len(ai_suggestions)}개 → 필터링 후 {len(filtered_suggestions)}개")
     return filtered_suggestions
 
+def remove_similar_candidates(candidates, overlap_limit=None):
+    """AI 간 중복 제거: 앞서 남긴 후보와 overlap_limit 개 이상 겹치는 후보를 제외
 
-def generate_fallback_numbers():
-    """API 실패 시 대체 번호 생성"""
-    main_numbers = sorted(random.sample(range(1, 46), 6))
-    remaining_numbers = [i for i in range(1, 46) if i not in main_numbers]
-    bonus_number = random.choice(remaining_numbers)
-    return main_numbers, bonus_number, "랜덤"
+    overlap_limit(기본 AI_CANDIDATE_OVERLAP_LIMIT)이 6이면 완전히 같은 조합만 제외합니다.
+    """
+    if overlap_limit is None:
+        overlap_limit = AI_CANDIDATE_OVERLAP_LIMIT
+    if not candidates:
+        return []
+    overlaps = pairwise_overlaps([sorted(combo) for combo in candidates])
+    kept = []
+    for i in range(len(candidates)):
+        if all(overlaps[i, j] < overlap_limit for j in kept):
+            kept.append(i)
+    return [candidates[i] for i in kept]
 
-async def generate_ai_collaborative_lotto_numbers(user_id):
-    """AI 협업을 통한 로또 번호 생성"""
-    errors = []
-    
-    # 각 AI에게 번호 요청
-    gpt_numbers = []
-    claude_numbers = []
-    gemini_numbers = []
-    
-    # GPT 요청
+def generate_unique_tickets(count, exclude=(), rng=None):
+    """역대 1등 조합과 exclude 조합을 피한 서로 다른 번호 count 장을 한 번에 생성
+
+    반환: (N×6 번호 배열, 보너스 번호 배열). 조합 공간의 순위를 중복 없이
+    뽑아 번호로 풀기 때문에 다시 뽑는 반복 없이 count 장이 정확히 나옵니다.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    excluded = WINNING_INDEX.ranks()
+    if len(exclude):
+        excluded = np.concatenate([excluded, combo_ranks(exclude)])
+    combos = combos_from_ranks(sample_ranks(count, excluded, rng))
+    return combos, random_bonus_numbers(combos, rng)
+
+def generate_fallback_numbers(exclude=()):
+    """API 실패 시 대체 번호 생성 (역대 1등 조합과 exclude 를 피한 한 장)"""
+    combos, bonuses = generate_unique_tickets(1, exclude=exclude)
+    return combos[0].tolist(), int(bonuses[0]), "랜덤"
+
+def emit_progress(on_event, event, **data):
+    """진행 상황 콜백 호출 (콜백 오류가 생성 과정을 막지 않도록 보호)"""
+    if on_event is None:
+        return
     try:
-        print("🤖 GPT에게 로또 번호 요청 중...")
-        gpt_numbers = await ask_gpt_for_lotto_numbers(user_id)
+        on_event(event, data)
     except Exception as e:
-        errors.append(f"GPT: {str(e)}")
+        print(f"진행 상황 전달 실패 ({event}): {e}")
+
+def candidate_callback(on_event, name):
+    """스트리밍 중 조합이 완성될 때마다 'candidate' 이벤트를 보내는 콜백 (AI 호출 스레드에서 실행)"""
+    if on_event is None:
+        return None
+    return lambda combo: emit_progress(on_event, 'candidate', name=name, combination=sorted(combo))
+
+async def gather_ai_suggestions(user_id, providers, errors, timeout=None, quorum=None, on_event=None):
+    """여러 AI에게 동시에 번호를 요청하고, 정족수만큼 후보가 모이면 바로 반환
+
+    providers: [(이름, 코루틴 함수), ...] - 이름별 AI_GATEWAYS 관문을 거쳐 호출
+    반환값: {이름: 조합 목록}, {이름: 응답 시간(초)}
+    """
+    timeout = timeout or AI_PROVIDER_TIMEOUT_SECONDS
+    quorum = quorum or AI_QUORUM_CANDIDATES
+    started = time.monotonic()
+    results = {name: [] for name, _ in providers}
+    latencies = {}
+    tasks = {
+        asyncio.ensure_future(AI_GATEWAYS[name].call(ask, user_id, candidate_callback(on_event, name),
+                                                     timeout=timeout)): name
+        for name, ask in providers
+    }
+    pending = set(tasks)
     
-    # Claude 요청
-    try:
-        print("🧠 Claude에게 로또 번호 요청 중...")
-        claude_numbers = await ask_claude_for_lotto_numbers(user_id)
-    except Exception as e:
-        errors.append(f"Claude: {str(e)}")
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            name = tasks[task]
+            latencies[name] = round(time.monotonic() - started, 2)
+            error = None
+            try:
+                results[name] = task.result() or []
+            except asyncio.TimeoutError:
+                error = f"응답 시간 초과 ({timeout:.0f}초)"
+            except Exception as e:
+                error = str(e)
+            if error:
+                errors.append(f"{name}: {error}")
+            emit_progress(on_event, 'provider', name=name, latency=latencies[name], error=error,
+                          combinations=[sorted(c) for c in results[name][:5] if validate_lotto_combination(c)])
+        
+        # 유효한 고유 조합이 정족수 이상이면 나머지 응답은 기다리지 않음
+        valid = {tuple(sorted(c)) for combos in results.values() for c in combos[:5]
+                 if validate_lotto_combination(c)}
+        if pending and len(valid) >= quorum:
+            for task in pending:
+                task.cancel()
+                print(f"⏩ 후보 {len(valid)}개 확보 - {tasks[task]} 응답은 기다리지 않음")
+                emit_progress(on_event, 'provider', name=tasks[task], skipped=True, combinations=[])
+            break
     
-    # Gemini 요청
-    try:
-        print("💎 Gemini에게 로또 번호 요청 중...")
-        gemini_numbers = await ask_gemini_for_lotto_numbers(user_id)
-    except Exception as e:
-        errors.append(f"Gemini: {str(e)}")
+    return results, latencies
+
+async def fetch_round_ai_candidates(target_round, user_id, on_event=None):
+    """user_id 의 API 키로 세 AI에게 후보를 받아 그 사용자의 회차 후보 풀에 추가
+
+    같은 사용자의 같은 회차 호출이 이미 진행 중이면 새로 호출하지 않고 그 결과를
+    함께 기다립니다 (single-flight). 키 주인별로 묶으므로 다른 사용자의 키 설정
+    오류나 빈 결과를 이어받지 않고, 다른 사용자의 키로 호출하지도 않습니다.
+    반환값: (AI별 결과, 응답 시간, 오류 목록)
+    """
+    async def fan_out():
+        fan_out_errors = []
+        results, latencies = await gather_ai_suggestions(user_id, [
+            ('GPT', ask_gpt_for_lotto_numbers),
+            ('Claude', ask_claude_for_lotto_numbers),
+            ('Gemini', ask_gemini_for_lotto_numbers),
+        ], fan_out_errors, on_event=on_event)
+        for name, combos in results.items():
+            AI_CANDIDATE_POOL.add(target_round, user_id, name,
+                                  [c for c in combos[:5] if validate_lotto_combination(c)])
+        return results, latencies, fan_out_errors
+    
+    (results, latencies, fan_out_errors), leader = await AI_SINGLE_FLIGHT.do(
+        ('candidates', target_round, user_id), fan_out)
+    if not leader:
+        # 다른 요청이 받아온 결과를 이 요청의 진행 상황으로 전달
+        print(f"🔗 진행 중인 {target_round}회차 AI 요청 결과를 함께 사용")
+        for name, combos in results.items():
+            emit_progress(on_event, 'provider', name=name, latency=latencies.get(name), error=None, shared=True,
+                          combinations=[sorted(c) for c in combos[:5] if validate_lotto_combination(c)])
+    return results, latencies, list(fan_out_errors)
+
+def schedule_pool_refill(target_round, user_id):
+    """user_id 의 키로 그 사용자의 후보 풀을 백그라운드에서 미리 채움 (이미 채우는 중이면 무시, 이벤트 루프 안에서 호출)"""
+    if AI_SINGLE_FLIGHT.in_flight(('candidates', target_round, user_id)):
+        return
+    if not any(gateway.available() for gateway in AI_GATEWAYS.values()):
+        return  # 모든 AI가 차단 중이면 보충하지 않음
     
-    # 모든 AI가 실패한 경우
-    if not gpt_numbers and not claude_numbers and not gemini_numbers:
-        error_msg = "모든 AI API 연동에 실패했습니다: " + " | ".join(errors)
-        raise Exception(error_msg)
+    async def refill():
+        try:
+            await fetch_round_ai_candidates(target_round, user_id)
+            print(f"♻️ {target_round}회차 후보 풀 보충 완료: {AI_CANDIDATE_POOL.size(target_round, user_id)}개")
+        except Exception as e:
+            print(f"후보 풀 보충 실패: {e}")
     
-    # 모든 AI의 추천 번호 수집
-    all_ai_numbers = []
-    ai_sources = []
+    task = asyncio.ensure_future(refill())
+    POOL_REFILL_TASKS.add(task)
+    task.add_done_callback(POOL_REFILL_TASKS.discard)
+
+async def generate_ai_collaborative_lotto_numbers(user_id, on_event=None):
+    """AI 협업을 통한 로또 번호 생성
+
+    on_event(이벤트, 데이터)를 넘기면 AI별 응답, 당첨번호 필터링, 중복 제거,
+    최종 선택 단계가 끝날 때마다 호출됩니다 (스트리밍 응답용).
+    """
+    errors = []
+    latencies = {}
+    target_round = get_latest_round() + 1  # 이번 주 추첨 회차
+    
+    # 이 사용자의 회차 후보 풀에 아직 받지 않은 후보가 충분하면 AI 호출 생략
+    pool_hit = AI_CANDIDATE_POOL.available(target_round, user_id) >= AI_POOL_MIN_CANDIDATES
+    if pool_hit:
+        print(f"♻️ {target_round}회차 후보 풀 사용")
+        emit_progress(on_event, 'pool', round=target_round,
+                      available=AI_CANDIDATE_POOL.available(target_round, user_id))
+    else:
+        # 세 AI에게 동시에 번호 요청 (같은 회차 요청이 동시에 오면 한 번만 호출)
+        print("🤖🧠💎 GPT, Claude, Gemini에게 동시에 로또 번호 요청 중...")
+        results, latencies, fetch_errors = await fetch_round_ai_candidates(target_round, user_id, on_event)
+        errors.extend(fetch_errors)
     
-    for i, combo in enumerate(gpt_numbers[:5]):
-        if validate_lotto_combination(combo):
-            all_ai_numbers.append(sorted(combo))
-            ai_sources.append(f"GPT-{i+1}")
+    # 풀에서 이 사용자가 아직 받지 않은 후보를 무작위로 가져옴
+    pooled = AI_CANDIDATE_POOL.take(target_round, user_id, AI_POOL_TAKE_PER_REQUEST)
     
-    for i, combo in enumerate(claude_numbers[:5]):
-        if validate_lotto_combination(combo):
-            all_ai_numbers.append(sorted(combo))
-            ai_sources.append(f"Claude-{i+1}")
+    # 모든 AI가 실패한 경우 (AI 서비스가 차단/한도 초과 상태면 대체 번호로 진행)
+    if not pooled:
+        unavailable = [name for name, gateway in AI_GATEWAYS.items() if not gateway.available()]
+        if not unavailable:
+            error_msg = "모든 AI API 연동에 실패했습니다: " + " | ".join(errors)
+            raise Exception(error_msg)
+        print(f"⚠️ AI 서비스 일시 차단 ({', '.join(unavailable)}) - 대체 번호 사용")
+        emit_progress(on_event, 'fallback', unavailable=unavailable, errors=errors)
     
-    for i, combo in enumerate(gemini_numbers[:5]):
-        if validate_lotto_combination(combo):
-            all_ai_numbers.append(sorted(combo))
-            ai_sources.append(f"Gemini-{i+1}")
+    # 이번 요청이 3개를 가져간 뒤 남은 후보가 부족해지면 백그라운드에서 미리 채움
+    if AI_CANDIDATE_POOL.available(target_round, user_id) - 3 < AI_POOL_MIN_CANDIDATES:
+        schedule_pool_refill(target_round, user_id)
+    
+    # 모든 AI의 추천 번호 수집
+    all_ai_numbers = [combo for combo, _ in pooled]
+    ai_sources = [source for _, source in pooled]
     
     # 기존 당첨번호와 중복 제거
     print("🔍 기존 1등 당첨번호와 중복 제거 중...")
-    filtered_by_winners = filter_ai_suggestions_against_winners(all_ai_numbers)
+    # 색인/DB 작업이 이벤트 루프(다른 요청의 AI 호출)를 막지 않도록 스레드에서 실행
+    filtered_by_winners = await asyncio.to_thread(filter_ai_suggestions_against_winners, all_ai_numbers)
+    emit_progress(on_event, 'filter', total=len(all_ai_numbers), remaining=len(filtered_by_winners),
+                  excluded=len(all_ai_numbers) - len(filtered_by_winners))
     
     # AI 간 중복 제거
     print("🔍 AI 간 중복 번호 제거 중...")
-    unique_combinations = []
-    seen_combinations = set()
+    unique_combinations = remove_similar_candidates(filtered_by_winners)
     
-    for combo in filtered_by_winners:
-        combo_tuple = tuple(sorted(combo))
-        if combo_tuple not in seen_combinations:
-            unique_combinations.append(combo)
-            seen_combinations.add(combo_tuple)
+    emit_progress(on_event, 'dedup', unique=len(unique_combinations))
     
     # 3개 선정 (부족하면 기존 당첨번호를 피해서 새로 생성)
     final_candidates = unique_combinations[:3]
-    winning_combinations = get_all_winning_combinations() if len(final_candidates) < 3 else set()
-    
-    while len(final_candidates) < 3:
-        # 기존 당첨번호와 중복되지 않는 랜덤 번호 생성
-        max_attempts = 100  # 무한루프 방지
-        for attempt in range(max_attempts):
-            random_combo = sorted(random.sample(range(1, 46), 6))
-            combo_tuple = tuple(random_combo)
-            
-            # 기존 당첨번호 및 이미 선정된 번호와 중복 확인
-            if (combo_tuple not in winning_combinations and 
-                random_combo not in final_candidates):
-                final_candidates.append(random_combo)
-                print(f"대체 번호 생성: {random_combo}")
-                break
-        else:
-            # 최대 시도 횟수 초과 시 기본 랜덤 번호 추가
-            print("⚠️ 대체 번호 생성 실패, 기본 랜덤 번호 사용")
-            random_combo = sorted(random.sample(range(1, 46), 6))
+    ai_candidates = {tuple(sorted(c)) for c in final_candidates}
+    
+    if len(final_candidates) < 3:
+        # 기존 당첨번호(전체 회차 색인) 및 이미 선정된 번호와 겹치지 않는 번호를 한 번에 생성
+        combos, _ = await asyncio.to_thread(generate_unique_tickets, 3 - len(final_candidates),
+                                            exclude=final_candidates)
+        for random_combo in combos.tolist():
             final_candidates.append(random_combo)
-            break
+            print(f"대체 번호 생성: {random_combo}")
+    
+    emit_progress(on_event, 'candidates', final_candidates=final_candidates)
     
     # 최종 선택
     selected_index = 0
@@ -758,7 +978,12 @@ async def generate_ai_collaborative_lotto_numbers(user_id):
     
     try:
         print("🎯 Claude에게 최종 선택 요청 중...")
-        selected_index, selection_reason = await ask_claude_for_final_selection(final_candidates, user_id)
+        selected_index, selection_reason = await AI_GATEWAYS['Claude'].call(
+            ask_claude_for_final_selection, final_candidates, user_id)
+    except asyncio.TimeoutError:
+        claude_selection_failed = True
+        errors.append(f"Claude 최종 선택: 응답 시간 초과 ({AI_PROVIDER_TIMEOUT_SECONDS:.0f}초)")
+        selection_reason = "⚠️ Claude 최종 선택 시간 초과 - 첫 번째 후보로 자동 선택됨"
     except Exception as e:
         claude_selection_failed = True
         errors.append(f"Claude 최종 선택: {str(e)}")
@@ -773,6 +998,19 @@ async def generate_ai_collaborative_lotto_numbers(user_id):
         if not claude_selection_failed:
             selection_reason = "⚠️ Claude가 잘못된 인덱스를 반환 - 첫 번째 후보로 자동 선택됨"
     
+    emit_progress(on_event, 'selection', selected_index=selected_index, final_numbers=final_numbers,
+                  reason=selection_reason, failed=claude_selection_failed)
+    
+    # AI가 낸 후보가 아니라 무작위 대체 번호가 최종 번호가 되면 AI 협업으로 표시하지 않음
+    # (저장 번호의 analysis_type 으로 시뮬레이터 ai_saved 전략 등이 AI 번호를 구분함)
+    analysis_type = "AI 협업" if tuple(sorted(final_numbers)) in ai_candidates else "대체 번호"
+    
+    # 이 사용자에게 준 후보는 다음 요청에서 제외
+    AI_CANDIDATE_POOL.mark_served(target_round, user_id, final_candidates)
+    
+    # 최종 후보별 역대 당첨번호와 가장 많이 겹친 번호 수
+    winner_overlaps, _ = await asyncio.to_thread(DRAW_MASKS.max_overlaps, final_candidates)
+    
     # 보너스 번호 생성
     bonus_candidates = [i for i in range(1, 46) if i not in final_numbers]
     bonus_number = random.choice(bonus_candidates)
@@ -786,14 +1024,19 @@ async def generate_ai_collaborative_lotto_numbers(user_id):
         'filtered_by_winners': len(filtered_by_winners),
         'excluded_by_winners': len(all_ai_numbers) - len(filtered_by_winners),
         'unique_after_dedup': len(unique_combinations),
+        'overlap_limits': {'winners': AI_WINNER_OVERLAP_LIMIT, 'candidates': AI_CANDIDATE_OVERLAP_LIMIT},
+        'winner_overlaps': winner_overlaps.tolist(),
         'final_candidates': final_candidates,
         'selected_index': selected_index,
         'selection_reason': selection_reason,
         'claude_selection_failed': claude_selection_failed,
+        'provider_latency': latencies,
+        'candidate_pool': {'round': target_round, 'hit': pool_hit},
+        'fallback_candidates': len(final_candidates) - len(ai_candidates),
         'errors': errors
     }
     
-    return final_numbers, bonus_number, "AI 협업", process_info
+    return final_numbers, bonus_number, analysis_type, process_info
 
 
 
@@ -803,7 +1046,7 @@ def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        user = USERS.get(username)
+        user = get_user(username)
         if user:
             if user.get('is_admin'):
                 if user['password'] == password:
@@ -833,75 +1076,76 @@ def index():
     return render_template('index.html', username=current_user.get_id())
 
 
-@app.route('/generate-ai-collaborative')
-@login_required
-def generate_ai_collaborative():
-    """AI 협업을 통한 로또 번호 생성"""
-    try:
-        # asyncio 이벤트 루프 실행
-        import asyncio
-        
-        def run_async():
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                return loop.run_until_complete(generate_ai_collaborative_lotto_numbers(current_user.get_id()))
-            finally:
-                loop.close()
-        
-        result = run_async()
-        
-        if len(result) == 4:
-            main_numbers, bonus_number, analysis_type, process_info = result
-        else:
-            main_numbers, bonus_number, analysis_type = result
-            process_info = {}
-        
-        # 신뢰도 계산
-        confidence_score = random.randint(85, 98)  # AI 협업은 높은 신뢰도
-        
-        # 메시지 생성
-        if analysis_type == "AI 협업":
-            lucky_message = f"🤖🧠💎 GPT, Claude, Gemini가 협업하여 선별한 최고의 번호입니다! (신뢰도: {confidence_score}%)"
-        else:
-            lucky_message = get_analysis_message(analysis_type, confidence_score)
-        
-        # 생성된 번호를 자동으로 저장
-        user_id = current_user.get_id()
-        if user_id:
-            if user_id not in MY_LOTTO:
-                MY_LOTTO[user_id] = []
-            
-            # 생성된 번호 저장 (과정 정보 포함)
-            saved_data = {
-                'numbers': main_numbers,
-                'bonus': bonus_number,
-                'type': '생성된 번호',
-                'analysis_type': analysis_type,
-                'confidence_score': confidence_score,
-                'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            if process_info:
-                saved_data['process_info'] = process_info
-            
-            MY_LOTTO[user_id].append(saved_data)
-            save_my_lotto(MY_LOTTO)
-        
-        response_data = {
-            'main_numbers': main_numbers,
-            'bonus_number': bonus_number,
-            'message': lucky_message,
+def build_ai_collaborative_response(user_id, result):
+    """생성 결과를 내 번호 목록에 저장하고 응답 데이터 구성"""
+    if len(result) == 4:
+        main_numbers, bonus_number, analysis_type, process_info = result
+    else:
+        main_numbers, bonus_number, analysis_type = result
+        process_info = {}
+    
+    # 신뢰도 계산
+    confidence_score = random.randint(85, 98) if analysis_type == "AI 협업" else None  # 대체 번호는 표시 안 함
+    
+    # 메시지 생성
+    if analysis_type == "AI 협업":
+        lucky_message = f"🤖🧠💎 GPT, Claude, Gemini가 협업하여 선별한 최고의 번호입니다! (신뢰도: {confidence_score}%)"
+    else:
+        lucky_message = get_analysis_message(analysis_type, confidence_score)
+    
+    # 생성된 번호를 자동으로 저장
+    if user_id:
+        # 생성된 번호 저장 (과정 정보 포함)
+        saved_data = {
+            'numbers': main_numbers,
+            'bonus': bonus_number,
+            'type': '생성된 번호',
+            'round': draw_round_for(datetime.now()),  # 이 회차 추첨 후 자동 채점
             'analysis_type': analysis_type,
             'confidence_score': confidence_score,
             'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
         if process_info:
-            response_data['process_info'] = process_info
+            saved_data['process_info'] = process_info
         
-        return jsonify(response_data)
+        add_my_lotto(user_id, saved_data)
+    
+    response_data = {
+        'main_numbers': main_numbers,
+        'bonus_number': bonus_number,
+        'message': lucky_message,
+        'analysis_type': analysis_type,
+        'confidence_score': confidence_score,
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    
+    if process_info:
+        response_data['process_info'] = process_info
+    
+    return response_data
+
+def ai_timeout_error():
+    return {
+        'success': False,
+        'error': f'AI 협업 응답 시간({AI_REQUEST_TIMEOUT_SECONDS:.0f}초)이 초과되었습니다. 잠시 후 다시 시도해주세요.',
+        'error_type': 'ai_collaboration_timeout'
+    }
+
+@app.route('/generate-ai-collaborative')
+@login_required
+def generate_ai_collaborative():
+    """AI 협업을 통한 로또 번호 생성"""
+    try:
+        # 공유 이벤트 루프에 제출하고 결과만 기다림
+        user_id = current_user.get_id()
+        result = AI_LOOP.run(generate_ai_collaborative_lotto_numbers(user_id),
+                             timeout=AI_REQUEST_TIMEOUT_SECONDS)
+        return jsonify(build_ai_collaborative_response(user_id, result))
         
+    except TimeoutError:
+        print("AI 협업 생성 시간 초과")
+        return jsonify(ai_timeout_error()), 504
     except Exception as e:
         error_message = str(e)
         print(f"AI 협업 생성 중 오류: {error_message}")
@@ -913,6 +1157,106 @@ def generate_ai_collaborative():
             'error_type': 'ai_collaboration_failed'
         }), 400
 
+def run_ai_collaborative_job(user_id):
+    """작업 큐 워커에서 실행되는 AI 협업 생성"""
+    result = AI_LOOP.run(generate_ai_collaborative_lotto_numbers(user_id), timeout=AI_REQUEST_TIMEOUT_SECONDS)
+    return build_ai_collaborative_response(user_id, result)
+
+# AI 협업 생성 작업 큐 (제출 즉시 작업 ID 반환, 워커 수만큼만 동시에 실행)
+AI_JOBS = JobQueue(run_ai_collaborative_job,
+                   max_workers=int(os.getenv('AI_JOB_WORKERS', '4')),
+                   max_pending=int(os.getenv('AI_JOB_MAX_PENDING', '200')),
+                   result_ttl=int(os.getenv('AI_JOB_RESULT_TTL', '600')),
+                   name='ai-job',
+                   store=STATE)  # 작업 상태는 공유 저장소에 두어 어느 워커로 폴링해도 조회됨
+
+@app.route('/ai-jobs', methods=['POST'])
+@login_required
+def submit_ai_job():
+    """AI 협업 생성 작업 등록 (결과는 /ai-jobs/<job_id> 로 조회)"""
+    user_id = current_user.get_id()
+    try:
+        job = AI_JOBS.submit(user_id, user_id)
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': str(e), 'error_type': 'queue_full'}), 503
+    job['poll_url'] = url_for('get_ai_job', job_id=job['id'])
+    return jsonify(job), 202
+
+@app.route('/ai-jobs/<job_id>')
+@login_required
+def get_ai_job(job_id):
+    """AI 협업 생성 작업 상태/결과 조회"""
+    job = AI_JOBS.get(job_id, owner=current_user.get_id())
+    if job is None:
+        return jsonify({'success': False, 'error': '작업을 찾을 수 없거나 결과 보관 기간이 지났습니다.'}), 404
+    return jsonify(job)
+
+@app.route('/ai-jobs/stats')
+@login_required
+def ai_job_stats():
+    # 관리자만 접근 가능
+    user = get_user(current_user.get_id())
+    if not user or not user.get('is_admin'):
+        return jsonify({'success': False, 'error': '관리자만 접근할 수 있습니다.'}), 403
+    return jsonify(dict(AI_JOBS.stats(), candidate_pool=AI_CANDIDATE_POOL.stats(),
+                        single_flight_shared=AI_SINGLE_FLIGHT.shared_calls,
+                        providers={name: gateway.stats() for name, gateway in AI_GATEWAYS.items()},
+                        sdks=PROVIDER_REGISTRY.stats()))
+
+def format_sse(event, data):
+    """Server-Sent Events 메시지 형식으로 변환"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/generate-ai-collaborative/stream')
+@login_required
+def generate_ai_collaborative_stream():
+    """AI 협업 번호 생성 진행 상황을 Server-Sent Events 로 전달"""
+    import queue
+    user_id = current_user.get_id()
+    events = queue.Queue()
+    
+    def on_event(event, data):
+        events.put((event, data))
+    
+    future = AI_LOOP.submit(generate_ai_collaborative_lotto_numbers(user_id, on_event=on_event))
+    future.add_done_callback(lambda f: events.put(('done', None)))
+    deadline = time.monotonic() + AI_REQUEST_TIMEOUT_SECONDS
+    
+    def stream():
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    future.cancel()
+                    yield format_sse('failed', ai_timeout_error())
+                    return
+                try:
+                    event, data = events.get(timeout=min(SSE_HEARTBEAT_SECONDS, remaining))
+                except queue.Empty:
+                    # 프록시가 연결을 끊지 않도록 주기적으로 빈 주석 전송
+                    yield ": keep-alive\n\n"
+                    continue
+                if event != 'done':
+                    yield format_sse(event, data)
+                    continue
+                try:
+                    response_data = build_ai_collaborative_response(user_id, future.result())
+                    yield format_sse('result', response_data)
+                except Exception as e:
+                    print(f"AI 협업 생성 중 오류: {e}")
+                    yield format_sse('failed', {'success': False, 'error': str(e),
+                                               'error_type': 'ai_collaboration_failed'})
+                return
+        finally:
+            # 클라이언트가 연결을 끊으면 남은 작업 취소
+            if not future.done():
+                future.cancel()
+    
+    return app.response_class(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 
 
 # 내가 선택한 로또 번호를 조회하는 API (app 인스턴스 생성 이후 위치)
@@ -935,31 +1279,13 @@ def check_my_lotto():
         win_numbers, bonus, date = fetch_lotto_data(round_number)
         if not win_numbers:
             return jsonify({'success': False, 'error': f'{round_number}회차 정보를 불러올 수 없습니다.'})
-        matched = len(set(numbers) & set(win_numbers))
-        rank = 0
-        rank_text = '낙첨'
-        if matched == 6:
-            rank = 1
-            rank_text = '🎉 1등 당첨!'
-        elif matched == 5 and bonus in numbers:
-            rank = 2
-            rank_text = '2등 (보너스번호 포함)'
-        elif matched == 5:
-            rank = 3
-            rank_text = '3등'
-        elif matched == 4:
-            rank = 4
-            rank_text = '4등'
-        elif matched == 3:
-            rank = 5
-            rank_text = '5등'
+        rank, _ = grade_ticket(numbers, win_numbers, bonus)
+        rank_text = RANK_TEXTS[rank]
 
         # 사용자별 선택 번호 저장
         user_id = current_user.get_id()
         if user_id:
-            if user_id not in MY_LOTTO:
-                MY_LOTTO[user_id] = []
-            MY_LOTTO[user_id].append({
+            add_my_lotto(user_id, {
                 'numbers': numbers,
                 'type': '조회된 번호',
                 'round': round_number,
@@ -967,11 +1293,337 @@ def check_my_lotto():
                 'result': rank_text,
                 'rank': rank
             })
-            save_my_lotto(MY_LOTTO)
 
         return jsonify({'success': True, 'rank': rank, 'rank_text': rank_text, 'round': round_number, 'date': date, 'win_numbers': win_numbers, 'bonus': bonus})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-if __name__ == '__main__':
+# 번호 통계 조회 API (미리 계산해 둔 배열에서 바로 응답)
+@app.route('/stats/numbers')
+@login_required
+def number_stats():
+    """?top_pairs=20 (동시 출현 상위 쌍 개수), ?number=7 (해당 번호와의 동시 출현 횟수 추가)"""
+    top_pairs = max(0, min(request.args.get('top_pairs', 20, type=int), 990))
+    stats = dict(DRAW_STATS.snapshot(top_pairs=top_pairs))
+    number = request.args.get('number', type=int)
+    if number is not None:
+        if not 1 <= number <= 45:
+            return jsonify({'success': False, 'error': '번호는 1~45 사이로 입력하세요.'}), 400
+        stats['pairs_with'] = {'number': number, 'counts': DRAW_STATS.pair_counts(number)}
+    return jsonify(dict(stats, success=True))
+
+BULK_GENERATE_MAX_COUNT = int(os.getenv('BULK_GENERATE_MAX_COUNT', '100000'))
+
+# 공동 구매 등 여러 장을 한 번에 만드는 API (내 번호 목록에는 저장하지 않음)
+@app.route('/generate-bulk', methods=['POST'])
+@login_required
+def generate_bulk():
+    """요청 본문: {"count": 장 수, "bonus": true}
+
+    역대 1등 조합을 피한 서로 다른 번호를 count 장 돌려줍니다.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        count = int(data.get('count', 0))
+    except (TypeError, ValueError):
+        count = 0
+    if count < 1 or count > BULK_GENERATE_MAX_COUNT:
+        return jsonify({'success': False, 'error': f'장 수는 1~{BULK_GENERATE_MAX_COUNT} 사이로 입력하세요.'}), 400
+    started = time.perf_counter()
+    combos, bonuses = generate_unique_tickets(count)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    response = {
+        'success': True,
+        'count': count,
+        'elapsed_ms': elapsed_ms,
+        'tickets': combos.tolist()
+    }
+    if data.get('bonus', True):
+        response['bonus_numbers'] = bonuses.tolist()
+    return jsonify(response)
+
+WHEEL_MAX_TICKETS = int(os.getenv('WHEEL_MAX_TICKETS', '500'))
+WHEEL_TIME_BUDGET_SECONDS = float(os.getenv('WHEEL_TIME_BUDGET_SECONDS', '2'))
+
+# 번호 풀로 여러 장을 조합해 당첨 가능성을 넓히는 휠(커버링 디자인) API
+@app.route('/wheel', methods=['POST'])
+@login_required
+def generate_wheel():
+    """요청 본문: {"pool": [풀 번호...], "tickets": 장 수, "match": 3, "guarantee": 3,
+    "exclude_winners": true, "seed": null}
+
+    풀 안에서 guarantee 개가 당첨번호로 나왔을 때 적어도 한 장이 match 개 이상
+    맞는 경우(조건 조합)를 최대한 많이 덮는 번호 tickets 장과 커버율을 돌려줍니다.
+    """
+    data = request.get_json(silent=True) or {}
+    pool = data.get('pool')
+    if not isinstance(pool, list) or any(type(n) != int for n in pool):
+        return jsonify({'success': False, 'error': '번호 풀(pool)을 숫자 목록으로 입력하세요.'}), 400
+    try:
+        tickets = int(data.get('tickets', 10))
+        match = int(data.get('match', 3))
+        guarantee = int(data['guarantee']) if data.get('guarantee') is not None else None
+        seed = int(data['seed']) if data.get('seed') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': '숫자 값이 올바르지 않습니다.'}), 400
+    if not 1 <= tickets <= WHEEL_MAX_TICKETS:
+        return jsonify({'success': False, 'error': f'장 수는 1~{WHEEL_MAX_TICKETS} 사이로 입력하세요.'}), 400
+    exclude_ranks = WINNING_INDEX.ranks() if data.get('exclude_winners', True) else None
+    try:
+        wheel = build_wheel(pool, tickets, match=match, guarantee=guarantee, exclude_ranks=exclude_ranks,
+                            seed=seed, time_budget=WHEEL_TIME_BUDGET_SECONDS)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify(dict(wheel, success=True))
+
+BATCH_CHECK_MAX_TICKETS = int(os.getenv('BATCH_CHECK_MAX_TICKETS', '10000'))
+BATCH_CHECK_MAX_PAIRS = int(os.getenv('BATCH_CHECK_MAX_PAIRS', '2000000'))
+
+def parse_batch_tickets(tickets):
+    """일괄 조회 번호 목록 검증 (오류 메시지 또는 None 반환)"""
+    if not isinstance(tickets, list) or not tickets:
+        return '조회할 번호 목록(tickets)을 입력하세요.'
+    if len(tickets) > BATCH_CHECK_MAX_TICKETS:
+        return f'한 번에 최대 {BATCH_CHECK_MAX_TICKETS}장까지 조회할 수 있습니다.'
+    for index, numbers in enumerate(tickets):
+        if not isinstance(numbers, list) or len(numbers) != 6 or len(set(numbers)) != 6 or any(type(n) != int or n < 1 or n > 45 for n in numbers):
+            return f'{index + 1}번째 번호: 1~45 사이의 중복 없는 6개 숫자를 입력하세요.'
+    return None
+
+# 여러 장의 번호를 여러 회차와 한 번에 비교하는 API (조회 결과는 저장하지 않음)
+@app.route('/check-my-lotto/batch', methods=['POST'])
+@login_required
+def check_my_lotto_batch():
+    """요청 본문: {"tickets": [[6개 번호], ...], "start_round": 1, "end_round": 최신 회차}
+
+    번호별로 등수 횟수(tallies)와 최고 등수를 돌려줍니다. 캐시된 회차만
+    비교하며, 구간 안에서 아직 캐시에 없는 회차 수는 missing_rounds 로 알려 줍니다.
+    """
+    data = request.get_json(silent=True) or {}
+    tickets = data.get('tickets')
+    error = parse_batch_tickets(tickets)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    rounds, matrix = DRAW_INDEX.draw_matrix()
+    latest_round = int(rounds[-1]) if len(rounds) else 0
+    try:
+        start_round = int(data.get('start_round') or 1)
+        end_round = int(data.get('end_round') or latest_round)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': '회차 정보가 올바르지 않습니다.'}), 400
+    if start_round < 1 or end_round < start_round:
+        return jsonify({'success': False, 'error': '회차 구간이 올바르지 않습니다.'}), 400
+    rounds, matrix = select_rounds(rounds, matrix, start_round, end_round)
+    pairs = len(tickets) * len(rounds)
+    if pairs > BATCH_CHECK_MAX_PAIRS:
+        return jsonify({'success': False,
+                        'error': f'번호 수 × 회차 수는 최대 {BATCH_CHECK_MAX_PAIRS}까지 조회할 수 있습니다. (요청: {pairs})'}), 400
+
+    started = time.perf_counter()
+    result = grade_tickets(tickets, rounds, matrix)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    tallies = result['tallies'].tolist()
+    best_rank = result['best_rank'].tolist()
+    best_round = result['best_round'].tolist()
+    items = []
+    for index, numbers in enumerate(tickets):
+        rank = best_rank[index]
+        items.append({
+            'numbers': sorted(numbers),
+            'tallies': {str(k): tallies[index][k] for k in range(1, 6)},
+            'losses': tallies[index][0],
+            'best_rank': rank,
+            'best_rank_text': RANK_TEXTS[rank],
+            'best_round': best_round[index] or None
+        })
+    totals = result['tallies'].sum(axis=0).tolist()
+    return jsonify({
+        'success': True,
+        'start_round': start_round,
+        'end_round': end_round,
+        'rounds_checked': len(rounds),
+        'missing_rounds': max(0, min(end_round, latest_round) - start_round + 1 - len(rounds)),
+        'pairs': pairs,
+        'elapsed_ms': elapsed_ms,
+        'totals': {str(k): totals[k] for k in range(1, 6)},
+        'items': items
+    })
+
+def benchmark_grading(tickets=1000, rounds=100, repeat=5, seed=None):
+    """일괄 채점 성능 측정 (무작위 번호 tickets 장 × 최근 rounds 개 회차)"""
+    all_rounds, matrix = DRAW_INDEX.draw_matrix()
+    if not len(all_rounds):
+        raise SystemExit('캐시된 회차가 없습니다. 먼저 sync-draws 를 실행하세요.')
+    # 캐시된 회차가 부족하면 있는 회차를 반복해 회차 수를 맞춤
+    picked = np.resize(np.arange(len(all_rounds))[-rounds:], rounds)
+    bench_rounds, bench_matrix = all_rounds[picked], matrix[picked]
+    rng = np.random.default_rng(seed)
+    ticket_array = np.argsort(rng.random((tickets, 45)), axis=1)[:, :6] + 1
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        grade_tickets(ticket_array, bench_rounds, bench_matrix)
+        timings.append(time.perf_counter() - started)
+    pairs = tickets * rounds
+    best = min(timings)
+    return {
+        'tickets': tickets,
+        'rounds': rounds,
+        'pairs': pairs,
+        'best_ms': round(best * 1000, 2),
+        'median_ms': round(sorted(timings)[len(timings) // 2] * 1000, 2),
+        'pairs_per_second': int(pairs / best) if best else None
+    }
+
+SIMULATION_MAX_TICKETS = int(os.getenv('SIMULATION_MAX_TICKETS', '5000000'))
+SIMULATION_WORKERS = int(os.getenv('SIMULATION_WORKERS', str(os.cpu_count() or 1)))
+
+def simulation_data():
+    """시뮬레이터에 넘길 회차 행렬, 통계 가중치, 당첨 조합 순위, 저장된 AI 협업 번호(와 추첨 회차)"""
+    rounds, matrix = DRAW_INDEX.draw_matrix()
+    counts, _, _, _ = DRAW_STATS.arrays()
+    # 저장 번호마다 참여한 추첨 회차를 함께 넘겨 백테스트에서 저장 이전 회차에는 쓰지 않게 함
+    ai_saved = sorted(
+        (item.get('round') or draw_round_for(datetime.strptime(item['generated_at'], '%Y-%m-%d %H:%M:%S')),
+         item['numbers'])
+        for username in load_users() for item in load_my_lotto(username)
+        if item.get('analysis_type') == 'AI 협업' and len(item.get('numbers', [])) == 6
+        and (item.get('round') or item.get('generated_at')))
+    return {
+        'rounds': np.array(rounds),
+        'matrix': np.array(matrix),
+        'weights': counts[1:] + 1,
+        'prefix_counts': prefix_counts(matrix),
+        'winning_ranks': WINNING_INDEX.ranks(),
+        'ai_tickets': np.array([numbers for _, numbers in ai_saved], dtype=np.int64).reshape(-1, 6),
+        'ai_ticket_rounds': np.array([round_number for round_number, _ in ai_saved], dtype=np.int64)
+    }
+
+def run_simulations(strategies, mode='simulated', tickets=1000000, per_round=100, seed=None,
+                    workers=None, mp_context=None):
+    """여러 전략을 같은 seed 로 시뮬레이션 (실패한 전략은 error 로 표시)"""
+    data = simulation_data()
+    results = []
+    for strategy in strategies:
+        try:
+            results.append(simulate(strategy, data, mode=mode, tickets=tickets, per_round=per_round,
+                                    seed=seed, workers=workers or SIMULATION_WORKERS, mp_context=mp_context))
+        except ValueError as e:
+            results.append({'strategy': strategy, 'mode': mode, 'error': str(e)})
+    return results
+
+# 전략별 시뮬레이션/백테스트 (관리자 전용, 요청 처리 중 프로세스 풀을 씀)
+@app.route('/admin/simulate', methods=['POST'])
+@login_required
+def admin_simulate():
+    """요청 본문: {"strategies": ["random", "stats", "ai_saved"], "mode": "simulated" | "history",
+    "tickets": 1000000, "per_round": 100, "seed": 42}"""
+    user = get_user(current_user.get_id())
+    if not user or not user.get('is_admin'):
+        return jsonify({'success': False, 'error': '관리자만 접근할 수 있습니다.'}), 403
+    data = request.get_json(silent=True) or {}
+    strategies = data.get('strategies') or list(STRATEGIES)
+    unknown = [name for name in strategies if name not in STRATEGIES]
+    if unknown:
+        return jsonify({'success': False, 'error': f"알 수 없는 전략입니다: {', '.join(map(str, unknown))}"}), 400
+    mode = data.get('mode', 'simulated')
+    if mode not in ('simulated', 'history'):
+        return jsonify({'success': False, 'error': 'mode 는 simulated 또는 history 입니다.'}), 400
+    try:
+        tickets = int(data.get('tickets', 1000000))
+        per_round = int(data.get('per_round', 100))
+        seed = data.get('seed')
+        seed = int(seed) if seed is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': '숫자 값이 올바르지 않습니다.'}), 400
+    total = tickets if mode == 'simulated' else per_round * len(DRAW_INDEX.rounds())
+    if tickets < 1 or per_round < 1 or total > SIMULATION_MAX_TICKETS:
+        return jsonify({'success': False,
+                        'error': f'번호 수는 1~{SIMULATION_MAX_TICKETS} 사이여야 합니다. (요청: {total})'}), 400
+    # 스레드가 있는 워커 프로세스에서 fork 하지 않도록 spawn 으로 풀을 만듦
+    results = run_simulations(strategies, mode, tickets, per_round, seed, mp_context='spawn')
+    return jsonify({'success': True, 'seed': seed, 'results': results})
+
+def main(argv=None):
+    """명령행 진입점 (인자 없이 실행하면 개발 서버, `serve` 는 운영용 서버 실행)"""
+    import argparse
+    parser = argparse.ArgumentParser(description='로또 번호 추천 서비스')
+    subparsers = parser.add_subparsers(dest='command')
+    
+    sync_parser = subparsers.add_parser('sync-draws', help='1회차부터 최신 회차까지 당첨번호 동기화')
+    sync_parser.add_argument('--workers', type=int, default=LOTTO_SYNC_WORKERS, help='동시 요청 수')
+    sync_parser.add_argument('--retries', type=int, default=3, help='회차별 재시도 횟수')
+    sync_parser.add_argument('--latest', type=int, default=None, help='마지막 회차 (기본: 추정 최신 회차)')
+    sync_parser.add_argument('--api-url', default=DHLOTTERY_API_URL, help='당첨번호 조회 API 주소')
+    sync_parser.add_argument('--interval', type=float, default=0,
+                             help='이 간격(초)으로 동기화와 채점을 반복 (0: 한 번만 실행)')
+    
+    serve_parser = subparsers.add_parser('serve', help='운영용 멀티 프로세스 서버 실행 (gunicorn)')
+    serve_parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'), help='바인딩 주소')
+    serve_parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '5001')), help='포트')
+    serve_parser.add_argument('--workers', type=int, default=None,
+                              help='워커 프로세스 수 (기본: WEB_CONCURRENCY 또는 2 * CPU + 1)')
+    serve_parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', '4')),
+                              help='워커당 스레드 수')
+    serve_parser.add_argument('--timeout', type=int, default=int(os.getenv('WEB_TIMEOUT', '180')),
+                              help='요청 처리 제한 시간(초)')
+    serve_parser.add_argument('--graceful-timeout', type=int, default=30, help='종료/재시작 시 요청 마무리 대기(초)')
+    serve_parser.add_argument('--max-requests', type=int, default=0, help='이만큼 처리한 워커는 교체 (0: 사용 안 함)')
+    serve_parser.add_argument('--pidfile', default=None, help='마스터 PID 파일 (kill -HUP 재시작용)')
+    
+    bench_parser = subparsers.add_parser('bench-grading', help='일괄 채점 성능 측정')
+    bench_parser.add_argument('--tickets', type=int, default=1000, help='번호 장 수')
+    bench_parser.add_argument('--rounds', type=int, default=100, help='회차 수 (기본 1000 × 100 = 10만 쌍)')
+    bench_parser.add_argument('--repeat', type=int, default=5, help='반복 횟수')
+    
+    simulate_parser = subparsers.add_parser('simulate', help='번호 생성 전략 시뮬레이션/백테스트')
+    simulate_parser.add_argument('--strategy', default=','.join(STRATEGIES),
+                                 help=f"쉼표로 구분한 전략 ({', '.join(STRATEGIES)})")
+    simulate_parser.add_argument('--mode', choices=['simulated', 'history'], default='simulated',
+                                 help='simulated: 무작위 추첨, history: 역대 회차 백테스트')
+    simulate_parser.add_argument('--tickets', type=int, default=1000000, help='simulated 모드의 번호 수')
+    simulate_parser.add_argument('--per-round', type=int, default=100, help='history 모드의 회차당 번호 수')
+    simulate_parser.add_argument('--seed', type=int, default=None, help='난수 시드 (같으면 같은 결과)')
+    simulate_parser.add_argument('--workers', type=int, default=SIMULATION_WORKERS, help='프로세스 수')
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == 'simulate':
+        strategies = [name.strip() for name in args.strategy.split(',') if name.strip()]
+        results = run_simulations(strategies, args.mode, args.tickets, args.per_round, args.seed, args.workers)
+        print(json.dumps({'seed': args.seed, 'results': results}, ensure_ascii=False, indent=2))
+        return 0
+    
+    if args.command == 'bench-grading':
+        print(json.dumps(benchmark_grading(args.tickets, args.rounds, args.repeat), ensure_ascii=False))
+        return 0
+    
+    if args.command == 'serve':
+        from server import serve
+        return serve(app, DRAW_INDEX, WINNING_INDEX, os.path.abspath(__file__),
+                     host=args.host, port=args.port, workers=args.workers, threads=args.threads,
+                     timeout=args.timeout, graceful_timeout=args.graceful_timeout,
+                     max_requests=args.max_requests, pidfile=args.pidfile,
+                     sync_interval=LOTTO_SYNC_INTERVAL_SECONDS)
+    
+    if args.command == 'sync-draws':
+        if args.interval:
+            run_sync_loop(DRAW_INDEX, lambda: args.latest or get_latest_round(),
+                          on_complete=TICKET_GRADER.grade_pending, interval=args.interval,
+                          api_url=args.api_url, max_workers=args.workers, retries=args.retries)
+            return 0
+        latest_round = args.latest or get_latest_round()
+        summary = sync_draw_history(DRAW_INDEX, latest_round, args.api_url,
+                                    max_workers=args.workers, retries=args.retries)
+        summary['graded'] = TICKET_GRADER.grade_pending()
+        print(json.dumps(summary, ensure_ascii=False))
+        return 0 if not summary['failed'] else 1
+    
+    # 디버그 리로더의 감시 프로세스에서는 동기화하지 않음
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_draw_sync_on_startup()
     app.run(host='0.0.0.0', port=5001, debug=True)
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncLoopThread:
+    """전용 스레드에서 계속 도는 asyncio 이벤트 루프
+
+    요청마다 이벤트 루프를 새로 만들고 닫는 대신, 프로세스당 하나의 루프에
+    코루틴을 제출(run_coroutine_threadsafe)해 여러 AI 협업 생성을 동시에
+    진행합니다. 루프 스레드는 처음 사용할 때 시작하므로 fork 이후의
+    워커 프로세스에서도 안전하게 다시 만들어집니다.
+    """
+
+    def __init__(self, name='ai-loop', max_workers=32):
+        self.name = name
+        self.max_workers = max_workers
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return self._loop
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            # asyncio.to_thread 로 실행되는 동기 SDK 호출이 공유하는 스레드 풀
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=self.max_workers,
+                                                         thread_name_prefix=f'{self.name}-io'))
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            thread = threading.Thread(target=run, name=self.name, daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop, self._thread, self._pid = loop, thread, os.getpid()
+            return loop
+
+    @property
+    def loop(self):
+        return self._ensure_started()
+
+    def submit(self, coro):
+        """코루틴을 루프에 제출하고 concurrent.futures.Future 반환"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    def run(self, coro, timeout=None):
+        """코루틴을 루프에서 실행하고 결과를 기다림 (호출 스레드만 대기)"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    def stop(self):
+        """루프 종료 (테스트/종료 시)"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = self._thread = self._pid = None
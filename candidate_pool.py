@@ -0,0 +1,133 @@
+import asyncio
+import random
+import threading
+import time
+
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 비동기 호출을 하나의 실행으로 합침
+
+    먼저 들어온 호출만 실제로 실행하고, 실행 중에 같은 키로 들어온 호출은
+    그 결과를 함께 기다립니다. 한 호출자가 취소되어도 공유 실행은 계속됩니다.
+    (하나의 이벤트 루프 안에서만 사용)
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.shared_calls = 0
+
+    async def do(self, key, coro_fn):
+        """(결과, 직접 실행 여부) 반환"""
+        future = self._inflight.get(key)
+        leader = future is None
+        if leader:
+            future = asyncio.ensure_future(coro_fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._inflight.pop(key, None))
+        else:
+            self.shared_calls += 1
+        return await asyncio.shield(future), leader
+
+    def in_flight(self, key):
+        return key in self._inflight
+
+
+class RoundCandidatePool:
+    """회차별 AI 추천 후보 풀 (API 키 주인별)
+
+    AI에게 보내는 프롬프트는 사용자와 무관하므로, 한 번 받은 후보를 같은 회차
+    동안 같은 사용자의 다음 요청들이 나눠 씁니다. 후보는 호출 비용을 낸 키
+    주인(사용자)의 풀에만 넣으므로 다른 사용자의 키로 받은 후보를 쓰지 않습니다.
+    이미 받은 후보는 다시 주지 않아 요청마다 최종 번호가 겹치지 않도록 하고,
+    회차가 바뀌면 풀을 비웁니다.
+    """
+
+    def __init__(self, max_size=100, max_age_seconds=6 * 3600, max_owners=1024):
+        self.max_size = max_size
+        self.max_age_seconds = max_age_seconds
+        self.max_owners = max_owners
+        self.round_number = None
+        self._entries = {}  # 키 주인 -> [{'combo': (...), 'source': 'GPT-1', 'added_at': ...}]
+        self._served = {}  # 키 주인 -> {combo, ...}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _roll(self, round_number):
+        # 회차가 바뀌면 이전 회차 후보와 제공 기록을 모두 버림
+        if self.round_number != round_number:
+            self.round_number = round_number
+            self._entries = {}
+            self._served = {}
+
+    def _fresh_entries(self, owner):
+        now = time.time()
+        entries = [e for e in self._entries.get(owner, []) if now - e['added_at'] < self.max_age_seconds]
+        if owner in self._entries:
+            self._entries[owner] = entries
+        return entries
+
+    def add(self, round_number, owner, source_prefix, combos):
+        """owner 의 키로 받은 AI 응답 후보 추가 (이미 있는 조합은 건너뜀)"""
+        if not combos:
+            return
+        with self._lock:
+            self._roll(round_number)
+            if owner not in self._entries and len(self._entries) >= self.max_owners:
+                # 가장 오래전에 풀이 생긴 사용자부터 버림
+                oldest = next(iter(self._entries))
+                self._entries.pop(oldest)
+                self._served.pop(oldest, None)
+            entries = self._entries.setdefault(owner, [])
+            existing = {e['combo'] for e in entries}
+            for i, combo in enumerate(combos):
+                key = tuple(sorted(combo))
+                if key in existing:
+                    continue
+                existing.add(key)
+                entries.append({'combo': key, 'source': f"{source_prefix}-{i+1}", 'added_at': time.time()})
+            if len(entries) > self.max_size:
+                self._entries[owner] = entries[-self.max_size:]
+
+    def available(self, round_number, owner):
+        """owner 가 아직 받지 않은 후보 수"""
+        with self._lock:
+            self._roll(round_number)
+            served = self._served.get(owner, set())
+            return sum(1 for e in self._fresh_entries(owner) if e['combo'] not in served)
+
+    def size(self, round_number, owner):
+        with self._lock:
+            self._roll(round_number)
+            return len(self._fresh_entries(owner))
+
+    def take(self, round_number, owner, count):
+        """owner 가 아직 받지 않은 후보를 무작위로 최대 count개 꺼냄 ([(조합, 출처), ...])"""
+        with self._lock:
+            self._roll(round_number)
+            served = self._served.get(owner, set())
+            fresh = [e for e in self._fresh_entries(owner) if e['combo'] not in served]
+            picked = random.sample(fresh, min(count, len(fresh)))
+            if picked:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return [(list(e['combo']), e['source']) for e in picked]
+
+    def mark_served(self, round_number, owner, combos):
+        """owner 에게 제공한 후보 기록 (다음 요청에서 제외)"""
+        with self._lock:
+            self._roll(round_number)
+            served = self._served.setdefault(owner, set())
+            served.update(tuple(sorted(c)) for c in combos)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'round': self.round_number,
+                'candidates': sum(len(entries) for entries in self._entries.values()),
+                'owners': len(self._entries),
+                'users_served': len(self._served),
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,293 @@
+import os
+import struct
+import threading
+from math import comb
+
+import numpy as np
+
+# 6/45 조합 전체 개수 = 8,145,060
+TOTAL_COMBINATIONS = comb(45, 6)
+BITMAP_BYTES = (TOTAL_COMBINATIONS + 7) // 8
+
+# BINOM[n, k] = C(n, k) (n: 0~45, k: 0~6)
+BINOM = np.array([[comb(n, k) for k in range(7)] for n in range(46)], dtype=np.int64)
+
+# POPCOUNT16[x] = x(16비트)의 켜진 비트 수 (45비트 마스크는 16비트씩 세 번 조회)
+POPCOUNT16 = np.zeros(1 << 16, dtype=np.uint8)
+for _bit in range(16):
+    POPCOUNT16 += ((np.arange(1 << 16) >> _bit) & 1).astype(np.uint8)
+del _bit
+
+BITMAP_MAGIC = b'LTWB'
+BITMAP_VERSION = 1
+BITMAP_HEADER = struct.Struct('<4sHHII')  # magic, version, reserved, 색인된 회차 수, 마지막 회차
+
+
+def combo_rank(numbers):
+    """정렬된 6개 번호 조합의 colex 순위 (0 ~ C(45,6)-1)"""
+    return sum(comb(n - 1, i + 1) for i, n in enumerate(sorted(numbers)))
+
+
+def combo_ranks(combos):
+    """N×6 번호 배열의 colex 순위를 한 번에 계산"""
+    combos = np.sort(np.asarray(combos, dtype=np.int64).reshape(-1, 6), axis=1) - 1
+    return BINOM[combos, np.arange(1, 7)].sum(axis=1)
+
+
+def combos_from_ranks(ranks, size=6):
+    """colex 순위 배열을 N×size 번호 배열로 변환 (combo_ranks 의 역함수, size <= 6)
+
+    큰 자리부터 C(c, k) <= 남은 순위 인 가장 큰 c 를 BINOM 열에서 이진 탐색으로
+    찾으므로 순위 N개를 size 번의 벡터 연산으로 풉니다. 순위가 C(n, size) 보다
+    작으면 번호는 모두 n 이하입니다.
+    """
+    remaining = np.asarray(ranks, dtype=np.int64).copy()
+    combos = np.empty((len(remaining), size), dtype=np.int64)
+    for k in range(size, 0, -1):
+        c = np.searchsorted(BINOM[:, k], remaining, side='right') - 1
+        combos[:, k - 1] = c + 1
+        remaining -= BINOM[c, k]
+    return combos
+
+
+def sample_ranks(count, excluded_ranks=(), rng=None):
+    """제외 순위를 뺀 조합 공간에서 서로 다른 순위 count 개를 균등하게 뽑음
+
+    제외 순위 E개를 뺀 [0, C(45,6) - E) 구간에서 중복 없이 뽑은 뒤, 각 값을
+    그보다 앞선 제외 순위 수만큼 밀어 실제 순위로 옮깁니다. 다시 뽑는 일이
+    없으므로 작업량은 count 와 E 에만 비례합니다.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    excluded = np.unique(np.asarray(excluded_ranks, dtype=np.int64))
+    available = TOTAL_COMBINATIONS - len(excluded)
+    if count > available:
+        raise ValueError(f"만들 수 있는 조합은 최대 {available}개입니다.")
+    picked = rng.choice(available, size=count, replace=False, shuffle=True).astype(np.int64)
+    # 제외 순위 i 번째 앞에 있는 빈 칸 수 = excluded[i] - i (비감소) 로 밀어낼 개수를 찾음
+    return picked + np.searchsorted(excluded - np.arange(len(excluded)), picked, side='right')
+
+
+def random_bonus_numbers(combos, rng=None):
+    """N×6 (정렬된) 번호마다 겹치지 않는 보너스 번호 하나씩"""
+    rng = rng if rng is not None else np.random.default_rng()
+    combos = np.asarray(combos, dtype=np.int64)
+    bonus = rng.integers(1, 40, size=len(combos))  # 남은 39개 중 몇 번째인지
+    for k in range(6):
+        bonus += bonus >= combos[:, k]
+    return bonus
+
+
+def combo_masks(combos):
+    """N×k 번호 배열을 45비트 마스크 배열로 변환 (번호 n -> 비트 n-1)"""
+    combos = np.asarray(combos, dtype=np.uint64)
+    return np.bitwise_or.reduce(np.left_shift(np.uint64(1), combos - np.uint64(1)), axis=-1)
+
+
+def popcount(masks):
+    """45비트 마스크 배열의 켜진 비트 수 (uint8 배열)"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    low = np.uint64(0xFFFF)
+    return (POPCOUNT16[masks & low] + POPCOUNT16[(masks >> np.uint64(16)) & low]
+            + POPCOUNT16[(masks >> np.uint64(32)) & low])
+
+
+def pairwise_overlaps(combos):
+    """한 묶음 안의 번호끼리 겹치는 번호 수 (N×N, 대각선은 6)"""
+    masks = combo_masks(combos)
+    return popcount(masks[:, None] & masks[None, :])
+
+
+class DrawMaskIndex:
+    """역대 회차 당첨번호(보너스 제외)를 45비트 마스크로 보관하는 색인
+
+    후보 묶음과 전체 회차의 겹치는 번호 수를 AND + popcount 한 번으로
+    계산합니다. 1등 조합과 완전히 같은지는 WinningComboIndex 가, 5개 이상
+    겹치는 것처럼 '가까운' 조합인지는 이 색인이 판단합니다.
+    """
+
+    def __init__(self, draw_index):
+        self.draw_index = draw_index
+        self._rounds = None
+        self._masks = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._masks is not None:
+            return
+        with self._lock:
+            if self._masks is not None:
+                return
+            rounds, matrix = self.draw_index.draw_matrix()
+            self._rounds = np.asarray(rounds, dtype=np.int64)
+            self._masks = combo_masks(matrix[:, :6]) if len(rounds) else np.zeros(0, dtype=np.uint64)
+
+    def on_new_draw(self, round_number, entry):
+        """새 회차 마스크 추가 (DrawIndex 리스너)"""
+        if self._masks is None:
+            return
+        with self._lock:
+            if self._masks is None or (self._rounds == int(round_number)).any():
+                return  # load() 가 이미 읽은 회차
+            self._rounds = np.append(self._rounds, int(round_number))
+            self._masks = np.append(self._masks, combo_masks([entry['numbers']]))
+
+    def reset(self):
+        """회차가 지워지거나 바뀌면 마스크를 버림 (다음 조회 때 다시 구성, DrawIndex 리셋 리스너)"""
+        with self._lock:
+            self._rounds = None
+            self._masks = None
+
+    def overlaps(self, combos):
+        """후보 × 회차 겹치는 번호 수 행렬 (uint8)"""
+        self.load()
+        masks = combo_masks(np.asarray(combos).reshape(-1, 6))
+        return popcount(masks[:, None] & self._masks[None, :])
+
+    def max_overlaps(self, combos):
+        """후보별 (역대 회차와 가장 많이 겹친 번호 수 배열, 그 회차 배열)"""
+        overlaps = self.overlaps(combos)
+        if overlaps.shape[1] == 0:
+            zeros = np.zeros(len(overlaps), dtype=np.int64)
+            return zeros, zeros
+        best = overlaps.argmax(axis=1)
+        return overlaps[np.arange(len(overlaps)), best].astype(np.int64), self._rounds[best]
+
+    def stats(self):
+        self.load()
+        return {'rounds': len(self._masks), 'bytes': int(self._masks.nbytes)}
+
+
+class WinningComboIndex:
+    """역대 1등 당첨 조합 비트맵 색인
+
+    6/45 조합 공간 전체(C(45,6))를 colex 순위로 번호 매기고, 당첨된 조합의
+    비트만 켜 둔 약 1MB 비트맵으로 포함 여부를 O(1)에 판단합니다.
+    비트맵은 파일로 보관하며 새 회차가 추가되면 해당 바이트만 갱신합니다.
+    """
+
+    def __init__(self, draw_index, bitmap_file):
+        self.draw_index = draw_index
+        self.bitmap_file = bitmap_file
+        self._bitmap = None
+        self._rounds_indexed = 0
+        self._latest_round = 0
+        self._ranks = None  # (색인된 회차 수, 당첨 순위 배열)
+        self._lock = threading.Lock()
+
+    def load(self):
+        """비트맵 파일 로드 (회차 수가 맞지 않으면 전체 재구성)"""
+        if self._bitmap is not None:
+            return
+        with self._lock:
+            if self._bitmap is not None:
+                return
+            rounds, matrix = self.draw_index.draw_matrix()
+            if self._load_file(len(rounds)):
+                return
+            bitmap = np.zeros(BITMAP_BYTES, dtype=np.uint8)
+            if len(rounds):
+                ranks = combo_ranks(matrix[:, :6])
+                np.bitwise_or.at(bitmap, ranks >> 3, (1 << (ranks & 7)).astype(np.uint8))
+            self._bitmap = bitmap
+            self._rounds_indexed = len(rounds)
+            self._latest_round = int(rounds[-1]) if len(rounds) else 0
+            self._save_file()
+            print(f"당첨 조합 비트맵 색인 구성 완료: {self._rounds_indexed}개 회차")
+
+    def _load_file(self, expected_rounds):
+        if not os.path.exists(self.bitmap_file):
+            return False
+        try:
+            with open(self.bitmap_file, 'rb') as f:
+                magic, version, _, rounds_indexed, latest_round = BITMAP_HEADER.unpack(f.read(BITMAP_HEADER.size))
+                if magic != BITMAP_MAGIC or version != BITMAP_VERSION or rounds_indexed != expected_rounds:
+                    return False
+                bitmap = np.fromfile(f, dtype=np.uint8, count=BITMAP_BYTES)
+            if len(bitmap) != BITMAP_BYTES:
+                return False
+        except Exception as e:
+            print(f"비트맵 색인 로드 실패: {e}")
+            return False
+        self._bitmap = bitmap
+        self._rounds_indexed = rounds_indexed
+        self._latest_round = latest_round
+        return True
+
+    def _header(self):
+        return BITMAP_HEADER.pack(BITMAP_MAGIC, BITMAP_VERSION, 0, self._rounds_indexed, self._latest_round)
+
+    def _save_file(self):
+        try:
+            os.makedirs(os.path.dirname(self.bitmap_file) or '.', exist_ok=True)
+            tmp_file = self.bitmap_file + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                f.write(self._header())
+                f.write(self._bitmap.tobytes())
+            os.replace(tmp_file, self.bitmap_file)
+        except Exception as e:
+            print(f"비트맵 색인 저장 실패: {e}")
+
+    def on_new_draw(self, round_number, entry):
+        """새 회차 추가 시 해당 비트와 헤더만 갱신 (DrawIndex 리스너)"""
+        if self._bitmap is None:
+            # 아직 로드 전이면 첫 조회 때 최신 회차까지 포함해 구성됨
+            return
+        rank = combo_rank(entry['numbers'])
+        with self._lock:
+            if self._bitmap is None or self._bitmap[rank >> 3] & (1 << (rank & 7)):
+                return  # load() 가 이미 읽은 회차
+            self._bitmap[rank >> 3] |= np.uint8(1 << (rank & 7))
+            self._rounds_indexed += 1
+            self._latest_round = max(self._latest_round, int(round_number))
+            try:
+                with open(self.bitmap_file, 'r+b') as f:
+                    f.write(self._header())
+                    f.seek(BITMAP_HEADER.size + (rank >> 3))
+                    f.write(bytes([int(self._bitmap[rank >> 3])]))
+            except Exception:
+                self._save_file()
+
+    def reset(self):
+        """회차가 지워지거나 바뀌면 비트맵과 파일을 버림 (다음 조회 때 다시 구성, DrawIndex 리셋 리스너)"""
+        with self._lock:
+            self._bitmap = None
+            self._ranks = None
+            try:
+                os.remove(self.bitmap_file)
+            except FileNotFoundError:
+                pass
+
+    def contains(self, numbers):
+        """조합이 과거 1등 당첨번호인지"""
+        self.load()
+        rank = combo_rank(numbers)
+        return bool(self._bitmap[rank >> 3] & (1 << (rank & 7)))
+
+    def contains_ranks(self, ranks):
+        """colex 순위 배열에 대한 당첨 여부 (bool 배열)"""
+        self.load()
+        ranks = np.asarray(ranks, dtype=np.int64)
+        return ((self._bitmap[ranks >> 3] >> (ranks & 7)) & 1).astype(bool)
+
+    def contains_many(self, combos):
+        """N×6 번호 배열에 대한 당첨 여부 (bool 배열)"""
+        return self.contains_ranks(combo_ranks(combos))
+
+    def ranks(self):
+        """당첨 조합의 colex 순위 (정렬된 배열, 새 회차가 들어오면 다시 계산)"""
+        self.load()
+        cached = self._ranks
+        if cached is not None and cached[0] == self._rounds_indexed:
+            return cached[1]
+        ranks = np.flatnonzero(np.unpackbits(self._bitmap, bitorder='little'))
+        self._ranks = (self._rounds_indexed, ranks)
+        return ranks
+
+    def stats(self):
+        self.load()
+        return {
+            'rounds_indexed': self._rounds_indexed,
+            'latest_round': self._latest_round,
+            'winning_combinations': int(np.unpackbits(self._bitmap).sum()),
+            'bitmap_bytes': BITMAP_BYTES
+        }
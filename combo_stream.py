@@ -0,0 +1,95 @@
+class ComboStreamParser:
+    """AI 응답 텍스트 조각에서 번호 조합 배열을 완성되는 즉시 뽑아내는 증분 파서
+
+    전체 응답을 기다렸다가 첫 '{' 부터 마지막 '}' 까지 잘라 json.loads 하는 대신,
+    들어오는 글자마다 대괄호 깊이를 추적해 숫자만 담긴 가장 안쪽 배열이 닫히는
+    순간 조합으로 꺼냅니다. JSON 문자열 안의 괄호나 앞뒤 설명 문장은 무시합니다.
+    """
+
+    def __init__(self, validator, limit=5):
+        self.validator = validator
+        self.limit = limit
+        self.combinations = []
+        self._seen = set()
+        self._stack = []  # 열린 배열별 내용 버퍼
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def done(self):
+        return len(self.combinations) >= self.limit
+
+    def feed(self, text):
+        """텍스트 조각을 넣고 이번 조각에서 새로 완성된 유효 조합 목록 반환"""
+        found = []
+        for ch in text or '':
+            if self.done:
+                break
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+                if self._stack:
+                    self._stack[-1].append('"')
+            elif ch == '[':
+                if self._stack:
+                    self._stack[-1].append('[')
+                self._stack.append([])
+            elif ch == ']':
+                if not self._stack:
+                    continue
+                combo = self._parse_leaf(''.join(self._stack.pop()))
+                if combo is not None:
+                    found.append(combo)
+            elif self._stack:
+                self._stack[-1].append(ch)
+        return found
+
+    def _parse_leaf(self, body):
+        # 다른 배열이나 문자열을 담은 배열은 조합이 아님
+        if '[' in body or '"' in body:
+            return None
+        try:
+            numbers = [int(part) for part in body.split(',')]
+        except ValueError:
+            return None
+        if not self.validator(numbers):
+            return None
+        key = tuple(sorted(numbers))
+        if key in self._seen:
+            return None
+        self._seen.add(key)
+        self.combinations.append(numbers)
+        return numbers
+
+
+def collect_stream_combinations(chunks, validator, limit=5, on_combo=None, close=None):
+    """텍스트 조각 이터레이터를 읽으며 유효 조합이 limit 개 모이면 바로 멈춤
+
+    on_combo(조합)는 조합이 완성될 때마다 호출되고, close() 는 끝까지 읽었든
+    일찍 멈췄든 마지막에 호출되어 스트림(HTTP 연결)을 닫습니다.
+    반환값: (조합 목록, 일찍 멈췄는지)
+    """
+    parser = ComboStreamParser(validator, limit)
+    stopped_early = False
+    try:
+        for text in chunks:
+            for combo in parser.feed(text):
+                if on_combo is not None:
+                    on_combo(combo)
+            if parser.done:
+                stopped_early = True
+                break
+    finally:
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                print(f"AI 응답 스트림 닫기 실패: {e}")
+    return parser.combinations, stopped_early
@@ -0,0 +1,126 @@
+import json
+import mmap
+import os
+import pickle
+import struct
+
+import numpy as np
+
+# 파일 구조: [헤더 16바이트][회차당 7바이트(번호 6개 + 보너스)][회차당 10바이트 추첨일]
+# 행 번호 = 회차 - first_round, 비어 있는 회차는 0으로 채워짐
+ARCHIVE_MAGIC = b'LTDA'
+ARCHIVE_VERSION = 1
+HEADER = struct.Struct('<4sHHII')  # magic, version, reserved, first_round, count
+ROW_WIDTH = 7
+DATE_WIDTH = 10
+
+
+class DrawArchive:
+    """메모리 매핑(mmap)으로 여는 회차별 당첨번호 uint8 행렬
+
+    파일을 복사하지 않고 페이지 캐시를 그대로 참조하므로 여러 워커가
+    같은 물리 메모리를 공유합니다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.first_round = 1
+        self.count = 0
+        self.matrix = np.zeros((0, ROW_WIDTH), dtype=np.uint8)
+        self.dates = np.zeros(0, dtype='S10')
+        self._file = None
+        self._mmap = None
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            self._open()
+
+    def _open(self):
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, first_round, count = HEADER.unpack_from(self._mmap, 0)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"지원하지 않는 아카이브 형식입니다: {self.path}")
+        self.first_round = first_round
+        self.count = count
+        self.matrix = np.frombuffer(self._mmap, dtype=np.uint8, count=count * ROW_WIDTH,
+                                    offset=HEADER.size).reshape(count, ROW_WIDTH)
+        self.dates = np.frombuffer(self._mmap, dtype='S10', count=count,
+                                   offset=HEADER.size + count * ROW_WIDTH)
+
+    def close(self):
+        # numpy 뷰가 남아 있으면 mmap 을 닫을 수 없으므로 참조만 정리
+        self.matrix = np.zeros((0, ROW_WIDTH), dtype=np.uint8)
+        self.dates = np.zeros(0, dtype='S10')
+        self.count = 0
+        self._mmap = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def get(self, round_number):
+        """특정 회차 (번호, 보너스, 추첨일), 없으면 None"""
+        row = round_number - self.first_round
+        if row < 0 or row >= self.count or not self.matrix[row, 0]:
+            return None
+        values = self.matrix[row].tolist()
+        return values[:6], values[6], self.dates[row].decode('ascii')
+
+    def rounds(self):
+        """저장된 회차 번호 배열"""
+        return np.flatnonzero(self.matrix[:, 0]) + self.first_round
+
+    def __len__(self):
+        return int(np.count_nonzero(self.matrix[:, 0]))
+
+
+def write_archive(path, draws):
+    """{회차: (번호 6개, 보너스, 추첨일)} 를 아카이브 파일로 원자적으로 저장"""
+    first_round = min(draws) if draws else 1
+    count = (max(draws) - first_round + 1) if draws else 0
+    matrix = np.zeros((count, ROW_WIDTH), dtype=np.uint8)
+    dates = np.zeros(count, dtype='S10')
+    for round_number, (numbers, bonus, date) in draws.items():
+        row = round_number - first_round
+        matrix[row, :6] = sorted(numbers)
+        matrix[row, 6] = bonus
+        dates[row] = (date or '').encode('ascii')[:DATE_WIDTH]
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0, first_round, count))
+        f.write(matrix.tobytes())
+        f.write(dates.tobytes())
+    os.replace(tmp_path, path)
+
+
+def _normalize_entries(entries):
+    draws = {}
+    for round_key, entry in entries.items():
+        numbers = entry.get('numbers')
+        if numbers and len(numbers) == 6 and entry.get('bonus'):
+            draws[int(round_key)] = (list(numbers), int(entry['bonus']), entry.get('date', ''))
+    return draws
+
+
+def import_json_cache(path):
+    """기존 lotto_cache.json 에서 회차 데이터 읽기"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return _normalize_entries(json.load(f).get('data', {}))
+    except Exception as e:
+        print(f"JSON 캐시 가져오기 실패: {e}")
+        return {}
+
+
+def import_legacy_pickle(path):
+    """기존 lotto_data.pkl ({'data': {회차: {...}}, 'last_updated': {...}}) 에서 회차 데이터 읽기"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'rb') as f:
+            return _normalize_entries(pickle.load(f).get('data', {}))
+    except Exception as e:
+        print(f"pickle 데이터 가져오기 실패: {e}")
+        return {}
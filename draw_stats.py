@@ -0,0 +1,139 @@
+import threading
+
+import numpy as np
+
+
+class DrawStats:
+    """역대 당첨번호 통계 (보너스 제외)
+
+    - 번호별 출현 횟수
+    - 45×45 동시 출현 행렬 (대각선 = 출현 횟수)
+    - 번호별 마지막 출현 회차 (미출현 기간 = 최신 회차 - 마지막 출현 회차)
+    - 최근 window 개 회차 안의 출현 횟수
+
+    처음 조회할 때 draw_matrix() 로 한 번 만들고, 이후에는 DrawIndex 리스너로
+    새 회차의 번호 6개(쌍 15개)만 더하므로 회차마다 전체를 다시 계산하지 않습니다.
+    조회 결과는 버전별로 한 번만 만들어 두고 그대로 돌려줍니다.
+    """
+
+    def __init__(self, draw_index, window=52):
+        self.draw_index = draw_index
+        self.window = window
+        self._counts = None
+        self._pairs = None
+        self._last_seen = None
+        self._recent_counts = None
+        self._recent = {}  # 최근 window 구간 회차 -> 번호 배열
+        self._included = set()  # 반영한 회차 (알림이 load() 와 겹쳐도 두 번 세지 않도록)
+        self._rounds = 0
+        self._latest_round = 0
+        self._version = 0
+        self._snapshot = (None, None)  # (버전, 조회 결과)
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._counts is not None:
+            return
+        with self._lock:
+            if self._counts is not None:
+                return
+            rounds, matrix = self.draw_index.draw_matrix()
+            numbers = np.asarray(matrix[:, :6], dtype=np.int64)
+            onehot = np.zeros((len(numbers), 46), dtype=np.float32)
+            onehot[np.arange(len(numbers))[:, None], numbers] = 1
+            self._counts = onehot.sum(axis=0).astype(np.int64)
+            self._pairs = (onehot.T @ onehot).astype(np.int64)
+            self._last_seen = np.zeros(46, dtype=np.int64)
+            np.maximum.at(self._last_seen, numbers, np.repeat(np.asarray(rounds, dtype=np.int64), 6).reshape(-1, 6))
+            self._included = set(np.asarray(rounds).tolist())
+            self._rounds = len(rounds)
+            self._latest_round = int(rounds[-1]) if len(rounds) else 0
+            self._recent_counts = np.zeros(46, dtype=np.int64)
+            self._recent = {}
+            for round_number, row in zip(rounds.tolist(), numbers):
+                if round_number > self._latest_round - self.window:
+                    self._recent[round_number] = row
+                    self._recent_counts[row] += 1
+            self._version += 1
+
+    def on_new_draw(self, round_number, entry):
+        """새 회차 반영 (DrawIndex 리스너, 번호 6개와 쌍 15개만 갱신)"""
+        if self._counts is None:
+            return
+        round_number = int(round_number)
+        row = np.array(sorted(entry['numbers']), dtype=np.int64)
+        with self._lock:
+            if self._counts is None or round_number in self._included:
+                return
+            self._included.add(round_number)
+            self._counts[row] += 1
+            self._pairs[row[:, None], row[None, :]] += 1
+            self._last_seen[row] = np.maximum(self._last_seen[row], round_number)
+            self._rounds += 1
+            if round_number > self._latest_round:
+                self._latest_round = round_number
+                # 구간을 벗어난 회차를 최근 출현 횟수에서 뺌
+                for old_round in [r for r in self._recent if r <= round_number - self.window]:
+                    self._recent_counts[self._recent.pop(old_round)] -= 1
+            if round_number > self._latest_round - self.window:
+                self._recent[round_number] = row
+                self._recent_counts[row] += 1
+            self._version += 1
+
+    def reset(self):
+        """회차가 지워지거나 바뀌면 통계를 버림 (다음 조회 때 다시 계산, DrawIndex 리셋 리스너)"""
+        with self._lock:
+            self._counts = None
+
+    def arrays(self):
+        """(출현 횟수[46], 동시 출현[46×46], 미출현 기간[46], 최근 출현 횟수[46]) 사본 (0번 칸은 사용 안 함)"""
+        self.load()
+        with self._lock:
+            gaps = self._latest_round - self._last_seen  # 한 번도 안 나온 번호는 최신 회차 수
+            return self._counts.copy(), self._pairs.copy(), gaps, self._recent_counts.copy()
+
+    def snapshot(self, top_pairs=20):
+        """조회 API 응답 (버전이 같으면 만들어 둔 결과를 그대로 반환)"""
+        self.load()
+        cached_version, cached = self._snapshot
+        if cached_version == (self._version, top_pairs):
+            return cached
+        version = (self._version, top_pairs)
+        counts, pairs, gaps, recent = self.arrays()
+        upper = np.triu(pairs[1:, 1:], k=1)
+        order = np.argsort(upper, axis=None)[::-1][:top_pairs]
+        rows, cols = np.unravel_index(order, upper.shape)
+        snapshot = {
+            'rounds': self._rounds,
+            'latest_round': self._latest_round,
+            'window': self.window,
+            'frequency': {n: int(counts[n]) for n in range(1, 46)},
+            'recent_frequency': {n: int(recent[n]) for n in range(1, 46)},
+            'gap': {n: int(gaps[n]) for n in range(1, 46)},
+            'top_pairs': [[int(a) + 1, int(b) + 1, int(upper[a, b])] for a, b in zip(rows, cols)]
+        }
+        self._snapshot = (version, snapshot)
+        return snapshot
+
+    def pair_counts(self, number):
+        """한 번호와 다른 번호들의 동시 출현 횟수 {번호: 횟수}"""
+        self.load()
+        with self._lock:
+            row = self._pairs[number].copy()
+        return {n: int(row[n]) for n in range(1, 46) if n != number}
+
+    def prompt_summary(self, top=8):
+        """AI 프롬프트에 넣을 통계 요약 문장"""
+        stats = self.snapshot()
+        if not stats['rounds']:
+            return ''
+        by = lambda key: sorted(range(1, 46), key=lambda n: (-stats[key][n], n))[:top]
+        hot = ', '.join(f"{n}({stats['recent_frequency'][n]}회)" for n in by('recent_frequency'))
+        overall = ', '.join(f"{n}({stats['frequency'][n]}회)" for n in by('frequency'))
+        cold = ', '.join(f"{n}({stats['gap'][n]}회차)" for n in by('gap'))
+        pairs = ', '.join(f"{a}-{b}({count}회)" for a, b, count in stats['top_pairs'][:5])
+        return (f"[참고 통계: 1~{stats['latest_round']}회차 {stats['rounds']}회 추첨, 보너스 제외]\n"
+                f"- 최근 {stats['window']}회차 자주 나온 번호: {hot}\n"
+                f"- 전체 기간 자주 나온 번호: {overall}\n"
+                f"- 오래 나오지 않은 번호(미출현 기간): {cold}\n"
+                f"- 함께 자주 나온 번호 쌍: {pairs}")
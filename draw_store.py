@@ -0,0 +1,398 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows 등: 프로세스 간 잠금 없이 동작
+    fcntl = None
+
+import numpy as np
+
+from draw_archive import DrawArchive, write_archive, import_json_cache, import_legacy_pickle
+
+
+class DrawIndex:
+    """회차별 로또 당첨번호 인메모리 인덱스
+
+    프로세스 시작 시 바이너리 아카이브(mmap)와 추가 전용 저널을 한 번만 읽어
+    회차 번호로 O(1)에 응답합니다. 새 회차는 저널에 한 줄씩 추가하고,
+    저널이 일정 크기를 넘으면 아카이브로 합쳐(compaction) 저널을 비웁니다.
+    아카이브가 없으면 기존 JSON 캐시와 pickle 파일에서 가져와 만듭니다.
+
+    여러 프로세스(gunicorn 워커, sync-draws 작업)가 같은 파일을 쓰므로 저널
+    추가와 compaction 은 잠금 파일(<저널>.lock)의 fcntl.flock 배타 잠금 안에서
+    다른 프로세스가 쓴 저널 꼬리를 먼저 반영한 뒤 진행합니다.
+
+    추첨이 끝난 회차의 당첨번호는 바뀌지 않으므로 한 번 저장된 회차는
+    만료시키지 않습니다. 조회에 실패한 회차(아직 발표 전인 최신 회차 등)만
+    메모리에 기록해 두었다가 retry_seconds 이후 다시 조회하도록 합니다.
+
+    clear()/replace_all() 또는 다른 프로세스의 같은 작업으로 이미 있던 회차가
+    사라지거나 바뀌면 subscribe_reset() 으로 등록한 리스너를 불러 파생 색인을
+    처음부터 다시 만들게 합니다.
+    """
+
+    def __init__(self, archive_file, journal_file, legacy_files=(), compact_threshold=200, retry_seconds=600):
+        self.archive_file = archive_file
+        self.journal_file = journal_file
+        self.legacy_files = legacy_files
+        self.compact_threshold = compact_threshold
+        self.retry_seconds = retry_seconds
+        self._archive = None
+        self._overlay = {}  # 아카이브 이후 저널로 추가된 회차
+        self._failed = {}
+        self._journal_entries = 0
+        self._journal_offset = 0
+        self._archive_stamp = None  # 읽어 둔 아카이브 파일의 (inode, 수정 시각)
+        self._loaded = False
+        self._listeners = []
+        self._reset_listeners = []
+        self._reset_pending = False
+        self._lock = threading.RLock()
+
+    # 로드 ---------------------------------------------------------------
+    def load(self):
+        """아카이브 + 저널을 읽어 인덱스 구성 (최초 1회)"""
+        with self._lock:
+            if self._loaded:
+                return
+            self._load_locked()
+
+    def _load_locked(self, import_legacy=True):
+        self._overlay = {}
+        self._journal_entries = 0
+        self._journal_offset = 0
+        if import_legacy and not os.path.exists(self.archive_file):
+            self._import_legacy()
+        try:
+            self._archive = DrawArchive(self.archive_file)
+        except Exception as e:
+            print(f"아카이브 로드 실패: {e}")
+            self._archive = DrawArchive('')
+        self._archive_stamp = self._file_stamp(self.archive_file)
+        self._replay_journal()
+        self._loaded = True
+        print(f"로또 회차 인덱스 로드 완료: {len(self._archive) + len(self._overlay)}개 회차")
+
+    def _import_legacy(self):
+        """기존 JSON 캐시 / pickle 파일을 아카이브로 변환"""
+        draws = {}
+        for path in self.legacy_files:
+            loader = import_legacy_pickle if path.endswith('.pkl') else import_json_cache
+            for round_number, draw in loader(path).items():
+                draws.setdefault(round_number, draw)
+        if draws:
+            write_archive(self.archive_file, draws)
+            print(f"기존 캐시에서 {len(draws)}개 회차를 아카이브로 변환했습니다.")
+
+    @staticmethod
+    def _file_stamp(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    @contextmanager
+    def _file_lock(self, shared=False):
+        """저널/아카이브 변경을 다른 프로세스와 직렬화하는 flock (읽기는 shared)"""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.journal_file) or '.', exist_ok=True)
+        with open(self.journal_file + '.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _replay_journal(self):
+        """저널에서 아직 반영하지 않은 줄만 읽어 인덱스에 반영 (새로 반영된 회차 목록 반환)"""
+        added = []
+        if self._file_stamp(self.archive_file) != self._archive_stamp:
+            # 다른 프로세스가 아카이브를 새로 쓰거나(compaction/전체 교체) 지운 경우 → 전체 재로드
+            return self._reload_locked()
+        if not os.path.exists(self.journal_file):
+            return added
+        try:
+            size = os.path.getsize(self.journal_file)
+            if size < self._journal_offset:
+                # 다른 프로세스가 저널을 비운 경우 → 전체 재로드
+                return self._reload_locked()
+            if size == self._journal_offset:
+                return added
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                f.seek(self._journal_offset)
+                for line in f:
+                    if not line.endswith('\n'):
+                        # 기록 중인 줄은 다음 번에 다시 읽음
+                        break
+                    self._journal_offset += len(line.encode('utf-8'))
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    round_number = int(entry.pop('round'))
+                    if self._lookup(round_number) is None:
+                        added.append(round_number)
+                    self._overlay[round_number] = entry
+                    self._journal_entries += 1
+        except Exception as e:
+            print(f"저널 로드 실패: {e}")
+        return added
+
+    def _reload_locked(self):
+        """파일에서 다시 읽고 새로 생긴 회차 목록 반환
+
+        다른 프로세스가 지운 아카이브를 기존 캐시 파일에서 다시 만들지 않도록
+        이전 형식 가져오기는 하지 않습니다. 있던 회차가 사라지거나 바뀌었으면
+        (다른 프로세스의 clear/replace_all) 다음 알림에서 리셋 리스너를 부릅니다.
+        """
+        before = {r: self._lookup(r) for r in self._rounds_locked()}
+        self._load_locked(import_legacy=False)
+        for round_number, entry in before.items():
+            current = self._lookup(round_number)
+            if (current is None or sorted(current['numbers']) != sorted(entry['numbers'])
+                    or current['bonus'] != entry['bonus']):
+                self._reset_pending = True
+                break
+        return [r for r in self._rounds_locked() if r not in before]
+
+    def refresh(self):
+        """다른 프로세스가 저널에 추가한 회차를 반영하고 새 회차 목록 반환"""
+        with self._lock:
+            self.load()
+            with self._file_lock(shared=True):
+                added = self._replay_journal()
+            entries = [(r, self._lookup(r)) for r in added]
+        self._notify(entries)
+        return added
+
+    # 새 회차 알림 ---------------------------------------------------------
+    def subscribe(self, callback):
+        """새 회차가 추가될 때 callback(회차, {'numbers', 'bonus', 'date'}) 호출"""
+        self._listeners.append(callback)
+
+    def subscribe_reset(self, callback):
+        """회차가 지워지거나 통째로 바뀌었을 때 callback() 호출 (파생 색인을 버리고 다시 구성)"""
+        self._reset_listeners.append(callback)
+
+    def _notify(self, entries):
+        # 락 밖에서 호출해야 리스너가 다른 락을 잡아도 교착 상태가 생기지 않음
+        # (그 사이 리스너가 load() 로 같은 회차를 이미 읽었을 수 있으므로 리스너는 회차로 중복을 거름)
+        with self._lock:
+            reset, self._reset_pending = self._reset_pending, False
+        if reset:
+            for callback in self._reset_listeners:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"회차 초기화 알림 처리 실패: {e}")
+        for round_number, entry in entries:
+            for callback in self._listeners:
+                try:
+                    callback(round_number, entry)
+                except Exception as e:
+                    print(f"회차 알림 처리 실패 ({round_number}회차): {e}")
+
+    # 조회 ---------------------------------------------------------------
+    def _lookup(self, round_number):
+        entry = self._overlay.get(round_number)
+        if entry is not None:
+            return entry
+        draw = self._archive.get(round_number)
+        if draw is None:
+            return None
+        numbers, bonus, date = draw
+        return {'numbers': numbers, 'bonus': bonus, 'date': date}
+
+    def get(self, round_number):
+        """특정 회차 데이터 조회 (없으면 None)"""
+        self.load()
+        round_number = int(round_number)
+        entry = self._lookup(round_number)
+        if entry is None:
+            # 다른 워커가 저널에 추가했을 수 있으므로 꼬리만 확인
+            self.refresh()
+            entry = self._lookup(round_number)
+        return entry
+
+    def __contains__(self, round_number):
+        return self.get(round_number) is not None
+
+    def __len__(self):
+        return len(self.rounds())
+
+    def rounds(self):
+        """캐시된 회차 번호 목록 (오름차순)"""
+        self.load()
+        with self._lock:
+            return self._rounds_locked()
+
+    def _rounds_locked(self):
+        return sorted(set(self._archive.rounds().tolist()) | set(self._overlay))
+
+    def latest_round(self):
+        """캐시된 가장 최근 회차 (없으면 0)"""
+        rounds = self.rounds()
+        return rounds[-1] if rounds else 0
+
+    def as_dict(self):
+        """기존 캐시 형식({'회차': {...}})으로 변환"""
+        self.load()
+        with self._lock:
+            return {str(r): self._lookup(r) for r in self.rounds()}
+
+    def draw_matrix(self):
+        """(회차 배열, N×7 uint8 행렬) 반환 — 저널이 비어 있으면 mmap 뷰 그대로"""
+        self.load()
+        with self._lock:
+            archive = self._archive
+            present = archive.matrix[:, 0] != 0
+            rounds = np.flatnonzero(present) + archive.first_round
+            matrix = archive.matrix if present.all() else archive.matrix[present]
+            extra = sorted(r for r in self._overlay if archive.get(r) is None)
+            if extra:
+                rows = np.array([sorted(self._overlay[r]['numbers']) + [self._overlay[r]['bonus']]
+                                 for r in extra], dtype=np.uint8)
+                rounds = np.concatenate([rounds, np.array(extra, dtype=rounds.dtype)])
+                matrix = np.concatenate([matrix, rows])
+                order = np.argsort(rounds, kind='stable')
+                rounds, matrix = rounds[order], matrix[order]
+            return rounds, matrix
+
+    def should_fetch(self, round_number):
+        """캐시에 없는 회차를 지금 조회해도 되는지 (실패 직후 재조회 방지)"""
+        failed_at = self._failed.get(int(round_number))
+        return failed_at is None or time.time() - failed_at >= self.retry_seconds
+
+    def mark_failed(self, round_number):
+        """조회 실패 회차 기록 (retry_seconds 이후 재검증)"""
+        self._failed[int(round_number)] = time.time()
+
+    # 저장 ---------------------------------------------------------------
+    def add(self, round_number, numbers, bonus, date):
+        """새 회차를 인덱스와 저널에 추가"""
+        self.load()
+        round_number = int(round_number)
+        entry = {
+            'numbers': list(numbers),
+            'bonus': bonus,
+            'date': date,
+            'cached_at': datetime.now().isoformat()
+        }
+        with self._lock:
+            with self._file_lock():
+                # 다른 프로세스가 쓴 줄을 먼저 읽어 저널 끝에서 이어 씀
+                added = self._replay_journal()
+                is_new = self._lookup(round_number) is None
+                self._overlay[round_number] = entry
+                self._failed.pop(round_number, None)
+                try:
+                    os.makedirs(os.path.dirname(self.journal_file) or '.', exist_ok=True)
+                    line = json.dumps(dict(entry, round=round_number), ensure_ascii=False) + '\n'
+                    with open(self.journal_file, 'a', encoding='utf-8') as f:
+                        f.write(line)
+                    self._journal_offset += len(line.encode('utf-8'))
+                    self._journal_entries += 1
+                except Exception as e:
+                    print(f"저널 기록 실패 ({round_number}회차): {e}")
+                if self._journal_entries >= self.compact_threshold:
+                    added += self._compact_locked()
+            entries = [(r, self._lookup(r)) for r in added if r != round_number]
+        if is_new:
+            entries.append((round_number, entry))
+        self._notify(entries)
+
+    def compact(self):
+        """아카이브와 저널을 합쳐 새 아카이브를 쓰고 저널 비우기"""
+        with self._lock:
+            self.load()
+            with self._file_lock():
+                added = self._compact_locked()
+            entries = [(r, self._lookup(r)) for r in added]
+        self._notify(entries)
+
+    def _compact_locked(self):
+        # 파일 잠금 안에서 호출: 다른 프로세스가 저널에 추가한 회차를 먼저 반영해야 비울 때 잃지 않음
+        added = self._replay_journal()
+        try:
+            draws = {}
+            for round_number in self._rounds_locked():
+                entry = self._lookup(round_number)
+                draws[round_number] = (entry['numbers'], entry['bonus'], entry['date'])
+            write_archive(self.archive_file, draws)
+            # 아카이브 교체 후 저널 비우기
+            open(self.journal_file, 'w').close()
+            self._archive.close()
+            self._archive = DrawArchive(self.archive_file)
+            self._archive_stamp = self._file_stamp(self.archive_file)
+            self._overlay = {}
+            self._journal_entries = 0
+            self._journal_offset = 0
+            print(f"로또 캐시 저장 완료: {len(draws)}개 회차")
+        except Exception as e:
+            print(f"캐시 저장 실패: {e}")
+        return added
+
+    def replace_all(self, cache_data):
+        """회차 전체를 교체하고 아카이브로 저장"""
+        with self._lock:
+            self.load()
+            draws = {int(r): (entry['numbers'], entry['bonus'], entry.get('date', ''))
+                     for r, entry in cache_data.items()}
+            with self._file_lock():
+                write_archive(self.archive_file, draws)
+                open(self.journal_file, 'w').close()
+                self._loaded = False
+                self.load()
+            self._reset_pending = True
+        self._notify([])
+
+    def clear(self):
+        """인덱스와 캐시 파일 모두 삭제"""
+        with self._lock:
+            if self._archive:
+                self._archive.close()
+            self._archive = DrawArchive('')
+            self._overlay = {}
+            self._failed = {}
+            self._journal_entries = 0
+            self._journal_offset = 0
+            self._loaded = True
+            removed = False
+            with self._file_lock():
+                for path in (self.archive_file, self.journal_file):
+                    if os.path.exists(path):
+                        os.remove(path)
+                        removed = True
+            self._archive_stamp = None
+            self._reset_pending = True
+        self._notify([])
+        return removed
+
+    def stats(self):
+        """캐시 통계 정보"""
+        self.load()
+        size = 0
+        for path in (self.archive_file, self.journal_file):
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+        last_updated = '알 수 없음'
+        if os.path.exists(self.archive_file):
+            last_updated = datetime.fromtimestamp(os.path.getmtime(self.archive_file)).isoformat()
+        return {
+            'rounds': len(self.rounds()),
+            'file_size': size,
+            'journal_entries': self._journal_entries,
+            'failed_rounds': sorted(self._failed),
+            'last_updated': last_updated
+        }
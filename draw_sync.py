@@ -0,0 +1,130 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 동행복권 당첨번호 조회 API (로컬 테스트 서버로 교체 가능)
+DEFAULT_API_URL = 'https://www.dhlottery.co.kr/common.do'
+
+
+def create_lotto_session(pool_size=8):
+    """keep-alive 연결을 재사용하는 requests 세션 생성"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def parse_lotto_response(data):
+    """API 응답(JSON)에서 (번호 6개, 보너스, 추첨일) 추출, 실패 시 None"""
+    if not isinstance(data, dict) or data.get('returnValue') != 'success':
+        return None
+    numbers = [
+        data['drwtNo1'], data['drwtNo2'], data['drwtNo3'],
+        data['drwtNo4'], data['drwtNo5'], data['drwtNo6']
+    ]
+    return numbers, data['bnusNo'], data['drwNoDate']
+
+
+def fetch_draw(session, round_number, api_url=DEFAULT_API_URL, timeout=10, retries=3, backoff=0.5):
+    """한 회차 조회 (네트워크/서버 오류는 지수 백오프로 재시도)
+
+    미발표 회차처럼 서버가 정상 응답으로 실패를 알려준 경우에는
+    재시도하지 않고 바로 None 을 반환합니다.
+    """
+    params = {'method': 'getLottoNumber', 'drwNo': round_number}
+    last_error = None
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(api_url, params=params, timeout=timeout)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise requests.HTTPError(f"HTTP {response.status_code}")
+            return parse_lotto_response(response.json())
+        except (requests.RequestException, ValueError) as e:
+            last_error = e
+            if attempt < retries:
+                time.sleep(backoff * (2 ** attempt) * (1 + random.random() * 0.5))
+    raise last_error
+
+
+def sync_draw_history(draw_index, latest_round, api_url=DEFAULT_API_URL, start_round=1,
+                      max_workers=8, retries=3, backoff=0.5, timeout=10, session=None):
+    """1회차 ~ latest_round 중 인덱스에 없는 회차를 병렬로 채움
+
+    조회에 성공한 회차는 즉시 인덱스(저널)에 기록되므로 중간에 중단되어도
+    다음 실행 시 남은 회차부터 이어서 진행합니다.
+    """
+    missing = [r for r in range(start_round, latest_round + 1)
+               if draw_index.get(r) is None and draw_index.should_fetch(r)]
+    summary = {'requested': len(missing), 'fetched': 0, 'failed': 0,
+               'cached': latest_round - start_round + 1 - len(missing)}
+    if not missing:
+        return summary
+
+    own_session = session is None
+    if own_session:
+        session = create_lotto_session(pool_size=max_workers)
+
+    print(f"당첨번호 동기화 시작: {len(missing)}개 회차 (동시 {max_workers}개)")
+    started = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(fetch_draw, session, r, api_url, timeout, retries, backoff): r
+                for r in missing
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                round_number = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"API 호출 실패 ({round_number}회차): {e}")
+                    result = None
+                if result:
+                    numbers, bonus, date = result
+                    draw_index.add(round_number, numbers, bonus, date)
+                    summary['fetched'] += 1
+                else:
+                    draw_index.mark_failed(round_number)
+                    summary['failed'] += 1
+                if done % 100 == 0:
+                    print(f"동기화 진행: {done}/{len(missing)}")
+    finally:
+        if own_session:
+            session.close()
+
+    if summary['fetched']:
+        draw_index.compact()
+    print(f"당첨번호 동기화 완료: 성공 {summary['fetched']}개, 실패 {summary['failed']}개 "
+          f"({time.time() - started:.1f}초)")
+    return summary
+
+
+def run_sync_loop(draw_index, latest_round_fn, on_complete=None, interval=None, **kwargs):
+    """동기화 실행 (끝날 때마다 on_complete() 호출)
+
+    interval(초)을 주면 그 간격으로 반복해 새로 추첨된 회차를 채우며 반환하지 않습니다.
+    반복 중 실패는 기록만 하고 다음 주기에 다시 시도합니다.
+    """
+    while True:
+        try:
+            sync_draw_history(draw_index, latest_round_fn(), **kwargs)
+            if on_complete is not None:
+                on_complete()
+        except Exception as e:
+            print(f"백그라운드 동기화 실패: {e}")
+        if not interval:
+            return
+        time.sleep(interval)
+
+
+def start_background_sync(draw_index, latest_round_fn, on_complete=None, interval=None, **kwargs):
+    """백그라운드 데몬 스레드에서 run_sync_loop 실행"""
+    thread = threading.Thread(target=run_sync_loop, args=(draw_index, latest_round_fn, on_complete, interval),
+                              kwargs=kwargs, name='draw-sync', daemon=True)
+    thread.start()
+    return thread
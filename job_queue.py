@@ -0,0 +1,174 @@
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+
+class QueueFullError(Exception):
+    """대기열이 가득 차 작업을 더 받을 수 없음"""
+
+
+class JobQueue:
+    """외부 브로커 없이 프로세스 안에서 도는 작업 큐
+
+    submit() 은 작업 ID를 즉시 돌려주고, 고정된 수의 워커 스레드가 순서대로
+    handler(*args) 를 실행합니다. 끝난 작업 결과는 result_ttl 초 동안 보관되어
+    get() 으로 조회(폴링)할 수 있습니다.
+
+    store(save_job/load_job 을 제공하는 공유 상태 저장소)를 넘기면 상태가 바뀔
+    때마다 저장소에 기록하고 get() 도 저장소에서 읽으므로, 작업을 받은 워커
+    프로세스가 아닌 다른 워커로 조회 요청이 가도 같은 결과를 돌려줍니다.
+    실행 자체는 작업을 받은 프로세스에서 하며, 끝나지 않은 작업은 pending_ttl
+    초가 지나면 (프로세스가 죽은 경우 등) 저장소에서 만료됩니다.
+    """
+
+    def __init__(self, handler, max_workers=4, max_pending=100, result_ttl=600, name='job', store=None,
+                 pending_ttl=3600):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.name = name
+        self.store = store
+        self.pending_ttl = pending_ttl
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._workers = []
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._waits = deque(maxlen=200)  # 최근 대기 시간(초)
+        self._durations = deque(maxlen=200)  # 최근 실행 시간(초)
+
+    def _ensure_workers(self):
+        # fork 이후 워커 프로세스에서 스레드가 없으면 다시 시작
+        alive = [t for t in self._workers if t.is_alive()]
+        if len(alive) == self.max_workers:
+            return
+        with self._lock:
+            self._workers = [t for t in self._workers if t.is_alive()]
+            while len(self._workers) < self.max_workers:
+                thread = threading.Thread(target=self._work, name=f'{self.name}-worker-{len(self._workers)}',
+                                          daemon=True)
+                thread.start()
+                self._workers.append(thread)
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                job['status'] = 'running'
+                job['started_at'] = time.time()
+                self._waits.append(job['started_at'] - job['submitted_at'])
+                self._running += 1
+            self._publish(job)
+            try:
+                result = self.handler(*job['args'])
+                status, error = 'done', None
+            except Exception as e:
+                result, status, error = None, 'failed', str(e) or e.__class__.__name__
+            with self._lock:
+                job['status'] = status
+                job['result'] = result
+                job['error'] = error
+                job['finished_at'] = time.time()
+                self._durations.append(job['finished_at'] - job['started_at'])
+                self._running -= 1
+                if status == 'done':
+                    self._completed += 1
+                else:
+                    self._failed += 1
+            self._publish(job)
+
+    def _publish(self, job):
+        """작업 상태를 공유 저장소에 기록 (저장 실패가 작업 실행을 막지 않도록 보호)"""
+        if self.store is None:
+            return
+        try:
+            ttl = self.result_ttl if job['finished_at'] else self.pending_ttl
+            self.store.save_job(job['id'], job['owner'], self._stored(job), ttl)
+        except Exception as e:
+            print(f"작업 상태 저장 실패 ({job['id']}): {e}")
+
+    def _purge_expired(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] and now - job['finished_at'] > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, owner, *args):
+        """작업 등록 후 작업 정보 반환 (대기열이 가득 차면 QueueFullError)"""
+        self._ensure_workers()
+        with self._lock:
+            self._purge_expired()
+            if self._queue.qsize() >= self.max_pending:
+                raise QueueFullError(f"대기 중인 작업이 너무 많습니다. ({self.max_pending}개)")
+            job_id = uuid.uuid4().hex
+            job = self._jobs[job_id] = {
+                'id': job_id,
+                'owner': owner,
+                'args': args,
+                'status': 'queued',
+                'submitted_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'result': None,
+                'error': None
+            }
+        # 워커가 'running' 을 기록하기 전에 'queued' 를 먼저 기록
+        self._publish(job)
+        self._queue.put(job_id)
+        return dict(self._snapshot(job), queue_position=self._queue.qsize())
+
+    @staticmethod
+    def _stored(job):
+        return {k: v for k, v in job.items() if k not in ('args', 'owner')}
+
+    @staticmethod
+    def _with_wait(snapshot):
+        end = snapshot['started_at'] or time.time()
+        return dict(snapshot, wait_seconds=round(end - snapshot['submitted_at'], 2))
+
+    def _snapshot(self, job):
+        return self._with_wait(self._stored(job))
+
+    def get(self, job_id, owner=None):
+        """작업 상태/결과 조회 (없거나 소유자가 다르면 None)"""
+        if self.store is not None:
+            stored = self.store.load_job(job_id)
+            if stored is None or (owner is not None and stored[0] != owner):
+                return None
+            return self._with_wait(stored[1])
+        with self._lock:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+            if job is None or (owner is not None and job['owner'] != owner):
+                return None
+            return self._snapshot(job)
+
+    def stats(self):
+        """대기열 깊이, 대기/실행 시간 등 상태 정보"""
+        with self._lock:
+            now = time.time()
+            waiting = [job for job in self._jobs.values() if job['status'] == 'queued']
+            waits = list(self._waits)
+            durations = list(self._durations)
+            return {
+                'queue_depth': len(waiting),
+                'running': self._running,
+                'workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'completed': self._completed,
+                'failed': self._failed,
+                'stored_jobs': len(self._jobs),
+                'oldest_wait_seconds': round(max((now - j['submitted_at'] for j in waiting), default=0), 2),
+                'avg_wait_seconds': round(sum(waits) / len(waits), 2) if waits else 0,
+                'max_wait_seconds': round(max(waits), 2) if waits else 0,
+                'avg_run_seconds': round(sum(durations) / len(durations), 2) if durations else 0
+            }
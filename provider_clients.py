@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ProviderClientCache:
+    """사용자별 복호화된 API 키와 AI SDK 클라이언트 캐시 (TTL + LRU)
+
+    요청마다 API 키 파일을 읽고 복호화한 뒤 클라이언트를 새로 만드는 대신,
+    한 번 만든 클라이언트(내부 HTTP 연결 풀 포함)를 재사용합니다.
+    사용자가 키를 저장하면 invalidate() 로 해당 사용자 항목을 비웁니다.
+    version_fn(user_id) 를 넘기면 다른 프로세스에서 키가 바뀐 경우도 버전
+    비교로 알아채고 다시 읽습니다.
+    """
+
+    def __init__(self, load_keys, factories, max_entries=256, ttl_seconds=1800, version_fn=None):
+        self.load_keys = load_keys
+        self.factories = factories
+        self.version_fn = version_fn
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # user_id -> {'keys', 'clients', 'expires_at'}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, user_id):
+        now = time.monotonic()
+        version = self.version_fn(user_id) if self.version_fn else None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry['expires_at'] > now and entry['version'] == version:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        # 파일 읽기/복호화는 락 밖에서 수행
+        entry = {'keys': self.load_keys(user_id), 'clients': {}, 'expires_at': now + self.ttl_seconds,
+                 'version': version}
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_keys(self, user_id):
+        """사용자의 복호화된 API 키 (캐시)"""
+        return dict(self._entry(user_id)['keys'])
+
+    def get_client(self, user_id, provider):
+        """사용자 키로 만든 SDK 클라이언트 (없으면 생성 후 캐시, 키가 없으면 None)"""
+        entry = self._entry(user_id)
+        client = entry['clients'].get(provider)
+        if client is not None:
+            return client
+        api_key = entry['keys'].get(provider, '')
+        if not api_key:
+            return None
+        with self._lock:
+            client = entry['clients'].get(provider)
+            if client is None:
+                client = self.factories[provider](api_key)
+                entry['clients'][provider] = client
+        return client
+
+    def invalidate(self, user_id=None):
+        """사용자(또는 전체) 캐시 비우기"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
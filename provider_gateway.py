@@ -0,0 +1,234 @@
+import asyncio
+import threading
+import time
+
+
+class ProviderUnavailableError(Exception):
+    """회로 차단, 요청 한도 초과 등으로 AI 호출을 시도하지 않고 바로 실패"""
+
+
+class ProviderConfigError(Exception):
+    """API 키 미설정 등 사용자 설정 문제 (회로 차단기 실패로 세지 않음)"""
+
+
+# 사용자 키/요청 문제로 보는 HTTP 상태 코드 (AI 서비스 장애가 아님)
+CLIENT_ERROR_STATUS = {400, 401, 403, 404, 422}
+
+
+def is_provider_failure(error):
+    """AI 서비스 장애로 볼 오류인지 (설정 오류/클라이언트 오류는 제외)"""
+    if isinstance(error, ProviderConfigError):
+        return False
+    status = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+    return status not in CLIENT_ERROR_STATUS
+
+
+class TokenBucket:
+    """초당 rate 개씩 채워지고 최대 capacity 개까지 쌓이는 토큰 버킷"""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """토큰을 하나 가져가면 0, 부족하면 다음 토큰까지 기다려야 할 시간(초) 반환"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def tokens(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class CircuitBreaker:
+    """연속 실패가 failure_threshold 번 쌓이면 reset_seconds 동안 호출을 차단
+
+    차단(open) 시간이 지나면 한 번의 시험 호출(half-open)을 허용하고,
+    성공하면 다시 정상(closed), 실패하면 다시 차단합니다.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_seconds=60, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def retry_after(self):
+        """차단 중이면 남은 시간(초), 아니면 0"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0
+            return max(0.0, self.opened_at + self.reset_seconds - self.clock())
+
+    def allow(self):
+        """지금 호출을 시도해도 되는지 (half-open 에서는 한 번만 허용)"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    return False
+                self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def release(self):
+        """시험 호출이 결과 없이 취소된 경우 다음 시험을 허용"""
+        with self._lock:
+            self._trial_running = False
+
+
+class ProviderGateway:
+    """AI 서비스 하나에 대한 호출 관문
+
+    - 동시 호출 수 제한 (max_concurrency)
+    - 토큰 버킷 요청 속도 제한 (rate_per_second, burst)
+    - 연속 실패 시 회로 차단 (failure_threshold, reset_seconds)
+    - 호출 제한 시간 (timeout)
+
+    차단 중이거나 max_queue_seconds 안에 자리/토큰을 얻지 못하면 SDK 호출 없이
+    ProviderUnavailableError 를 바로 던져, 호출자가 다른 AI나 대체 번호로
+    넘어갈 수 있게 합니다. 하나의 이벤트 루프 안에서 사용합니다.
+    """
+
+    def __init__(self, name, max_concurrency=8, rate_per_second=2.0, burst=10,
+                 failure_threshold=5, reset_seconds=60, timeout=30, max_queue_seconds=2.0,
+                 clock=time.monotonic):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_queue_seconds = max_queue_seconds
+        self.bucket = TokenBucket(rate_per_second, burst, clock=clock)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds, clock=clock)
+        self._semaphore = None
+        self._semaphore_loop = None
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def _get_semaphore(self):
+        # 이벤트 루프가 바뀌면 (fork 후 재시작, 테스트 등) 새로 만듦
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _reject(self, reason):
+        self.rejected += 1
+        raise ProviderUnavailableError(f"{self.name} {reason}")
+
+    def available(self):
+        """지금 호출하면 바로 거절되지 않을지 (상태 확인용, 토큰을 쓰지 않음)"""
+        return self.breaker.retry_after() == 0 and self.bucket.tokens() >= 1
+
+    async def call(self, coro_fn, *args, timeout=None):
+        """coro_fn(*args) 를 제한 안에서 실행하고 결과 반환"""
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+
+        if not self.breaker.allow():
+            self._reject(f"일시 차단 중 ({self.breaker.retry_after():.0f}초 후 재시도)")
+
+        attempted = False
+        try:
+            # 요청 속도 제한: 다음 토큰이 금방 생기면 기다리고, 아니면 바로 거절
+            wait = self.bucket.try_acquire()
+            while wait:
+                if wait > min(self.max_queue_seconds, deadline - time.monotonic()):
+                    self._reject("요청 한도 초과")
+                await asyncio.sleep(wait)
+                wait = self.bucket.try_acquire()
+
+            semaphore = self._get_semaphore()
+            if not semaphore.locked():
+                # 빈 자리가 있으면 바로 얻음 (wait_for 에 0초를 주면 자리가 있어도 시간 초과로 끝날 수 있음)
+                await semaphore.acquire()
+            else:
+                try:
+                    await asyncio.wait_for(semaphore.acquire(),
+                                           max(0.0, min(self.max_queue_seconds, deadline - time.monotonic())))
+                except asyncio.TimeoutError:
+                    self._reject(f"동시 요청 한도 초과 ({self.max_concurrency}개)")
+
+            self.in_flight += 1
+            self.calls += 1
+            attempted = True
+            try:
+                result = await asyncio.wait_for(coro_fn(*args), max(0.0, deadline - time.monotonic()))
+            finally:
+                self.in_flight -= 1
+                semaphore.release()
+        except ProviderUnavailableError:
+            self.breaker.release()
+            raise
+        except asyncio.CancelledError:
+            # 정족수 충족 등으로 호출자가 취소한 경우는 실패로 세지 않음
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if attempted and is_provider_failure(e):
+                self.failures += 1
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+
+        self.breaker.record_success()
+        return result
+
+    def stats(self):
+        return {
+            'state': self.breaker.state,
+            'retry_after_seconds': round(self.breaker.retry_after(), 1),
+            'consecutive_failures': self.breaker.failures,
+            'trips': self.breaker.trips,
+            'in_flight': self.in_flight,
+            'max_concurrency': self.max_concurrency,
+            'tokens': round(self.bucket.tokens(), 1),
+            'calls': self.calls,
+            'failures': self.failures,
+            'rejected': self.rejected
+        }
@@ -0,0 +1,94 @@
+import importlib
+import threading
+import time
+
+from provider_gateway import ProviderConfigError
+
+
+class ProviderRegistry:
+    """AI SDK 플러그인 등록소
+
+    SDK 모듈(openai, anthropic, google.generativeai 등)은 무겁기 때문에 앱을
+    불러올 때가 아니라 해당 AI의 클라이언트를 처음 만들 때 import 합니다.
+    AI 기능을 쓰지 않는 워커는 SDK import 비용을 전혀 치르지 않습니다.
+
+    register(이름, 모듈 목록, factory) 로 새 AI를 추가할 수 있고,
+    factory(api_key, *모듈) 이 클라이언트를 만듭니다. registry[이름] 은
+    ProviderClientCache 에 넘길 수 있는 factory(api_key) 를 돌려줍니다.
+    """
+
+    def __init__(self):
+        self._providers = {}
+        self._modules = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, modules, factory):
+        """AI 등록 (modules: 처음 사용할 때 import 할 모듈 이름 목록)"""
+        with self._lock:
+            self._providers[name] = {
+                'modules': tuple(modules),
+                'factory': factory,
+                'import_seconds': None,
+                'init_seconds': None,
+                'clients_created': 0
+            }
+
+    def names(self):
+        return list(self._providers)
+
+    def __contains__(self, name):
+        return name in self._providers
+
+    def __getitem__(self, name):
+        if name not in self._providers:
+            raise KeyError(name)
+        return lambda api_key: self.create_client(name, api_key)
+
+    def is_loaded(self, name):
+        return self._providers[name]['import_seconds'] is not None
+
+    def load(self, name):
+        """AI의 SDK 모듈을 import (이미 불러왔으면 그대로 반환)"""
+        provider = self._providers[name]
+        if provider['import_seconds'] is not None:
+            return [self._modules[module_name] for module_name in provider['modules']]
+        with self._lock:
+            if provider['import_seconds'] is None:
+                started = time.perf_counter()
+                for module_name in provider['modules']:
+                    if module_name in self._modules:
+                        continue
+                    try:
+                        self._modules[module_name] = importlib.import_module(module_name)
+                    except ImportError as e:
+                        raise ProviderConfigError(f"{name} SDK({module_name})를 불러올 수 없습니다: {e}")
+                provider['import_seconds'] = round(time.perf_counter() - started, 3)
+                print(f"{name} SDK 로드 완료: {provider['import_seconds']}초")
+        return [self._modules[module_name] for module_name in provider['modules']]
+
+    def create_client(self, name, api_key):
+        """SDK를 불러온 뒤 사용자 키로 클라이언트 생성"""
+        modules = self.load(name)
+        provider = self._providers[name]
+        started = time.perf_counter()
+        client = provider['factory'](api_key, *modules)
+        elapsed = round(time.perf_counter() - started, 3)
+        with self._lock:
+            if provider['init_seconds'] is None:
+                provider['init_seconds'] = elapsed  # 첫 생성 시간 (SDK 내부 초기화 포함)
+            provider['clients_created'] += 1
+        return client
+
+    def stats(self):
+        """AI별 SDK 로드 여부와 import/클라이언트 초기화 시간"""
+        with self._lock:
+            return {
+                name: {
+                    'loaded': provider['import_seconds'] is not None,
+                    'modules': list(provider['modules']),
+                    'import_seconds': provider['import_seconds'],
+                    'first_init_seconds': provider['init_seconds'],
+                    'clients_created': provider['clients_created']
+                }
+                for name, provider in self._providers.items()
+            }
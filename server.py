@@ -0,0 +1,129 @@
+import gc
+import os
+import subprocess
+import sys
+import threading
+import time
+
+
+def default_workers():
+    """WEB_CONCURRENCY 가 없으면 CPU 코어 수 기준 (2 * 코어 + 1)"""
+    return int(os.getenv('WEB_CONCURRENCY', str(2 * (os.cpu_count() or 1) + 1)))
+
+
+def preload(flask_app, draw_index, winning_index):
+    """fork 전에 마스터 프로세스에서 공유 데이터를 읽어 둠
+
+    회차 아카이브/저널, 당첨 조합 비트맵, Jinja 템플릿을 미리 불러오면
+    워커들은 fork 시점의 메모리를 copy-on-write 로 함께 씁니다.
+    마지막에 gc.freeze() 로 이 객체들을 GC 추적 대상에서 빼서, 워커의 GC가
+    참조 정보를 갱신하며 공유 페이지를 복사하게 만드는 일을 줄입니다.
+    """
+    started = time.perf_counter()
+    draw_index.load()
+    winning_index.load()
+    templates = 0
+    for name in flask_app.jinja_env.list_templates():
+        flask_app.jinja_env.get_template(name)
+        templates += 1
+    gc.collect()
+    gc.freeze()
+    print(f"사전 로드 완료: 회차 {len(draw_index.rounds())}개, 템플릿 {templates}개 "
+          f"({time.perf_counter() - started:.2f}초)")
+
+
+def spawn_draw_sync(app_file, interval=0):
+    """당첨번호 동기화를 별도 프로세스로 실행
+
+    마스터에서 스레드로 동기화하면 fork 시점에 잠긴 락이 워커로 복사될 수
+    있으므로 자식 프로세스(`app.py sync-draws --interval`)로 돌립니다. 자식은
+    interval 초마다 동기화와 저장 번호 채점을 반복하고(0 이면 한 번만), 결과는
+    저널에 기록되어 워커가 주기적으로 저널 꼬리를 읽어 반영합니다.
+    """
+    if os.getenv('LOTTO_SYNC_ON_STARTUP', '1') != '1':
+        return None
+    return subprocess.Popen([sys.executable, app_file, 'sync-draws', '--interval', str(interval)])
+
+
+def start_refresh_thread(draw_index, interval):
+    """워커에서 interval 초마다 저널 꼬리를 읽어 새 회차를 반영 (리스너로 색인/통계 갱신)"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                draw_index.refresh()
+            except Exception as e:
+                print(f"회차 반영 실패: {e}")
+
+    thread = threading.Thread(target=run, name='draw-refresh', daemon=True)
+    thread.start()
+    return thread
+
+
+def serve(flask_app, draw_index, winning_index, app_file, host='0.0.0.0', port=5001, workers=None,
+          threads=4, timeout=180, graceful_timeout=30, max_requests=0, pidfile=None,
+          sync_interval=0, refresh_interval=60):
+    """gunicorn 멀티 프로세스 서버 실행 (preload + gthread 워커)
+
+    - 워커 수/스레드 수 설정 (SSE 스트림은 연결마다 스레드 하나를 씀)
+    - SIGHUP: 마스터가 저널의 새 회차를 반영한 뒤 워커를 새로 띄우고
+      기존 워커는 처리 중인 요청을 마친 뒤 종료 (무중단 재시작)
+    - SIGTERM: graceful_timeout 동안 요청을 마무리하고 종료
+    - 코드 교체 배포는 SIGUSR2 로 새 마스터를 띄운 뒤 이전 마스터에 SIGQUIT
+    - 동기화 프로세스는 마스터가 sync_interval 초 주기로 돌리고 종료 시 함께 끝냄,
+      워커는 refresh_interval 초마다 저널에 추가된 회차를 반영
+    """
+    from gunicorn.app.base import BaseApplication
+
+    options = {
+        'bind': f'{host}:{port}',
+        'workers': workers or default_workers(),
+        'worker_class': 'gthread',
+        'threads': threads,
+        'timeout': timeout,
+        'graceful_timeout': graceful_timeout,
+        'max_requests': max_requests,
+        'max_requests_jitter': max_requests // 10 if max_requests else 0,
+        'preload_app': True,
+        'pidfile': pidfile,
+        'accesslog': '-',
+    }
+
+    sync_process = []
+
+    def when_ready(arbiter):
+        process = spawn_draw_sync(app_file, sync_interval)
+        if process is not None:
+            sync_process.append(process)
+
+    def on_exit(arbiter):
+        for process in sync_process:
+            if process.poll() is None:
+                process.terminate()
+
+    def on_reload(arbiter):
+        # 새로 fork 될 워커가 최신 회차를 물려받도록 마스터에서 먼저 반영
+        added = draw_index.refresh()
+        print(f"재시작: 새 회차 {len(added)}개 반영 후 워커 교체")
+
+    def post_fork(arbiter, worker):
+        print(f"워커 시작 (pid {worker.pid})")
+        if refresh_interval:
+            start_refresh_thread(draw_index, refresh_interval)
+
+    class LottoApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                if value is not None:
+                    self.cfg.set(key, value)
+            self.cfg.set('when_ready', when_ready)
+            self.cfg.set('on_reload', on_reload)
+            self.cfg.set('on_exit', on_exit)
+            self.cfg.set('post_fork', post_fork)
+
+        def load(self):
+            return flask_app
+
+    preload(flask_app, draw_index, winning_index)
+    LottoApplication().run()
+    return 0
@@ -0,0 +1,325 @@
+import json
+import math
+import threading
+from datetime import datetime
+
+from user_store import DEFAULT_ADMIN, UserStore
+
+
+class RedisStore:
+    """Redis 호환 서버에 사용자/저장 번호/API 키를 보관하는 저장소
+
+    UserStore(SQLite)와 같은 메서드를 제공하므로 STATE_BACKEND=redis 로 바꿔
+    여러 노드가 하나의 상태를 공유할 수 있습니다. redis 패키지는 이 저장소를
+    쓸 때만 필요하며, client 를 직접 넘기면 Redis 프로토콜을 구현한 로컬
+    대체 서버(또는 fakeredis 등)도 사용할 수 있습니다.
+
+    키 구성 (prefix 기본 'lotto:')
+      users                 해시: 사용자 이름 -> JSON
+      tickets:<사용자>      해시: 번호 ID -> JSON
+      ticket_id             번호 ID 발급용 카운터
+      api_keys              해시: 사용자 -> 암호화된 키 JSON
+      ungraded              정렬 집합: '<사용자>:<번호 ID>' (점수 = 추첨 회차)
+      graded_round          빈틈 없이 채점을 마친 마지막 회차
+      job:<작업 ID>         작업 큐 상태 JSON (만료 시간 설정)
+      version:<이름>        변경 버전 카운터 (캐시 무효화용)
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='lotto:', client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("Redis 저장소를 사용하려면 redis 패키지를 설치하세요. (pip install redis)")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+        self.url = url
+        self._initialized = False
+
+    def _key(self, name):
+        return f"{self.prefix}{name}"
+
+    def init(self):
+        """기본 관리자 계정 생성 (없을 때만)"""
+        if self._initialized:
+            return
+        username, user = DEFAULT_ADMIN
+        if self.client.hsetnx(self._key('users'), username, json.dumps(user, ensure_ascii=False)):
+            self.client.incr(self._key('version:users'))
+        self._initialized = True
+
+    def version(self, name):
+        return int(self.client.get(self._key(f'version:{name}')) or 0)
+
+    def _write(self, version_name, *commands):
+        # 변경과 버전 증가를 하나의 MULTI/EXEC 트랜잭션으로 실행
+        pipe = self.client.pipeline(transaction=True)
+        for method, args in commands:
+            getattr(pipe, method)(*args)
+        pipe.incr(self._key(f'version:{version_name}'))
+        return pipe.execute()
+
+    # 사용자
+    def load_users(self):
+        self.init()
+        users = self.client.hgetall(self._key('users'))
+        return {username: json.loads(data) for username, data in users.items()}
+
+    def save_user(self, username, user):
+        data = {'password': user['password'], 'is_admin': bool(user.get('is_admin'))}
+        self._write('users', ('hset', (self._key('users'), username, json.dumps(data, ensure_ascii=False))))
+
+    def delete_user(self, username):
+        self._write('users', ('hdel', (self._key('users'), username)))
+
+    # 저장한 로또 번호
+    def load_tickets(self):
+        tickets = {}
+        for key in self.client.scan_iter(match=self._key('tickets:*')):
+            user_id = key[len(self._key('tickets:')):]
+            tickets[user_id] = self.user_tickets(user_id)
+        return tickets
+
+    def user_tickets(self, user_id):
+        rows = self.client.hgetall(self._key(f'tickets:{user_id}'))
+        items = []
+        for ticket_id, data in sorted(rows.items(), key=lambda row: int(row[0])):
+            item = json.loads(data)
+            item['id'] = int(ticket_id)
+            items.append(item)
+        return items
+
+    def ticket_page(self, user_id, before_id=None, limit=20, ticket_type=None, round_number=None, rank=None):
+        """최신순 keyset 페이지 (해시 전체를 읽어 걸러내므로 SQLite 보다 느림)"""
+        items = []
+        for item in reversed(self.user_tickets(user_id)):
+            if before_id is not None and item['id'] >= before_id:
+                continue
+            if ticket_type is not None and item.get('type') != ticket_type:
+                continue
+            if round_number is not None and item.get('round') != round_number:
+                continue
+            if rank is not None and item.get('rank') != rank:
+                continue
+            if len(items) == limit:
+                return items, items[-1]['id']
+            item['has_process_info'] = item.pop('process_info', None) is not None
+            items.append(item)
+        return items, None
+
+    def get_ticket(self, user_id, ticket_id):
+        data = self.client.hget(self._key(f'tickets:{user_id}'), ticket_id)
+        if data is None:
+            return None
+        item = json.loads(data)
+        item['id'] = int(ticket_id)
+        return item
+
+    def add_ticket(self, user_id, item):
+        item = {k: v for k, v in item.items() if k != 'id'}
+        ticket_id = self.client.incr(self._key('ticket_id'))
+        commands = [('hset', (self._key(f'tickets:{user_id}'), ticket_id, json.dumps(item, ensure_ascii=False)))]
+        if item.get('rank') is None and item.get('round') is not None:
+            commands.append(('zadd', (self._key('ungraded'), {f'{user_id}:{ticket_id}': int(item['round'])})))
+        self._write(f'tickets:{user_id}', *commands)
+        return ticket_id
+
+    def delete_ticket(self, user_id, ticket_id):
+        removed, _, _ = self._write(f'tickets:{user_id}', ('hdel', (self._key(f'tickets:{user_id}'), ticket_id)),
+                                    ('zrem', (self._key('ungraded'), f'{user_id}:{ticket_id}')))
+        return removed > 0
+
+    # 자동 채점
+    def graded_round(self):
+        return int(self.client.get(self._key('graded_round')) or 0)
+
+    def set_graded_round(self, round_number):
+        if int(round_number) > self.graded_round():
+            self.client.set(self._key('graded_round'), int(round_number))
+
+    def ungraded_rounds(self, max_round):
+        members = self.client.zrangebyscore(self._key('ungraded'), '-inf', max_round, withscores=True)
+        return sorted({int(score) for _, score in members})
+
+    def ungraded_tickets(self, round_numbers):
+        tickets = []
+        for round_number in round_numbers:
+            for member in self.client.zrangebyscore(self._key('ungraded'), round_number, round_number):
+                user_id, ticket_id = member.rsplit(':', 1)
+                item = self.get_ticket(user_id, ticket_id)
+                if item is not None and item.get('rank') is None:
+                    tickets.append({'user_id': user_id, 'id': item['id'], 'round': round_number,
+                                    'numbers': item['numbers']})
+        return tickets
+
+    def save_grades(self, grades):
+        by_user = {}
+        for user_id, ticket_id, grade in grades:
+            by_user.setdefault(user_id, []).append((ticket_id, grade))
+        for user_id, items in by_user.items():
+            commands = []
+            for ticket_id, grade in items:
+                item = self.get_ticket(user_id, ticket_id)
+                if item is not None and item.get('rank') is None:
+                    item.pop('id')
+                    item.update(grade)
+                    commands.append(('hset', (self._key(f'tickets:{user_id}'), ticket_id,
+                                              json.dumps(item, ensure_ascii=False))))
+                commands.append(('zrem', (self._key('ungraded'), f'{user_id}:{ticket_id}')))
+            self._write(f'tickets:{user_id}', *commands)
+
+    # 작업 큐 상태
+    def save_job(self, job_id, owner, data, ttl):
+        self.client.set(self._key(f'job:{job_id}'), json.dumps({'owner': owner, 'data': data}, ensure_ascii=False),
+                        ex=max(1, math.ceil(ttl)))
+
+    def load_job(self, job_id):
+        raw = self.client.get(self._key(f'job:{job_id}'))
+        if raw is None:
+            return None
+        job = json.loads(raw)
+        return job['owner'], job['data']
+
+    # API 키 (암호화된 값 그대로 저장)
+    def load_api_keys(self, user_id):
+        data = self.client.hget(self._key('api_keys'), user_id)
+        return json.loads(data) if data else {}
+
+    def save_api_keys(self, user_id, keys):
+        data = {name: keys.get(name, '') for name in ('openai', 'anthropic', 'google')}
+        data['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._write(f'api_keys:{user_id}', ('hset', (self._key('api_keys'), user_id, json.dumps(data))))
+
+    def stats(self):
+        return {
+            'backend': 'redis',
+            'users': self.client.hlen(self._key('users')),
+            'tickets': sum(self.client.hlen(key) for key in self.client.scan_iter(match=self._key('tickets:*'))),
+            'api_keys': self.client.hlen(self._key('api_keys'))
+        }
+
+
+class CachedState:
+    """저장소 앞에 두는 읽기 캐시
+
+    여러 워커 프로세스/노드가 같은 저장소를 쓸 때, 각 프로세스는 읽은 결과를
+    버전과 함께 보관하고 다음 읽기에서 저장소의 버전 카운터만 확인합니다.
+    어느 프로세스든 쓰기를 하면 버전이 올라가므로 다른 프로세스의 캐시도
+    다음 읽기에서 다시 읽힙니다. 쓰기는 항상 저장소로 바로 갑니다.
+    """
+
+    def __init__(self, backend, max_ticket_users=1024):
+        self.backend = backend
+        self.max_ticket_users = max_ticket_users
+        self._users = (None, {})  # (버전, {사용자: 정보})
+        self._tickets = {}  # 사용자 -> (버전, [번호, ...])
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # 사용자
+    def users(self):
+        """{사용자: 정보} (읽기 전용으로 사용)"""
+        version = self.backend.version('users')
+        cached_version, users = self._users
+        if cached_version == version:
+            self.hits += 1
+            return users
+        self.misses += 1
+        users = self.backend.load_users()
+        with self._lock:
+            self._users = (version, users)
+        return users
+
+    def get_user(self, username):
+        """사용자 정보 사본 (없으면 None)"""
+        user = self.users().get(username)
+        return dict(user) if user is not None else None
+
+    def save_user(self, username, user):
+        self.backend.save_user(username, user)
+
+    def delete_user(self, username):
+        self.backend.delete_user(username)
+
+    # 저장한 로또 번호
+    def tickets(self, user_id):
+        """사용자의 저장 번호 목록 (저장 순서, 읽기 전용으로 사용)"""
+        version = self.backend.version(f'tickets:{user_id}')
+        cached = self._tickets.get(user_id)
+        if cached and cached[0] == version:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        items = self.backend.user_tickets(user_id)
+        with self._lock:
+            if len(self._tickets) >= self.max_ticket_users and user_id not in self._tickets:
+                self._tickets.pop(next(iter(self._tickets)))
+            self._tickets[user_id] = (version, items)
+        return items
+
+    def ticket_page(self, user_id, before_id=None, limit=20, ticket_type=None, round_number=None, rank=None):
+        """최신순 keyset 페이지 (저장소에서 바로 읽음)"""
+        return self.backend.ticket_page(user_id, before_id, limit, ticket_type, round_number, rank)
+
+    def get_ticket(self, user_id, ticket_id):
+        return self.backend.get_ticket(user_id, ticket_id)
+
+    def add_ticket(self, user_id, item):
+        """번호 한 건 저장 (item 에 행 ID 'id' 가 채워짐)"""
+        item['id'] = self.backend.add_ticket(user_id, item)
+        return item
+
+    def delete_ticket(self, user_id, ticket_id):
+        return self.backend.delete_ticket(user_id, ticket_id)
+
+    # 자동 채점 (저장소에 바로 읽고 씀)
+    def graded_round(self):
+        return self.backend.graded_round()
+
+    def set_graded_round(self, round_number):
+        self.backend.set_graded_round(round_number)
+
+    def ungraded_rounds(self, max_round):
+        return self.backend.ungraded_rounds(max_round)
+
+    def ungraded_tickets(self, round_numbers):
+        return self.backend.ungraded_tickets(round_numbers)
+
+    def save_grades(self, grades):
+        self.backend.save_grades(grades)
+
+    # 작업 큐 상태 (저장소에 바로 읽고 씀)
+    def save_job(self, job_id, owner, data, ttl):
+        self.backend.save_job(job_id, owner, data, ttl)
+
+    def load_job(self, job_id):
+        return self.backend.load_job(job_id)
+
+    # API 키
+    def load_api_keys(self, user_id):
+        return self.backend.load_api_keys(user_id)
+
+    def save_api_keys(self, user_id, keys):
+        self.backend.save_api_keys(user_id, keys)
+
+    def api_keys_version(self, user_id):
+        return self.backend.version(f'api_keys:{user_id}')
+
+    def stats(self):
+        return dict(self.backend.stats(), cache_hits=self.hits, cache_misses=self.misses,
+                    cached_ticket_users=len(self._tickets))
+
+
+def create_state_backend(kind, db_file, redis_url=None, redis_prefix='lotto:', redis_client=None, **legacy_files):
+    """STATE_BACKEND 설정값('sqlite' 또는 'redis')에 맞는 저장소 생성
+
+    redis_client 를 넘기면 redis_url 로 연결하지 않고 그 클라이언트를 씁니다
+    (fakeredis, Redis 프로토콜을 구현한 로컬 대체 서버에 연결한 클라이언트 등).
+    """
+    if kind == 'redis':
+        return RedisStore(redis_url or 'redis://localhost:6379/0', prefix=redis_prefix, client=redis_client)
+    if kind != 'sqlite':
+        raise ValueError(f"지원하지 않는 STATE_BACKEND 입니다: {kind}")
+    return UserStore(db_file, **legacy_files)
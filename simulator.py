@@ -0,0 +1,153 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import numpy as np
+
+from combo_index import TOTAL_COMBINATIONS, combos_from_ranks, random_bonus_numbers, sample_ranks
+from ticket_grading import grade_rows
+
+# 등수별 당첨금 (원). 4·5등은 고정 금액, 1~3등은 회차마다 달라 최근 평균에 가까운 값을 씀
+PRIZES = {1: 2_000_000_000, 2: 60_000_000, 3: 1_500_000, 4: 50_000, 5: 5_000}
+TICKET_PRICE = 1_000
+
+# 작업 하나가 만드는 번호 수 (시드는 작업 단위로 나누므로 프로세스 수와 무관하게 결과가 같음)
+CHUNK_TICKETS = 200_000
+
+STRATEGIES = {
+    'random': '균등 무작위 (simulated: 역대 1등 조합 제외, history: 제외 없이 전체 조합에서 추출)',
+    'stats': '통계 가중치 (번호별 출현 횟수에 비례해 6개 추출)',
+    'ai_saved': 'AI 협업으로 저장된 번호 재사용 (history: 그 회차 추첨 전에 저장된 번호만)'
+}
+
+
+def weighted_tickets(weights, rng):
+    """행마다 가중치(N×45)에 비례해 서로 다른 번호 6개를 뽑음 (Gumbel top-k)"""
+    weights = np.asarray(weights, dtype=np.float64)
+    keys = np.log(np.maximum(weights, 1e-12)) - np.log(-np.log(rng.random(weights.shape)))
+    picked = np.argpartition(-keys, 6, axis=1)[:, :6] + 1
+    return np.sort(picked, axis=1)
+
+
+def random_draws(count, rng):
+    """무작위 추첨 count 회 (N×7: 당첨번호 6개 + 보너스)"""
+    combos = combos_from_ranks(rng.integers(0, TOTAL_COMBINATIONS, size=count))
+    return np.column_stack([combos, random_bonus_numbers(combos, rng)])
+
+
+def make_tickets(strategy, count, rng, data, weights=None, excluded_ranks=None):
+    """전략별 번호 count 장 (N×6)"""
+    if strategy == 'random':
+        if excluded_ranks is None:
+            return combos_from_ranks(rng.integers(0, TOTAL_COMBINATIONS, size=count))
+        # 한 작업 안에서는 서로 다른 번호 (앱의 대량 생성과 같은 방식)
+        return combos_from_ranks(sample_ranks(count, excluded_ranks, rng))
+    if strategy == 'stats':
+        if weights is None:
+            weights = np.broadcast_to(data['weights'], (count, 45))
+        return weighted_tickets(weights, rng)
+    if strategy == 'ai_saved':
+        pool = data['ai_tickets']
+        return pool[rng.integers(0, len(pool), size=count)]
+    raise ValueError(f"알 수 없는 전략입니다: {strategy}")
+
+
+def run_chunk(task):
+    """작업 하나 실행 -> 등수별 횟수 [낙첨, 1등, ..., 5등] (프로세스 풀에서 호출)"""
+    strategy, mode, start, count, seed, data = task
+    rng = np.random.default_rng(seed)
+    if mode == 'simulated':
+        tickets = make_tickets(strategy, count, rng, data, excluded_ranks=data.get('winning_ranks'))
+        draws = random_draws(count, rng)
+    else:
+        # 백테스트: 회차 start 부터 count 개 회차에 회차당 per_round 장씩, 그 회차 이전 정보만 사용
+        per_round = data['per_round']
+        rows = np.repeat(np.arange(start, start + count), per_round)
+        if strategy == 'ai_saved':
+            # 그 회차 이전에 저장된 번호만 사용 (나중에 저장한 번호를 과거 회차에 쓰면 미래를 보는 셈)
+            eligible = np.searchsorted(data['ai_ticket_rounds'], data['rounds'][rows], side='right')
+            rows, eligible = rows[eligible > 0], eligible[eligible > 0]
+            tickets = data['ai_tickets'][(rng.random(len(rows)) * eligible).astype(np.int64)]
+        else:
+            weights = data['prefix_counts'][rows] + 1 if strategy == 'stats' else None
+            tickets = make_tickets(strategy, len(rows), rng, data, weights=weights)
+        draws = data['matrix'][rows]
+    ranks, _ = grade_rows(tickets, draws)
+    return np.bincount(ranks, minlength=6).astype(np.int64)
+
+
+def summarize(strategy, mode, tallies, elapsed):
+    tickets = int(tallies.sum())
+    prize = sum(int(tallies[rank]) * PRIZES[rank] for rank in PRIZES)
+    expected = prize / tickets if tickets else 0.0
+    return {
+        'strategy': strategy,
+        'mode': mode,
+        'tickets': tickets,
+        'ranks': {str(rank): int(tallies[rank]) for rank in range(1, 6)},
+        'losses': int(tallies[0]),
+        'rank_rates': {str(rank): (int(tallies[rank]) / tickets if tickets else 0.0) for rank in range(1, 6)},
+        'expected_prize_per_ticket': round(expected, 2),
+        'return_rate': round(expected / TICKET_PRICE, 4),
+        'elapsed_seconds': round(elapsed, 3),
+        'tickets_per_second': int(tickets / elapsed) if elapsed else None
+    }
+
+
+def simulate(strategy, data, mode='simulated', tickets=1_000_000, per_round=100, seed=None,
+             workers=None, mp_context=None):
+    """전략 하나를 시뮬레이션/백테스트
+
+    mode='simulated': 무작위 추첨 tickets 회에 번호 한 장씩 (번호와 추첨 모두 새로 생성)
+    mode='history'  : 실제 역대 회차마다 per_round 장씩 (그 회차 이전 정보만 사용)
+
+    history 모드의 'random' 은 역대 1등 조합을 빼지 않고 전체 조합에서 균등하게 뽑습니다
+    (앱의 생성기처럼 '그 회차 이전 1등 조합' 을 빼도 C(45,6) 중 많아야 수천 개라 결과 차이는
+    무시할 수준). 'ai_saved' 는 각 회차에 그 회차 추첨 전에 저장된 번호(ai_ticket_rounds <= 회차)만
+    쓰므로, 저장된 번호보다 앞선 회차는 채점하지 않습니다.
+
+    data: {'rounds', 'matrix', 'weights', 'prefix_counts', 'winning_ranks', 'ai_tickets',
+           'ai_ticket_rounds'(ai_tickets 와 같은 순서의 오름차순 추첨 회차)}
+    작업을 CHUNK_TICKETS 단위로 나누고 SeedSequence(seed).spawn() 으로 작업마다
+    시드를 주므로, 같은 seed 면 workers 수와 관계없이 같은 결과가 나옵니다.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"알 수 없는 전략입니다: {strategy}")
+    if strategy == 'ai_saved' and not len(data.get('ai_tickets', [])):
+        raise ValueError("AI 협업으로 저장된 번호가 없습니다.")
+    if (strategy == 'ai_saved' and mode == 'history' and len(data['rounds'])
+            and data['ai_ticket_rounds'][0] > data['rounds'][-1]):
+        raise ValueError("백테스트 기간 안에 추첨된 회차용으로 저장된 AI 협업 번호가 없습니다.")
+    if mode == 'simulated':
+        spans = [(start, min(CHUNK_TICKETS, tickets - start)) for start in range(0, tickets, CHUNK_TICKETS)]
+    elif mode == 'history':
+        rounds_per_chunk = max(1, CHUNK_TICKETS // per_round)
+        total_rounds = len(data['rounds'])
+        spans = [(start, min(rounds_per_chunk, total_rounds - start))
+                 for start in range(0, total_rounds, rounds_per_chunk)]
+        data = dict(data, per_round=per_round)
+    else:
+        raise ValueError(f"알 수 없는 모드입니다: {mode}")
+    seeds = np.random.SeedSequence(seed).spawn(len(spans))
+    tasks = [(strategy, mode, start, count, chunk_seed, data) for (start, count), chunk_seed in zip(spans, seeds)]
+
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(tasks) == 1:
+        results = [run_chunk(task) for task in tasks]
+    else:
+        context = multiprocessing.get_context(mp_context) if mp_context else None
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context) as executor:
+            results = list(executor.map(run_chunk, tasks))
+    tallies = np.sum(results, axis=0) if results else np.zeros(6, dtype=np.int64)
+    return summarize(strategy, mode, tallies, time.perf_counter() - started)
+
+
+def prefix_counts(matrix):
+    """회차 i 직전까지의 번호별 출현 횟수 (R×45, 백테스트의 통계 가중치용)"""
+    numbers = np.asarray(matrix[:, :6], dtype=np.int64)
+    onehot = np.zeros((len(numbers), 46), dtype=np.int64)
+    onehot[np.arange(len(numbers))[:, None], numbers] = 1
+    cumulative = np.cumsum(onehot, axis=0) - onehot
+    return cumulative[:, 1:]
@@ -0,0 +1,104 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from combo_index import (TOTAL_COMBINATIONS, DrawMaskIndex, WinningComboIndex, combo_rank, combo_ranks,
+                         combos_from_ranks, pairwise_overlaps, sample_ranks)
+from draw_store import DrawIndex
+
+
+@pytest.fixture
+def draw_index(tmp_path):
+    return DrawIndex(str(tmp_path / 'draws.bin'), str(tmp_path / 'draws.journal'))
+
+
+def test_rank_bounds():
+    assert combo_rank([1, 2, 3, 4, 5, 6]) == 0
+    assert combo_rank([40, 41, 42, 43, 44, 45]) == TOTAL_COMBINATIONS - 1
+    assert combos_from_ranks([0, TOTAL_COMBINATIONS - 1]).tolist() == [[1, 2, 3, 4, 5, 6],
+                                                                        [40, 41, 42, 43, 44, 45]]
+
+
+def test_rank_unrank_round_trip():
+    rng = np.random.default_rng(7)
+    ranks = np.concatenate([[0, 1, TOTAL_COMBINATIONS - 2, TOTAL_COMBINATIONS - 1],
+                            rng.integers(0, TOTAL_COMBINATIONS, size=5000)])
+    combos = combos_from_ranks(ranks)
+    assert (np.diff(combos, axis=1) > 0).all() and combos.min() >= 1 and combos.max() <= 45
+    assert (combo_ranks(combos) == ranks).all()
+    assert [combo_rank(c) for c in combos[:50].tolist()] == ranks[:50].tolist()
+
+
+def test_colex_order_on_small_prefix():
+    # 번호가 모두 8 이하인 조합은 colex 순서로 순위 0 ~ C(8,6)-1 을 차지함
+    expected = sorted(combinations(range(1, 9), 6), key=lambda c: c[::-1])
+    assert combos_from_ranks(np.arange(len(expected))).tolist() == [list(c) for c in expected]
+
+
+def test_sample_ranks_skips_excluded_without_duplicates():
+    rng = np.random.default_rng(3)
+    # 맨 앞/맨 뒤 구간과 흩어진 순위를 함께 제외
+    excluded = np.concatenate([np.arange(0, 2000), np.arange(TOTAL_COMBINATIONS - 2000, TOTAL_COMBINATIONS),
+                               rng.integers(0, TOTAL_COMBINATIONS, size=5000)])
+    picked = sample_ranks(200_000, excluded, rng)
+    assert len(np.unique(picked)) == len(picked)
+    assert not np.isin(picked, excluded).any()
+    assert picked.min() >= 0 and picked.max() < TOTAL_COMBINATIONS
+
+
+def test_sample_ranks_fills_small_remaining_space():
+    # 남은 조합이 딱 count 개면 그 순위를 모두 돌려줌
+    excluded = np.arange(10, TOTAL_COMBINATIONS)
+    assert sorted(sample_ranks(10, excluded).tolist()) == list(range(10))
+    with pytest.raises(ValueError):
+        sample_ranks(11, excluded)
+
+
+def test_bitmap_membership_after_new_draw(draw_index, tmp_path):
+    bitmap_file = str(tmp_path / 'bitmap.bin')
+    draw_index.add(1, [3, 11, 19, 27, 35, 43], 7, '2020-01-01')
+    index = WinningComboIndex(draw_index, bitmap_file)
+    draw_index.subscribe(index.on_new_draw)
+    assert index.contains([3, 11, 19, 27, 35, 43])
+
+    draw_index.add(2, [45, 1, 2, 3, 4, 5], 9, '2020-01-08')
+    assert index.contains([1, 2, 3, 4, 5, 45])
+    assert not index.contains([1, 2, 3, 4, 5, 6])
+    assert index.contains_many([[1, 2, 3, 4, 5, 45], [1, 2, 3, 4, 5, 44]]).tolist() == [True, False]
+    assert index.ranks().tolist() == sorted([combo_rank([3, 11, 19, 27, 35, 43]), combo_rank([1, 2, 3, 4, 5, 45])])
+    assert index.stats()['rounds_indexed'] == 2
+
+    # 바뀐 바이트와 헤더만 기록한 파일을 다시 읽어도 같은 결과
+    reopened = WinningComboIndex(draw_index, bitmap_file)
+    assert reopened.contains([1, 2, 3, 4, 5, 45]) and reopened.stats()['latest_round'] == 2
+
+
+def test_mask_overlaps_match_set_intersection(draw_index):
+    rng = np.random.default_rng(11)
+    draws = {r: sorted(rng.choice(np.arange(1, 46), 6, replace=False).tolist()) for r in range(1, 301)}
+    for round_number in range(1, 201):
+        draw_index.add(round_number, draws[round_number], 45 if 45 not in draws[round_number] else 1, '2020-01-01')
+    masks = DrawMaskIndex(draw_index)
+    draw_index.subscribe(masks.on_new_draw)
+    masks.load()
+    # 로드 뒤 알림으로 들어온 회차도 같은 결과여야 함
+    for round_number in range(201, 301):
+        draw_index.add(round_number, draws[round_number], 45 if 45 not in draws[round_number] else 1, '2020-01-01')
+
+    candidates = [sorted(rng.choice(np.arange(1, 46), 6, replace=False).tolist()) for _ in range(200)]
+    candidates += [draws[17], draws[250][:5] + [n for n in range(1, 46) if n not in draws[250]][:1]]
+    expected = np.array([[len(set(c) & set(draws[r])) for r in range(1, 301)] for c in candidates])
+    assert (masks.overlaps(candidates) == expected).all()
+
+    best, best_rounds = masks.max_overlaps(candidates)
+    assert (best == expected.max(axis=1)).all()
+    assert all(len(set(c) & set(draws[int(r)])) == b for c, b, r in zip(candidates, best, best_rounds))
+    assert best[-2] == 6 and best[-1] == 5
+
+
+def test_pairwise_overlaps_match_set_intersection():
+    rng = np.random.default_rng(5)
+    combos = [sorted(rng.choice(np.arange(1, 46), 6, replace=False).tolist()) for _ in range(50)]
+    expected = [[len(set(a) & set(b)) for b in combos] for a in combos]
+    assert pairwise_overlaps(combos).tolist() == expected
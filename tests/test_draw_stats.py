@@ -0,0 +1,53 @@
+import numpy as np
+
+from draw_stats import DrawStats
+from draw_store import DrawIndex
+
+
+def bonus_for(numbers):
+    return next(n for n in range(45, 0, -1) if n not in numbers)
+
+
+def test_incremental_stats_match_full_recompute(tmp_path):
+    files = str(tmp_path / 'draws.bin'), str(tmp_path / 'draws.journal')
+    rng = np.random.default_rng(23)
+    draws = {r: sorted(rng.choice(np.arange(1, 46), 6, replace=False).tolist()) for r in range(1, 121)}
+
+    index = DrawIndex(*files, compact_threshold=50)
+    for round_number in range(1, 11):
+        index.add(round_number, draws[round_number], bonus_for(draws[round_number]), '2020-01-01')
+    stats = DrawStats(index, window=12)
+    index.subscribe(stats.on_new_draw)
+    stats.load()
+
+    # 병렬 동기화처럼 순서가 섞인 알림, 같은 회차의 중복 알림, 다른 인스턴스의 저널 반영
+    order = rng.permutation(np.arange(11, 121)).tolist()
+    for round_number in order:
+        index.add(round_number, draws[round_number], bonus_for(draws[round_number]), '2020-01-01')
+        if round_number % 7 == 0:
+            stats.on_new_draw(round_number, {'numbers': draws[round_number]})
+    other = DrawIndex(*files)
+    other.subscribe(stats.on_new_draw)
+    other.load()
+    index.add(121, [1, 2, 3, 4, 5, 6], 7, '2020-01-01')
+    draws[121] = [1, 2, 3, 4, 5, 6]
+    other.refresh()
+
+    recomputed = DrawStats(DrawIndex(*files), window=12)
+    for incremental, full in zip(stats.arrays(), recomputed.arrays()):
+        assert (incremental == full).all()
+    assert stats.snapshot() == recomputed.snapshot()
+
+    # 아카이브와 무관하게 직접 센 값과도 비교
+    counts, pairs, gaps, recent = stats.arrays()
+    expected = np.zeros(46, dtype=np.int64)
+    expected_recent = np.zeros(46, dtype=np.int64)
+    for round_number, numbers in draws.items():
+        expected[numbers] += 1
+        if round_number > 121 - 12:
+            expected_recent[numbers] += 1
+    assert (counts == expected).all() and (recent == expected_recent).all()
+    assert counts.sum() == 121 * 6 and pairs[1, 2] == sum(1 for n in draws.values() if {1, 2} <= set(n))
+    last_seen = {n: max(r for r, numbers in draws.items() if n in numbers) for n in range(1, 46)}
+    assert all(gaps[n] == 121 - last_seen[n] for n in range(1, 46))
+    assert stats.snapshot()['rounds'] == 121
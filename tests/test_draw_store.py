@@ -0,0 +1,135 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from combo_index import DrawMaskIndex, WinningComboIndex
+from draw_stats import DrawStats
+from draw_store import DrawIndex
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def numbers_for(round_number):
+    """회차마다 다른 6개 번호 (보너스 45)"""
+    return [round_number % 39 + i for i in range(1, 7)]
+
+
+@pytest.fixture
+def files(tmp_path):
+    return str(tmp_path / 'draws.bin'), str(tmp_path / 'draws.journal')
+
+
+def open_index(files, **kwargs):
+    index = DrawIndex(*files, **kwargs)
+    notified = []
+    resets = []
+    index.subscribe(lambda round_number, entry: notified.append(round_number))
+    index.subscribe_reset(lambda: resets.append(True))
+    return index, notified, resets
+
+
+def test_journal_replay_notifies_other_instance_once(files):
+    writer = DrawIndex(*files)
+    reader, notified, resets = open_index(files)
+    reader.load()
+    for round_number in (1, 2, 3):
+        writer.add(round_number, numbers_for(round_number), 45, '2020-01-01')
+
+    assert reader.refresh() == [1, 2, 3]
+    assert reader.refresh() == []
+    assert notified == [1, 2, 3] and not resets
+    assert reader.get(2)['numbers'] == numbers_for(2)
+    # 아직 읽지 않은 줄은 조회할 때 저널 꼬리만 읽어 반영
+    writer.add(4, numbers_for(4), 45, '2020-01-01')
+    assert reader.get(4)['numbers'] == numbers_for(4)
+    assert notified == [1, 2, 3, 4]
+
+
+def test_compaction_moves_journal_into_archive(files):
+    index = DrawIndex(*files, compact_threshold=3)
+    other, notified, resets = open_index(files)
+    other.load()
+    for round_number in range(1, 6):
+        index.add(round_number, numbers_for(round_number), 45, '2020-01-01')
+
+    # 3개째에서 아카이브로 합치고 저널을 비운 뒤 나머지 2개만 저널에 남음
+    with open(files[1], encoding='utf-8') as f:
+        assert [json.loads(line)['round'] for line in f] == [4, 5]
+    assert DrawIndex(*files).rounds() == [1, 2, 3, 4, 5]
+
+    # compaction 은 회차를 바꾸지 않으므로 다른 인스턴스는 새 회차 알림만 받음
+    assert other.refresh() == [1, 2, 3, 4, 5]
+    assert notified == [1, 2, 3, 4, 5] and not resets
+    rounds, matrix = other.draw_matrix()
+    assert rounds.tolist() == [1, 2, 3, 4, 5]
+    assert matrix[2, :6].tolist() == numbers_for(3)
+
+
+def test_cross_process_appends_keep_every_round(files):
+    script = textwrap.dedent(f"""
+        import sys
+        from draw_store import DrawIndex
+        worker = int(sys.argv[1])
+        index = DrawIndex({files[0]!r}, {files[1]!r}, compact_threshold=20)
+        for round_number in range(worker * 100 + 1, worker * 100 + 101):
+            index.add(round_number, [(round_number + i) % 45 + 1 for i in range(6)], 45, '2020-01-01')
+    """)
+    processes = [subprocess.Popen([sys.executable, '-c', script, str(worker)], cwd=REPO_ROOT,
+                                  stdout=subprocess.DEVNULL) for worker in range(4)]
+    assert [process.wait(timeout=120) for process in processes] == [0] * 4
+
+    index = DrawIndex(*files)
+    assert index.rounds() == list(range(1, 401))
+    assert index.get(250)['numbers'] == sorted((250 + i) % 45 + 1 for i in range(6))
+
+
+def test_clear_and_replace_all_reset_listeners(files, tmp_path):
+    index = DrawIndex(*files)
+    winning = WinningComboIndex(index, str(tmp_path / 'bitmap.bin'))
+    masks = DrawMaskIndex(index)
+    stats = DrawStats(index)
+    for listener in (winning, masks, stats):
+        index.subscribe(listener.on_new_draw)
+        index.subscribe_reset(listener.reset)
+    for round_number in (1, 2):
+        index.add(round_number, numbers_for(round_number), 45, '2020-01-01')
+    assert winning.contains(numbers_for(1)) and masks.stats()['rounds'] == 2 and stats.snapshot()['rounds'] == 2
+
+    index.replace_all({'1': {'numbers': [40, 41, 42, 43, 44, 45], 'bonus': 1, 'date': '2020-01-01'}})
+    assert not winning.contains(numbers_for(1))
+    assert winning.contains([40, 41, 42, 43, 44, 45])
+    assert masks.stats()['rounds'] == 1
+    assert stats.snapshot()['frequency'][45] == 1 and stats.snapshot()['rounds'] == 1
+
+    index.clear()
+    assert not winning.contains([40, 41, 42, 43, 44, 45])
+    assert masks.stats()['rounds'] == 0 and stats.snapshot()['rounds'] == 0
+
+
+def test_reload_after_other_process_clear_skips_legacy_import(files, tmp_path):
+    legacy_file = str(tmp_path / 'lotto_cache.json')
+    with open(legacy_file, 'w', encoding='utf-8') as f:
+        json.dump({'data': {'1': {'numbers': numbers_for(1), 'bonus': 45, 'date': '2020-01-01'}}}, f)
+
+    first = DrawIndex(*files, legacy_files=(legacy_file,))
+    assert first.rounds() == [1]  # 처음 열 때만 이전 형식에서 가져옴
+    second, notified, resets = open_index(files)
+    second.legacy_files = (legacy_file,)
+    assert second.rounds() == [1]
+
+    first.clear()
+    assert second.refresh() == []
+    assert second.rounds() == [] and resets == [True]
+    assert not os.path.exists(files[0])
+
+    # 다른 프로세스가 같은 회차를 다른 번호로 교체해도 리셋 알림
+    first.add(1, numbers_for(1), 45, '2020-01-01')
+    second.refresh()
+    first.replace_all({'1': {'numbers': [40, 41, 42, 43, 44, 45], 'bonus': 1, 'date': '2020-01-01'}})
+    second.refresh()
+    assert second.get(1)['numbers'] == [40, 41, 42, 43, 44, 45]
+    assert resets == [True, True]
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from draw_store import DrawIndex
+from draw_sync import start_background_sync, sync_draw_history
+
+
+class StandInLotto:
+    """동행복권 API 대신 쓰는 로컬 HTTP 서버
+
+    statuses[회차] 에 응답할 HTTP 상태 코드를 차례로 넣어 두면 그 순서대로
+    실패를 돌려주고, 다 쓰면 정상 응답합니다. undrawn 회차는 미발표 응답을 줍니다.
+    """
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.statuses = {}
+        self.undrawn = set()
+        self.requests = {}  # 회차 -> 요청 시각 목록
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/common.do"
+
+    def handle(self, request):
+        round_number = int(parse_qs(urlparse(request.path).query)['drwNo'][0])
+        with self._lock:
+            self.requests.setdefault(round_number, []).append(time.monotonic())
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            pending = self.statuses.get(round_number)
+            status = pending.pop(0) if pending else 200
+        try:
+            time.sleep(self.latency)
+            if round_number in self.undrawn:
+                body = {'returnValue': 'fail'}
+            else:
+                body = {'returnValue': 'success', 'drwNoDate': '2020-01-01', 'bnusNo': 45,
+                        **{f'drwtNo{i}': round_number % 30 + i for i in range(1, 7)}}
+            data = json.dumps(body).encode()
+            request.send_response(status)
+            request.send_header('Content-Type', 'application/json')
+            request.send_header('Content-Length', str(len(data)))
+            request.end_headers()
+            request.wfile.write(data)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def files(tmp_path):
+    return str(tmp_path / 'draws.bin'), str(tmp_path / 'draws.journal')
+
+
+def test_sync_fetches_concurrently(files):
+    with StandInLotto() as stand_in:
+        summary = sync_draw_history(DrawIndex(*files), 12, stand_in.url, max_workers=4, retries=0)
+    assert summary == {'requested': 12, 'fetched': 12, 'failed': 0, 'cached': 0}
+    assert 1 < stand_in.peak <= 4
+
+
+def test_sync_retries_429_and_5xx_with_backoff(files):
+    backoff = 0.05
+    with StandInLotto() as stand_in:
+        stand_in.statuses = {3: [429, 503]}
+        summary = sync_draw_history(DrawIndex(*files), 4, stand_in.url, max_workers=2,
+                                    retries=2, backoff=backoff)
+    assert summary['fetched'] == 4 and summary['failed'] == 0
+    first, second, third = stand_in.requests[3]
+    # 지수 백오프: 두 번째 재시도는 첫 번째보다 두 배 이상 기다림
+    assert second - first >= backoff
+    assert third - second >= backoff * 2
+    assert all(len(stand_in.requests[r]) == 1 for r in (1, 2, 4))
+
+
+def test_sync_journals_partial_results_and_resumes(files):
+    with StandInLotto() as stand_in:
+        stand_in.statuses = {5: [500] * 3}
+        stand_in.undrawn = {7}
+        index = DrawIndex(*files)
+        summary = sync_draw_history(index, 8, stand_in.url, max_workers=4, retries=2, backoff=0.01)
+        assert summary == {'requested': 8, 'fetched': 6, 'failed': 2, 'cached': 0}
+        assert len(stand_in.requests[5]) == 3  # 서버 오류는 재시도
+        assert len(stand_in.requests[7]) == 1  # 미발표 응답은 재시도하지 않음
+        assert not index.should_fetch(5) and not index.should_fetch(7)
+
+        # 다른 프로세스처럼 파일에서 다시 읽으면 성공한 회차만 남아 있음
+        reopened = DrawIndex(*files)
+        assert reopened.rounds() == [1, 2, 3, 4, 6, 8]
+        assert reopened.get(6)['numbers'] == [7, 8, 9, 10, 11, 12]
+
+        # 다시 실행하면 빠진 회차만 요청
+        stand_in.undrawn = set()
+        summary = sync_draw_history(reopened, 8, stand_in.url, max_workers=4, retries=0)
+    assert summary == {'requested': 2, 'fetched': 2, 'failed': 0, 'cached': 6}
+    assert DrawIndex(*files).rounds() == list(range(1, 9))
+
+
+def test_background_sync_repeats_and_picks_up_new_rounds(files):
+    latest = [3]
+    passes = []
+    with StandInLotto(latency=0) as stand_in:
+        index = DrawIndex(*files)
+        start_background_sync(index, lambda: latest[0], on_complete=lambda: passes.append(index.latest_round()),
+                              interval=0.05, api_url=stand_in.url, max_workers=2, retries=0)
+        deadline = time.monotonic() + 5
+        while not passes and time.monotonic() < deadline:
+            time.sleep(0.01)
+        latest[0] = 5  # 새 회차 추첨
+        while index.latest_round() < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+    assert passes[0] == 3
+    assert index.rounds() == [1, 2, 3, 4, 5]
+    assert 5 in passes  # 다음 주기에 채운 뒤 on_complete(채점)도 다시 호출
@@ -0,0 +1,163 @@
+import asyncio
+import random
+
+import pytest
+
+from provider_gateway import CircuitBreaker, ProviderGateway, ProviderUnavailableError, TokenBucket
+
+
+class FakeProvider:
+    """부하/장애 시험용 가짜 AI 호출
+
+    latency 초(±jitter) 뒤에 error_rate 확률로 예외를 던지고, 아니면 무작위
+    번호 조합 count 개를 돌려줍니다. ask_* 함수 대신 게이트웨이에 넣어 씁니다.
+    """
+
+    def __init__(self, latency=0.5, jitter=0.0, error_rate=0.0, count=5, error=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.count = count
+        self.error = error or RuntimeError("가짜 AI 오류")
+        self.calls = 0
+
+    async def __call__(self, *args):
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if random.random() < self.error_rate:
+            raise self.error
+        return [sorted(random.sample(range(1, 46), 6)) for _ in range(self.count)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=3, clock=clock)
+    assert [bucket.try_acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.try_acquire() == 0
+    clock.now += 100
+    assert bucket.tokens() == 3  # capacity 이상 쌓이지 않음
+
+
+def test_gateway_rejects_when_rate_limited():
+    provider = FakeProvider(latency=0)
+    gateway = ProviderGateway('fake', rate_per_second=0.01, burst=2, max_queue_seconds=0.1)
+
+    async def run():
+        results = [await gateway.call(provider) for _ in range(2)]
+        with pytest.raises(ProviderUnavailableError):
+            await gateway.call(provider)
+        return results
+
+    results = asyncio.run(run())
+    assert len(results) == 2 and all(len(combos) == 5 for combos in results)
+    assert provider.calls == 2
+    assert gateway.rejected == 1
+
+
+def test_breaker_open_half_open_close_cycle():
+    clock = FakeClock()
+    failing = FakeProvider(latency=0, error_rate=1.0)
+    healthy = FakeProvider(latency=0)
+    gateway = ProviderGateway('fake', burst=100, failure_threshold=2, reset_seconds=10, clock=clock)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await gateway.call(failing)
+        assert gateway.breaker.state == CircuitBreaker.OPEN
+        assert not gateway.available()
+
+        # 차단 중에는 AI를 호출하지 않고 바로 거절
+        with pytest.raises(ProviderUnavailableError):
+            await gateway.call(healthy)
+        assert healthy.calls == 0
+
+        # 차단 시간이 지나면 시험 호출 한 번 허용, 실패하면 다시 차단
+        clock.now += 10
+        with pytest.raises(RuntimeError):
+            await gateway.call(failing)
+        assert gateway.breaker.state == CircuitBreaker.OPEN
+        assert failing.calls == 3
+
+        # 다시 시험 호출이 성공하면 정상 상태로 복귀
+        clock.now += 10
+        assert gateway.breaker.allow()
+        gateway.breaker.release()
+        assert gateway.breaker.state == CircuitBreaker.HALF_OPEN
+        await gateway.call(healthy)
+        assert gateway.breaker.state == CircuitBreaker.CLOSED
+        await gateway.call(healthy)
+
+    asyncio.run(run())
+    assert healthy.calls == 2
+    assert gateway.breaker.trips == 2
+
+
+def test_half_open_allows_single_trial():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=5, clock=clock)
+    breaker.record_failure()
+    clock.now += 5
+    assert breaker.allow()
+    assert not breaker.allow()  # 시험 호출이 끝나기 전 두 번째 호출은 거절
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_semaphore_limits_concurrent_calls():
+    provider = FakeProvider(latency=0.05)
+    gateway = ProviderGateway('fake', max_concurrency=2, burst=100, max_queue_seconds=5)
+    peak = 0
+
+    async def tracked(*args):
+        nonlocal peak
+        peak = max(peak, gateway.in_flight)
+        return await provider(*args)
+
+    async def run():
+        return await asyncio.gather(*(gateway.call(tracked) for _ in range(6)))
+
+    assert len(asyncio.run(run())) == 6
+    assert peak == 2
+    assert gateway.in_flight == 0
+
+
+def test_semaphore_rejects_after_queue_wait():
+    provider = FakeProvider(latency=0.3)
+    gateway = ProviderGateway('fake', max_concurrency=2, burst=100, max_queue_seconds=0.05)
+
+    async def run():
+        return await asyncio.gather(*(gateway.call(provider) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    rejected = [r for r in results if isinstance(r, ProviderUnavailableError)]
+    assert len(rejected) == 1 and '동시 요청 한도' in str(rejected[0])
+    assert provider.calls == 2
+    # 자리가 없어 거절된 호출은 AI 장애로 세지 않음
+    assert gateway.breaker.state == CircuitBreaker.CLOSED and gateway.failures == 0
+
+
+def test_free_slot_is_used_without_queue_wait():
+    provider = FakeProvider(latency=0.05)
+    gateway = ProviderGateway('fake', max_concurrency=1, burst=100, max_queue_seconds=0)
+
+    async def run():
+        first = await gateway.call(provider)
+        second = await asyncio.gather(gateway.call(provider), gateway.call(provider), return_exceptions=True)
+        return first, second
+
+    first, (ok, rejected) = asyncio.run(run())
+    # 자리가 비어 있으면 대기 시간이 0이어도 바로 호출, 꽉 차 있을 때만 거절
+    assert len(first) == 5 and len(ok) == 5
+    assert isinstance(rejected, ProviderUnavailableError)
+    assert provider.calls == 2 and gateway.rejected == 1
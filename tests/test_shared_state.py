@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from shared_state import CachedState, RedisStore, create_state_backend
+from user_store import UserStore
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def redis_server():
+    fakeredis = pytest.importorskip('fakeredis')
+    return fakeredis.FakeServer()
+
+
+def redis_backend(server):
+    # 프로세스/노드마다 자기 연결을 갖는 것처럼 같은 서버에 클라이언트를 따로 만듦
+    import fakeredis
+    client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    return create_state_backend('redis', None, redis_client=client)
+
+
+def test_create_state_backend_uses_injected_client(redis_server):
+    store = redis_backend(redis_server)
+    assert isinstance(store, RedisStore)
+    assert 'admin' in store.load_users()
+    assert store.stats()['users'] == 1
+
+
+def test_redis_store_tickets_grading_and_jobs(redis_server):
+    store = redis_backend(redis_server)
+    first = store.add_ticket('kim', {'type': 'generated', 'numbers': [1, 2, 3, 4, 5, 6], 'round': 10})
+    second = store.add_ticket('kim', {'type': 'generated', 'numbers': [7, 8, 9, 10, 11, 12], 'round': 11})
+    assert [item['id'] for item in store.user_tickets('kim')] == [first, second]
+    assert store.ungraded_rounds(10) == [10]
+    assert [t['id'] for t in store.ungraded_tickets([10, 11])] == [first, second]
+
+    store.save_grades([('kim', first, {'rank': 1, 'result': '1등', 'matched': 6, 'graded_at': 'now'})])
+    assert store.get_ticket('kim', first)['rank'] == 1
+    assert store.ungraded_rounds(11) == [11]
+    store.set_graded_round(10)
+    store.set_graded_round(9)  # 기준 회차는 내려가지 않음
+    assert store.graded_round() == 10
+
+    assert store.delete_ticket('kim', second)
+    assert not store.delete_ticket('kim', second)
+    assert store.ungraded_rounds(11) == []
+
+    store.save_job('job-1', 'kim', {'status': 'pending'}, ttl=60)
+    assert store.load_job('job-1') == ('kim', {'status': 'pending'})
+    assert store.load_job('missing') is None
+
+
+def test_cached_state_invalidated_by_other_redis_client(redis_server):
+    reader = CachedState(redis_backend(redis_server))
+    writer = CachedState(redis_backend(redis_server))
+    assert reader.tickets('kim') == []
+    assert reader.tickets('kim') == []
+    assert reader.hits == 1
+
+    writer.add_ticket('kim', {'type': 'generated', 'numbers': [1, 2, 3, 4, 5, 6]})
+    assert [item['numbers'] for item in reader.tickets('kim')] == [[1, 2, 3, 4, 5, 6]]
+    writer.save_user('lee', {'password': 'x'})
+    assert 'lee' in reader.users()
+    assert reader.misses == 3
+
+
+def run_in_other_process(code):
+    subprocess.run([sys.executable, '-c', textwrap.dedent(code)], cwd=REPO_ROOT, check=True, timeout=60)
+
+
+def test_sqlite_cache_invalidated_by_other_process(tmp_path):
+    db_file = str(tmp_path / 'lotto.db')
+    state = CachedState(UserStore(db_file))
+    assert state.tickets('kim') == []
+    assert 'lee' not in state.users()
+    version = state.backend.version('tickets:kim')
+
+    run_in_other_process(f"""
+        from user_store import UserStore
+        store = UserStore({db_file!r})
+        store.add_ticket('kim', {{'type': 'generated', 'numbers': [1, 2, 3, 4, 5, 6]}})
+        store.save_user('lee', {{'password': 'x'}})
+    """)
+
+    assert state.backend.version('tickets:kim') > version
+    assert [item['numbers'] for item in state.tickets('kim')] == [[1, 2, 3, 4, 5, 6]]
+    assert 'lee' in state.users()
+    # 변경이 없으면 다시 읽지 않음
+    misses = state.misses
+    state.tickets('kim')
+    state.users()
+    assert state.misses == misses
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from draw_store import DrawIndex
+from ticket_grading import TicketGrader, grade_rows, grade_ticket, grade_tickets
+from user_store import UserStore
+
+WIN = [1, 2, 3, 4, 5, 6]
+BONUS = 7
+
+
+@pytest.mark.parametrize('ticket, rank, matched', [
+    ([1, 2, 3, 4, 5, 6], 1, 6),
+    ([1, 2, 3, 4, 5, 7], 2, 5),   # 5개 + 보너스
+    ([1, 2, 3, 4, 5, 8], 3, 5),
+    ([1, 2, 3, 4, 7, 8], 4, 4),   # 4개 일치는 보너스와 무관
+    ([1, 2, 3, 7, 8, 9], 5, 3),
+    ([1, 2, 7, 8, 9, 10], 0, 2),
+])
+def test_scalar_rank_rules(ticket, rank, matched):
+    assert grade_ticket(ticket, WIN, BONUS) == (rank, matched)
+
+
+def scalar_grades(tickets, rounds, matrix):
+    """grade_tickets 와 같은 결과를 grade_ticket 반복으로 계산"""
+    tallies = np.zeros((len(tickets), 6), dtype=np.int64)
+    best_rank = np.zeros(len(tickets), dtype=np.int64)
+    best_round = np.zeros(len(tickets), dtype=np.int64)
+    for i, ticket in enumerate(tickets.tolist()):
+        for round_number, row in zip(rounds.tolist(), matrix.tolist()):
+            rank, _ = grade_ticket(ticket, row[:6], row[6])
+            tallies[i, rank] += 1
+            if rank and (best_rank[i] == 0 or rank < best_rank[i]):
+                best_rank[i], best_round[i] = rank, round_number
+    return tallies, best_rank, best_round
+
+
+def random_draws(rng, count):
+    numbers = np.array([rng.choice(np.arange(1, 46), size=7, replace=False) for _ in range(count)])
+    return np.column_stack([np.sort(numbers[:, :6], axis=1), numbers[:, 6]])
+
+
+@pytest.mark.parametrize('chunk_pairs', [1 << 20, 97])
+def test_grade_tickets_matches_scalar(chunk_pairs):
+    rng = np.random.default_rng(7)
+    rounds = np.arange(1, 121)
+    matrix = random_draws(rng, len(rounds)).astype(np.uint8)
+    tickets = np.sort(np.array([rng.choice(np.arange(1, 46), size=6, replace=False) for _ in range(150)]), axis=1)
+    # 1~3등이 꼭 나오도록 회차 10 기준 1등, 2등(5개 + 보너스), 3등 번호를 심어 둠
+    win, bonus = matrix[9, :6].tolist(), int(matrix[9, 6])
+    other = next(n for n in range(1, 46) if n not in win and n != bonus)
+    tickets[:3] = [sorted(win), sorted(win[:5] + [bonus]), sorted(win[:5] + [other])]
+
+    result = grade_tickets(tickets, rounds, matrix, chunk_pairs=chunk_pairs)
+    tallies, best_rank, best_round = scalar_grades(tickets, rounds, matrix)
+    np.testing.assert_array_equal(result['tallies'], tallies)
+    np.testing.assert_array_equal(result['best_rank'], best_rank)
+    np.testing.assert_array_equal(result['best_round'], best_round)
+    assert result['best_rank'][:3].tolist() == [1, 2, 3]
+
+
+def test_grade_rows_matches_scalar():
+    rng = np.random.default_rng(11)
+    draws = random_draws(rng, 2000)
+    tickets = np.sort(np.array([rng.choice(np.arange(1, 46), size=6, replace=False) for _ in range(2000)]), axis=1)
+    # 2등 경우를 확실히 포함
+    tickets[0] = np.sort(np.append(draws[0, :5], draws[0, 6]))
+    ranks, matched = grade_rows(tickets, draws)
+    expected = [grade_ticket(t, d[:6], d[6]) for t, d in zip(tickets.tolist(), draws.tolist())]
+    assert ranks.tolist() == [rank for rank, _ in expected]
+    assert matched.tolist() == [count for _, count in expected]
+    assert ranks[0] == 2
+
+
+def test_grade_pending_waits_for_missing_rounds(tmp_path):
+    state = UserStore(str(tmp_path / 'lotto.db'))
+    index = DrawIndex(str(tmp_path / 'draws.bin'), str(tmp_path / 'draws.journal'))
+    grader = TicketGrader(state, index)
+    index.subscribe(grader.on_new_draw)
+    for round_number in (1, 2, 3, 4):
+        state.add_ticket('admin', {'type': 'generated', 'numbers': WIN, 'round': round_number})
+
+    # 3회차 동기화 실패: 1, 2, 4회차만 캐시됨
+    for round_number in (1, 2, 4):
+        index.add(round_number, WIN, BONUS, '2020-01-01')
+    grader.grade_pending()
+    assert state.graded_round() == 2
+    assert {t['round'] for t in state.ungraded_tickets([1, 2, 3, 4])} == {3}
+
+    # 빠졌던 회차가 들어오면 알림으로 채점되고 기준 회차가 4까지 올라감
+    index.add(3, WIN, BONUS, '2020-01-01')
+    assert state.ungraded_tickets([1, 2, 3, 4]) == []
+    assert state.graded_round() == 4
@@ -0,0 +1,59 @@
+import time
+from itertools import combinations
+
+import pytest
+
+from combo_index import combo_ranks
+from wheeling import build_wheel
+
+POOL = [3, 7, 12, 18, 21, 25, 30, 33, 38, 41]
+
+
+def brute_force_covered(tickets, pool, match, guarantee):
+    """풀의 guarantee 개 조합마다 match 개 이상 겹치는 번호가 있는지 직접 확인"""
+    return sum(1 for target in combinations(pool, guarantee)
+               if any(len(set(target) & set(ticket)) >= match for ticket in tickets))
+
+
+@pytest.mark.parametrize('tickets, match, guarantee', [(6, 3, 3), (10, 3, 4), (4, 4, 5)])
+def test_wheel_reaches_reported_coverage_within_budget(tickets, match, guarantee):
+    started = time.perf_counter()
+    wheel = build_wheel(POOL, tickets, match=match, guarantee=guarantee, seed=1, time_budget=0.5)
+    elapsed = time.perf_counter() - started
+
+    assert len(wheel['tickets']) <= tickets
+    assert len({tuple(t) for t in wheel['tickets']}) == len(wheel['tickets'])
+    assert all(len(t) == 6 and set(t) <= set(POOL) for t in wheel['tickets'])
+    assert not wheel['targets_sampled'] and wheel['targets'] == len(list(combinations(POOL, guarantee)))
+
+    covered = brute_force_covered(wheel['tickets'], POOL, match, guarantee)
+    assert covered == wheel['covered']
+    assert wheel['coverage'] == pytest.approx(covered / wheel['targets'], abs=1e-6)
+    assert wheel['coverage'] >= wheel['greedy_coverage']
+    # 교체 탐색 시간 제한 + 확률 추정 등 나머지 작업
+    assert elapsed < 0.5 + 2.0
+
+
+def test_wheel_full_coverage_and_excluded_winners():
+    pool = POOL[:7]
+    every_ticket = [list(c) for c in combinations(pool, 6)]
+    winner = every_ticket[0]
+    wheel = build_wheel(pool, 7, match=5, guarantee=5, exclude_ranks=combo_ranks([winner]), seed=2)
+    assert wheel['excluded_winners'] == 1
+    assert winner not in wheel['tickets'] and len(wheel['tickets']) == 6
+    assert wheel['covered'] == brute_force_covered(wheel['tickets'], pool, 5, 5) == wheel['targets']
+    assert wheel['coverage'] == 1.0
+
+
+def test_wheel_respects_time_budget_on_larger_pool():
+    pool = list(range(1, 19))
+    started = time.perf_counter()
+    wheel = build_wheel(pool, 20, match=3, guarantee=4, seed=1, time_budget=0.2)
+    elapsed = time.perf_counter() - started
+    assert len(wheel['tickets']) == 20
+    assert wheel['covered'] == brute_force_covered(wheel['tickets'], pool, 3, 4)
+    assert elapsed < 2.0 and wheel['elapsed_seconds'] <= elapsed
+
+    # 시간 제한이 0이면 교체 탐색 없이 욕심쟁이 선택 결과 그대로
+    greedy_only = build_wheel(pool, 20, match=3, guarantee=4, seed=1, time_budget=0)
+    assert greedy_only['swaps'] == 0 and greedy_only['coverage'] == greedy_only['greedy_coverage']
@@ -0,0 +1,207 @@
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# 등수별 표시 문구 (0: 낙첨)
+RANK_TEXTS = {
+    1: '🎉 1등 당첨!',
+    2: '2등 (보너스번호 포함)',
+    3: '3등',
+    4: '4등',
+    5: '5등',
+    0: '낙첨'
+}
+
+# 1회차 판매 마감 시각 (매주 토요일 20시에 마감 후 추첨)
+FIRST_DRAW_CUTOFF = datetime(2002, 12, 7, 20, 0)
+
+# 한 번에 만드는 (번호 × 회차) 일치 개수 행렬의 최대 칸 수 (메모리 상한)
+GRADING_CHUNK_PAIRS = 1 << 20
+
+
+def rank_for(matched, bonus_hit):
+    """일치 개수와 보너스 번호 포함 여부로 등수 계산 (0: 낙첨)"""
+    if matched == 6:
+        return 1
+    if matched == 5:
+        return 2 if bonus_hit else 3
+    if matched == 4:
+        return 4
+    if matched == 3:
+        return 5
+    return 0
+
+
+def grade_ticket(numbers, win_numbers, bonus):
+    """번호 한 장을 한 회차와 비교해 (등수, 일치 개수) 반환"""
+    matched = len(set(numbers) & set(win_numbers))
+    return rank_for(matched, bonus in numbers), matched
+
+
+def draw_round_for(when):
+    """해당 시각에 산 번호가 참여하는 회차 (토요일 판매 마감 이후면 다음 회차)"""
+    if when <= FIRST_DRAW_CUTOFF:
+        return 1
+    return (when - FIRST_DRAW_CUTOFF - timedelta(microseconds=1)) // timedelta(days=7) + 2
+
+
+def membership(combos):
+    """N×k 번호 배열을 N×46 0/1 행렬로 변환 (열 번호 = 로또 번호, 0번 열은 사용 안 함)"""
+    combos = np.asarray(combos, dtype=np.int64)
+    onehot = np.zeros((len(combos), 46), dtype=np.float32)
+    onehot[np.arange(len(combos))[:, None], combos] = 1
+    return onehot
+
+
+def rank_matrix(ticket_onehot, draw_onehot, bonuses):
+    """번호 × 회차 등수 행렬 (int8)
+
+    일치 개수는 두 0/1 행렬의 곱 한 번(T×46 · 46×R)으로, 보너스 포함 여부는
+    번호 행렬에서 회차별 보너스 열을 골라 한 번에 구합니다.
+    """
+    matched = (ticket_onehot @ draw_onehot.T).astype(np.int8)
+    return ranks_from(matched, ticket_onehot[:, bonuses] > 0)
+
+
+def ranks_from(matched, bonus_hit):
+    """일치 개수 배열과 보너스 포함 여부 배열로 등수 배열 계산 (rank_for 의 배열 버전)"""
+    return np.select(
+        [matched == 6, (matched == 5) & bonus_hit, matched == 5, matched == 4, matched == 3],
+        [1, 2, 3, 4, 5], 0).astype(np.int8)
+
+
+def grade_rows(tickets, draw_rows):
+    """번호 i 를 회차 행 i 와 비교 (T×6 번호, T×7 당첨번호+보너스) -> (등수 배열, 일치 개수 배열)"""
+    ticket_onehot = membership(tickets)
+    draw_rows = np.asarray(draw_rows, dtype=np.int64)
+    matched = (ticket_onehot * membership(draw_rows[:, :6])).sum(axis=1).astype(np.int8)
+    bonus_hit = ticket_onehot[np.arange(len(draw_rows)), draw_rows[:, 6]] > 0
+    return ranks_from(matched, bonus_hit), matched
+
+
+def grade_tickets(tickets, rounds, matrix, chunk_pairs=GRADING_CHUNK_PAIRS):
+    """여러 장의 번호를 여러 회차와 한 번에 비교
+
+    tickets: T×6 번호 배열, rounds/matrix: DrawIndex.draw_matrix() 의 결과
+    (또는 그 일부 회차). 번호를 나눠 (번호 × 회차) 칸 수가 chunk_pairs 를
+    넘지 않게 계산하므로 번호/회차가 많아도 메모리 사용량이 일정합니다.
+
+    반환: {
+      'tallies': T×6 배열 (열 k = k등 횟수, 0열 = 낙첨 횟수),
+      'best_rank': 번호별 최고 등수 (당첨 없으면 0),
+      'best_round': 최고 등수를 처음 기록한 회차 (당첨 없으면 0)
+    }
+    """
+    tickets = np.asarray(tickets, dtype=np.int64).reshape(-1, 6)
+    rounds = np.asarray(rounds)
+    matrix = np.asarray(matrix)
+    count = len(tickets)
+    tallies = np.zeros((count, 6), dtype=np.int64)
+    best_rank = np.zeros(count, dtype=np.int8)
+    best_round = np.zeros(count, dtype=np.int64)
+    if count == 0 or len(rounds) == 0:
+        return {'tallies': tallies, 'best_rank': best_rank, 'best_round': best_round}
+
+    draw_onehot = membership(matrix[:, :6])
+    bonuses = matrix[:, 6].astype(np.int64)
+    step = max(1, chunk_pairs // len(rounds))
+    for start in range(0, count, step):
+        end = min(start + step, count)
+        ranks = rank_matrix(membership(tickets[start:end]), draw_onehot, bonuses)
+        for rank in range(6):
+            tallies[start:end, rank] = (ranks == rank).sum(axis=1)
+        # 낙첨(0)이 가장 나쁜 등수가 되도록 0을 6으로 바꿔 최솟값 위치를 찾음
+        ordered = np.where(ranks == 0, 6, ranks)
+        best = ordered.argmin(axis=1)
+        best_value = ordered[np.arange(end - start), best]
+        best_rank[start:end] = np.where(best_value == 6, 0, best_value)
+        best_round[start:end] = np.where(best_value == 6, 0, rounds[best])
+    return {'tallies': tallies, 'best_rank': best_rank, 'best_round': best_round}
+
+
+def select_rounds(rounds, matrix, start_round, end_round):
+    """draw_matrix() 결과에서 start_round ~ end_round 구간만 잘라냄 (회차는 오름차순)"""
+    lo = np.searchsorted(rounds, start_round, side='left')
+    hi = np.searchsorted(rounds, end_round, side='right')
+    return rounds[lo:hi], matrix[lo:hi]
+
+
+class TicketGrader:
+    """새 회차가 들어오면 그 회차를 기다리던 저장 번호를 채점 (DrawIndex 리스너)
+
+    채점 결과(rank, result, matched, graded_at)는 저장 번호에 바로 기록하므로
+    /my-lotto 는 다시 계산하지 않고 보여 주기만 합니다. 저장소에는 빈틈 없이
+    채점을 끝낸 마지막 회차(graded_round)를 남겨, 이미 처리한 회차의 알림이
+    다시 오거나(다른 워커의 저널 반영 등) 채점을 다시 돌려도 바로 끝납니다.
+    """
+
+    def __init__(self, state, draw_index):
+        self.state = state
+        self.draw_index = draw_index
+        self._lock = threading.Lock()
+        self._seen = set()  # 기준 회차보다 뒤에서 먼저 채점한 회차
+        self.graded = 0
+
+    def on_new_draw(self, round_number, entry):
+        """새 회차 알림: 해당 회차의 미채점 번호만 채점"""
+        round_number = int(round_number)
+        if round_number <= self.state.graded_round():
+            return 0
+        with self._lock:
+            graded = self._grade_rounds([round_number])
+            self._seen.add(round_number)
+            self._advance_graded_round()
+        return graded
+
+    def grade_pending(self):
+        """캐시된 회차 중 아직 채점하지 않은 번호를 모두 채점 (시작 시/동기화 후 따라잡기)"""
+        with self._lock:
+            cached = self.draw_index.rounds()
+            latest_round = cached[-1] if cached else 0
+            graded = self._grade_rounds(self.state.ungraded_rounds(latest_round))
+            # 동기화에 실패한 회차를 건너뛰어 기준 회차를 올리면 그 회차가 나중에 들어와도
+            # 채점되지 않으므로, 캐시된 회차만 채점 완료로 기록
+            self._seen.update(cached)
+            graded_round = self._advance_graded_round()
+        if graded:
+            print(f"저장 번호 채점 완료: {graded}개 (기준 회차 {graded_round}회)")
+        return graded
+
+    def reset(self):
+        """회차가 지워지거나 바뀌면 기준 회차 뒤에서 채점한 회차 기록을 버림 (DrawIndex 리셋 리스너)"""
+        with self._lock:
+            self._seen = set()
+
+    def _advance_graded_round(self):
+        # 빈틈 없이 이어지는 회차까지만 기준 회차를 올림 (병렬 동기화로 알림 순서가 섞이거나 회차가 빠질 수 있음)
+        graded_round = self.state.graded_round()
+        while graded_round + 1 in self._seen:
+            graded_round += 1
+        self._seen = {r for r in self._seen if r > graded_round}
+        if graded_round > self.state.graded_round():
+            self.state.set_graded_round(graded_round)
+        return graded_round
+
+    def _grade_rounds(self, round_numbers):
+        draws = {r: self.draw_index.get(r) for r in round_numbers}
+        draws = {r: entry for r, entry in draws.items() if entry}
+        if not draws:
+            return 0
+        tickets = self.state.ungraded_tickets(list(draws))
+        if not tickets:
+            return 0
+        draw_rows = [sorted(draws[t['round']]['numbers']) + [draws[t['round']]['bonus']] for t in tickets]
+        ranks, matched = grade_rows([t['numbers'] for t in tickets], draw_rows)
+        graded_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        grades = [
+            (t['user_id'], t['id'], {'rank': int(rank), 'result': RANK_TEXTS[int(rank)],
+                                     'matched': int(count), 'graded_at': graded_at})
+            for t, rank, count in zip(tickets, ranks, matched)
+        ]
+        self.state.save_grades(grades)
+        self.graded += len(grades)
+        return len(grades)
+
+    def stats(self):
+        return {'graded_round': self.state.graded_round(), 'graded': self.graded}
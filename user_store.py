@@ -0,0 +1,384 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from ticket_grading import draw_round_for
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    is_admin INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lotto_tickets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    type TEXT,
+    round INTEGER,
+    rank INTEGER,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_user_created ON lotto_tickets (user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_tickets_user_id ON lotto_tickets (user_id, id);
+CREATE INDEX IF NOT EXISTS idx_tickets_user_round ON lotto_tickets (user_id, round, id);
+CREATE INDEX IF NOT EXISTS idx_tickets_user_rank ON lotto_tickets (user_id, rank, id);
+CREATE INDEX IF NOT EXISTS idx_tickets_ungraded ON lotto_tickets (round, id) WHERE rank IS NULL;
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs (expires_at);
+CREATE TABLE IF NOT EXISTS api_keys (
+    user_id TEXT PRIMARY KEY,
+    openai TEXT NOT NULL DEFAULT '',
+    anthropic TEXT NOT NULL DEFAULT '',
+    google TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL
+);
+"""
+
+# 처음 실행 시 만드는 기본 관리자 계정
+DEFAULT_ADMIN = ('admin', {'password': 'admin1234', 'is_admin': True})
+
+
+def now_text():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def ticket_created_at(item):
+    """저장 번호 항목의 생성/조회 시각"""
+    return item.get('generated_at') or item.get('checked_at') or now_text()
+
+
+class UserStore:
+    """사용자, 저장한 로또 번호, API 키를 보관하는 SQLite(WAL) 저장소
+
+    JSON 파일 전체를 다시 쓰던 방식과 달리, 저장/삭제 한 번은 행 하나의
+    INSERT/UPDATE/DELETE 입니다. WAL 모드라 읽기와 쓰기가 서로 막지 않고,
+    여러 스레드/프로세스가 동시에 써도 파일이 깨지지 않습니다.
+    처음 열 때 기존 JSON 파일이 있으면 한 번만 가져옵니다.
+
+    쓰기마다 같은 트랜잭션에서 'users', 'tickets:<사용자>' 등의 버전을 올려,
+    다른 프로세스의 캐시가 version() 만 확인하고 다시 읽을지 판단할 수 있습니다.
+    """
+
+    def __init__(self, db_file, legacy_users_file=None, legacy_my_lotto_file=None, legacy_api_keys_file=None):
+        self.db_file = db_file
+        self.legacy_users_file = legacy_users_file
+        self.legacy_my_lotto_file = legacy_my_lotto_file
+        self.legacy_api_keys_file = legacy_api_keys_file
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        # 스레드마다 연결 하나 (fork 후 자식 프로세스에서는 새로 연결)
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.db_file, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=10000')
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @property
+    def conn(self):
+        if not self._initialized:
+            self.init()
+        return self._connect()
+
+    def init(self):
+        """테이블 생성 및 기존 JSON 파일 가져오기 (한 번만)"""
+        with self._init_lock:
+            if self._initialized:
+                return
+            conn = self._connect()
+            with conn:
+                conn.executescript(SCHEMA)
+            imported = conn.execute("SELECT value FROM meta WHERE key = 'legacy_imported'").fetchone()
+            if imported is None:
+                self._import_legacy(conn)
+            if conn.execute("SELECT value FROM meta WHERE key = 'ticket_rounds_filled'").fetchone() is None:
+                self._fill_ticket_rounds(conn)
+            if conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 0:
+                with conn:
+                    self._upsert_user(conn, *DEFAULT_ADMIN)
+            self._initialized = True
+
+    def _read_legacy(self, path):
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"기존 파일 읽기 실패 ({path}): {e}")
+            return {}
+
+    def _import_legacy(self, conn):
+        users = self._read_legacy(self.legacy_users_file)
+        my_lotto = self._read_legacy(self.legacy_my_lotto_file)
+        api_keys = self._read_legacy(self.legacy_api_keys_file)
+        with conn:
+            for username, user in users.items():
+                self._upsert_user(conn, username, user)
+            tickets = 0
+            for user_id, items in my_lotto.items():
+                for item in items:
+                    self._insert_ticket(conn, user_id, item)
+                    tickets += 1
+            for user_id, keys in api_keys.items():
+                self._upsert_api_keys(conn, user_id, keys)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported', ?)", (now_text(),))
+        if users or my_lotto or api_keys:
+            print(f"기존 JSON 데이터 가져오기 완료: 사용자 {len(users)}명, 저장 번호 {tickets}개, API 키 {len(api_keys)}명")
+
+    def _fill_ticket_rounds(self, conn):
+        # 회차 없이 저장된 생성 번호에 생성 시각 기준 추첨 회차를 채움 (자동 채점 대상이 되도록)
+        rows = conn.execute("SELECT id, user_id, created_at FROM lotto_tickets "
+                            "WHERE type = '생성된 번호' AND round IS NULL").fetchall()
+        updates = []
+        for row in rows:
+            try:
+                round_number = draw_round_for(datetime.strptime(row['created_at'], '%Y-%m-%d %H:%M:%S'))
+            except ValueError:
+                continue
+            updates.append((round_number, round_number, row['id']))
+        with conn:
+            conn.executemany("UPDATE lotto_tickets SET round = ?, data = json_set(data, '$.round', ?) WHERE id = ?",
+                             updates)
+            for user_id in {row['user_id'] for row in rows}:
+                self._bump(conn, f'tickets:{user_id}')
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('ticket_rounds_filled', ?)", (now_text(),))
+        if updates:
+            print(f"생성 번호 추첨 회차 채우기 완료: {len(updates)}개")
+
+    # 변경 버전 (캐시 무효화용)
+    def _bump(self, conn, name):
+        conn.execute('INSERT INTO versions (name, version) VALUES (?, 1) '
+                     'ON CONFLICT(name) DO UPDATE SET version = version + 1', (name,))
+
+    def version(self, name):
+        row = self.conn.execute('SELECT version FROM versions WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else 0
+
+    # 사용자
+    def _upsert_user(self, conn, username, user):
+        conn.execute(
+            'INSERT INTO users (username, password, is_admin, created_at) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(username) DO UPDATE SET password = excluded.password, is_admin = excluded.is_admin',
+            (username, user['password'], int(bool(user.get('is_admin'))), now_text()))
+        self._bump(conn, 'users')
+
+    def load_users(self):
+        rows = self.conn.execute('SELECT username, password, is_admin FROM users ORDER BY created_at, username')
+        return {row['username']: {'password': row['password'], 'is_admin': bool(row['is_admin'])} for row in rows}
+
+    def save_user(self, username, user):
+        conn = self.conn
+        with conn:
+            self._upsert_user(conn, username, user)
+
+    def delete_user(self, username):
+        conn = self.conn
+        with conn:
+            conn.execute('DELETE FROM users WHERE username = ?', (username,))
+            self._bump(conn, 'users')
+
+    # 저장한 로또 번호
+    def _insert_ticket(self, conn, user_id, item):
+        item = {k: v for k, v in item.items() if k != 'id'}
+        cursor = conn.execute(
+            'INSERT INTO lotto_tickets (user_id, type, round, rank, created_at, data) VALUES (?, ?, ?, ?, ?, ?)',
+            (user_id, item.get('type'), item.get('round'), item.get('rank'), ticket_created_at(item),
+             json.dumps(item, ensure_ascii=False)))
+        self._bump(conn, f'tickets:{user_id}')
+        return cursor.lastrowid
+
+    @staticmethod
+    def _ticket(row):
+        item = json.loads(row['data'])
+        item['id'] = row['id']
+        return item
+
+    def load_tickets(self):
+        """{사용자: [저장 번호, ...]} (저장 순서, 항목마다 'id' 포함)"""
+        tickets = {}
+        for row in self.conn.execute('SELECT id, user_id, data FROM lotto_tickets ORDER BY user_id, id'):
+            tickets.setdefault(row['user_id'], []).append(self._ticket(row))
+        return tickets
+
+    def user_tickets(self, user_id):
+        rows = self.conn.execute('SELECT id, data FROM lotto_tickets WHERE user_id = ? ORDER BY id',
+                                 (user_id,))
+        return [self._ticket(row) for row in rows]
+
+    def ticket_page(self, user_id, before_id=None, limit=20, ticket_type=None, round_number=None, rank=None):
+        """최신순 keyset 페이지: ([요약, ...], 다음 페이지 커서 또는 None)
+
+        before_id 보다 작은 ID만 읽으므로 기록이 아무리 많아도 페이지마다
+        인덱스에서 limit+1 행만 읽습니다. 요약에는 process_info 를 빼고
+        has_process_info 만 표시합니다.
+        """
+        where, params = ['user_id = ?'], [user_id]
+        if before_id is not None:
+            where.append('id < ?')
+            params.append(before_id)
+        if ticket_type is not None:
+            where.append('type = ?')
+            params.append(ticket_type)
+        if round_number is not None:
+            where.append('round = ?')
+            params.append(round_number)
+        if rank is not None:
+            where.append('rank = ?')
+            params.append(rank)
+        rows = self.conn.execute(
+            "SELECT id, json_remove(data, '$.process_info') AS data, "
+            "json_type(data, '$.process_info') IS NOT NULL AS has_process_info "
+            f"FROM lotto_tickets WHERE {' AND '.join(where)} ORDER BY id DESC LIMIT ?",
+            params + [limit + 1]).fetchall()
+        items = []
+        for row in rows[:limit]:
+            item = self._ticket(row)
+            item['has_process_info'] = bool(row['has_process_info'])
+            items.append(item)
+        next_cursor = items[-1]['id'] if len(rows) > limit else None
+        return items, next_cursor
+
+    def get_ticket(self, user_id, ticket_id):
+        """번호 한 건 전체 (process_info 포함, 다른 사용자의 번호면 None)"""
+        row = self.conn.execute('SELECT id, data FROM lotto_tickets WHERE id = ? AND user_id = ?',
+                                (ticket_id, user_id)).fetchone()
+        return self._ticket(row) if row else None
+
+    def add_ticket(self, user_id, item):
+        """번호 한 건 추가 후 행 ID 반환"""
+        conn = self.conn
+        with conn:
+            return self._insert_ticket(conn, user_id, item)
+
+    def delete_ticket(self, user_id, ticket_id):
+        """번호 한 건 삭제 (다른 사용자의 번호는 삭제되지 않음)"""
+        conn = self.conn
+        with conn:
+            cursor = conn.execute('DELETE FROM lotto_tickets WHERE id = ? AND user_id = ?', (ticket_id, user_id))
+            self._bump(conn, f'tickets:{user_id}')
+            return cursor.rowcount > 0
+
+    # 자동 채점
+    def graded_round(self):
+        """빈틈 없이 채점을 마친 마지막 회차 (없으면 0)"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'graded_round'").fetchone()
+        return int(row[0]) if row else 0
+
+    def set_graded_round(self, round_number):
+        conn = self.conn
+        with conn:
+            conn.execute("INSERT INTO meta (key, value) VALUES ('graded_round', ?) "
+                         "ON CONFLICT(key) DO UPDATE SET value = MAX(CAST(value AS INTEGER), excluded.value)",
+                         (int(round_number),))
+
+    def ungraded_rounds(self, max_round):
+        """미채점 번호가 남아 있는 회차 목록 (max_round 이하)"""
+        rows = self.conn.execute('SELECT DISTINCT round FROM lotto_tickets '
+                                 'WHERE rank IS NULL AND round IS NOT NULL AND round <= ? ORDER BY round',
+                                 (max_round,))
+        return [row[0] for row in rows]
+
+    def ungraded_tickets(self, round_numbers):
+        """주어진 회차의 미채점 번호 [{'user_id', 'id', 'round', 'numbers'}, ...]"""
+        round_numbers = list(round_numbers)
+        tickets = []
+        for start in range(0, len(round_numbers), 500):
+            chunk = round_numbers[start:start + 500]
+            rows = self.conn.execute(
+                "SELECT id, user_id, round, json_extract(data, '$.numbers') AS numbers FROM lotto_tickets "
+                f"WHERE rank IS NULL AND round IN ({', '.join('?' * len(chunk))})", chunk)
+            tickets.extend({'user_id': row['user_id'], 'id': row['id'], 'round': row['round'],
+                            'numbers': json.loads(row['numbers'])} for row in rows)
+        return tickets
+
+    def save_grades(self, grades):
+        """채점 결과 [(사용자, 번호 ID, {'rank', 'result', 'matched', 'graded_at'}), ...] 기록
+
+        이미 채점된 번호(rank 가 있는 행)는 건드리지 않으므로 여러 워커가 같은
+        회차를 동시에 채점해도 결과가 한 번만 기록됩니다.
+        """
+        conn = self.conn
+        with conn:
+            conn.executemany(
+                "UPDATE lotto_tickets SET rank = ?, data = json_set(data, '$.rank', ?, '$.result', ?, "
+                "'$.matched', ?, '$.graded_at', ?) WHERE id = ? AND user_id = ? AND rank IS NULL",
+                [(g['rank'], g['rank'], g['result'], g['matched'], g['graded_at'], ticket_id, user_id)
+                 for user_id, ticket_id, g in grades])
+            for user_id in {user_id for user_id, _, _ in grades}:
+                self._bump(conn, f'tickets:{user_id}')
+
+    # 작업 큐 상태 (어느 워커 프로세스에서든 조회할 수 있도록 공유)
+    def save_job(self, job_id, owner, data, ttl):
+        """작업 상태 저장 (ttl 초 뒤 만료, 만료된 작업은 이때 함께 정리)"""
+        now = time.time()
+        conn = self.conn
+        with conn:
+            conn.execute('DELETE FROM jobs WHERE expires_at < ?', (now,))
+            conn.execute('INSERT OR REPLACE INTO jobs (id, owner, data, expires_at) VALUES (?, ?, ?, ?)',
+                         (job_id, owner, json.dumps(data, ensure_ascii=False), now + ttl))
+
+    def load_job(self, job_id):
+        """(소유자, 작업 상태) 반환 (없거나 만료되었으면 None)"""
+        row = self.conn.execute('SELECT owner, data FROM jobs WHERE id = ? AND expires_at >= ?',
+                                (job_id, time.time())).fetchone()
+        if row is None:
+            return None
+        return row['owner'], json.loads(row['data'])
+
+    # API 키 (암호화된 값 그대로 저장)
+    def _upsert_api_keys(self, conn, user_id, keys):
+        conn.execute(
+            'INSERT INTO api_keys (user_id, openai, anthropic, google, updated_at) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(user_id) DO UPDATE SET openai = excluded.openai, anthropic = excluded.anthropic, '
+            'google = excluded.google, updated_at = excluded.updated_at',
+            (user_id, keys.get('openai', ''), keys.get('anthropic', ''), keys.get('google', ''), now_text()))
+        self._bump(conn, f'api_keys:{user_id}')
+
+    def load_api_keys(self, user_id):
+        row = self.conn.execute('SELECT openai, anthropic, google FROM api_keys WHERE user_id = ?',
+                                (user_id,)).fetchone()
+        if row is None:
+            return {}
+        return {'openai': row['openai'], 'anthropic': row['anthropic'], 'google': row['google']}
+
+    def save_api_keys(self, user_id, keys):
+        conn = self.conn
+        with conn:
+            self._upsert_api_keys(conn, user_id, keys)
+
+    def stats(self):
+        conn = self.conn
+        return {
+            'backend': 'sqlite',
+            'users': conn.execute('SELECT COUNT(*) FROM users').fetchone()[0],
+            'tickets': conn.execute('SELECT COUNT(*) FROM lotto_tickets').fetchone()[0],
+            'api_keys': conn.execute('SELECT COUNT(*) FROM api_keys').fetchone()[0],
+            'file_size': os.path.getsize(self.db_file) if os.path.exists(self.db_file) else 0
+        }
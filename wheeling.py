@@ -0,0 +1,207 @@
+import time
+from math import comb
+
+import numpy as np
+
+from combo_index import combo_masks, combo_ranks, combos_from_ranks
+
+# (조건 조합 × 후보 번호) 칸 수 상한: 후보가 많으면 이 안에 들도록 무작위로 줄임
+WHEEL_MAX_PAIRS = 40_000_000
+# 조건 조합(풀에서 나올 수 있는 guarantee 개 번호 조합)이 이보다 많으면 표본으로 커버율을 추정
+WHEEL_MAX_TARGETS = 60_000
+WHEEL_MIN_CANDIDATES = 2_000
+# 한 번에 만드는 덮음 여부 행렬의 최대 칸 수 (메모리 상한)
+BLOCK_PAIRS = 4_000_000
+# 덮음 여부 행렬 전체를 미리 만들어 두는 최대 칸 수 (bool 이라 칸당 1바이트)
+CACHE_PAIRS = 40_000_000
+
+
+def mask_bits(masks, width):
+    """비트마스크 배열을 N×width 0/1 행렬로 펼침 (행렬 곱으로 겹치는 개수를 세기 위함)"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    return ((masks[:, None] >> np.arange(width, dtype=np.uint64)) & np.uint64(1)).astype(np.float32)
+
+
+def subsets(n, size, limit, rng):
+    """풀 위치 1..n 중 size 개 조합 전체 (limit 보다 많으면 중복 없는 무작위 표본) -> (N×size, 표본 여부)"""
+    total = comb(n, size)
+    if total <= limit:
+        return combos_from_ranks(np.arange(total), size), False
+    ranks = np.sort(rng.choice(total, size=limit, replace=False))
+    return combos_from_ranks(ranks, size), True
+
+
+class CoverageProblem:
+    """조건 조합(targets)과 후보 번호(candidates)의 '덮음' 관계
+
+    번호와 조건 조합은 풀 위치 비트마스크로 보관하고, 덮음 여부
+    (겹치는 번호 수 >= match)는 블록 단위 행렬 곱으로 계산합니다. 전체 행렬이
+    CACHE_PAIRS 칸 이하이면 한 번만 만들어 두고, 크면 필요한 부분만 계산합니다.
+    """
+
+    def __init__(self, target_masks, candidate_masks, width, match):
+        self.target_masks = target_masks
+        self.candidate_masks = candidate_masks
+        self.targets = mask_bits(target_masks, width)
+        self.candidates = mask_bits(candidate_masks, width)
+        self.match = match
+        self._cover = None
+        if len(target_masks) * len(candidate_masks) <= CACHE_PAIRS:
+            cover = np.empty((len(target_masks), len(candidate_masks)), dtype=bool)
+            step = max(1, BLOCK_PAIRS // max(1, len(candidate_masks)))
+            for start in range(0, len(target_masks), step):
+                cover[start:start + step] = self._compute(slice(start, start + step))
+            self._cover = cover
+
+    def _compute(self, target_index, candidate_index=None):
+        candidates = self.candidates if candidate_index is None else self.candidates[candidate_index]
+        return (self.targets[target_index] @ candidates.T) >= self.match
+
+    def covers(self, target_index, candidate_index=None):
+        """선택한 조건 조합 × 후보(전체 또는 일부) 덮음 여부 bool 행렬"""
+        if self._cover is None:
+            return self._compute(target_index, candidate_index)
+        rows = self._cover[target_index]
+        return rows if candidate_index is None else rows[:, candidate_index]
+
+    def gains(self, target_index):
+        """후보별로 target_index 조건 조합 중 몇 개를 덮는지"""
+        target_index = np.flatnonzero(target_index) if target_index.dtype == bool else target_index
+        gains = np.zeros(len(self.candidate_masks), dtype=np.int64)
+        step = max(1, BLOCK_PAIRS // max(1, len(self.candidate_masks)))
+        for start in range(0, len(target_index), step):
+            gains += self.covers(target_index[start:start + step]).sum(axis=0, dtype=np.int64)
+        return gains
+
+
+def greedy_cover(problem, tickets):
+    """덮지 못한 조건 조합을 가장 많이 덮는 후보를 차례로 고름
+
+    모두 덮으면 두 번째 층(같은 조건 조합을 한 번 더 덮기)으로 넘어가 tickets 장을 채웁니다.
+    """
+    target_count = len(problem.target_masks)
+    uncovered = np.ones(target_count, dtype=bool)
+    layer_gains = problem.gains(np.arange(target_count))  # 층을 새로 시작할 때마다 그대로 재사용
+    gains = layer_gains.copy()
+    chosen = []
+    while len(chosen) < min(tickets, len(problem.candidate_masks)):
+        gains[chosen] = -1
+        best = int(gains.argmax())
+        if gains[best] <= 0:
+            # 이번 층을 모두 덮었으면 다음 층 시작
+            uncovered[:] = True
+            gains = layer_gains.copy()
+            gains[chosen] = -1
+            best = int(gains.argmax())
+            if gains[best] <= 0:
+                break
+        chosen.append(best)
+        newly = np.flatnonzero(uncovered & problem.covers(slice(None), [best])[:, 0])
+        uncovered[newly] = False
+        gains -= problem.gains(newly)
+    return chosen
+
+
+def local_search(problem, chosen, rng, time_budget):
+    """번호 한 장을 다른 후보로 바꿔 덮은 조건 조합이 늘면 교체 (시간 제한 안에서 반복)"""
+    chosen = list(chosen)
+    if not chosen:
+        return chosen, 0
+    counts = problem.covers(slice(None), chosen).sum(axis=1)
+    deadline = time.perf_counter() + time_budget
+    swaps = 0
+    stale = 0
+    while time.perf_counter() < deadline and stale < len(chosen) and (counts == 0).any():
+        position = int(rng.integers(len(chosen)))
+        current = chosen[position]
+        covered_by_current = problem.covers(slice(None), [current])[:, 0]
+        lost = covered_by_current & (counts == 1)
+        region = np.flatnonzero((counts == 0) | lost)
+        gains = problem.gains(region)
+        gains[chosen] = -1
+        best = int(gains.argmax())
+        if gains[best] - int(lost.sum()) > 0:
+            counts -= covered_by_current
+            counts += problem.covers(slice(None), [best])[:, 0]
+            chosen[position] = best
+            swaps += 1
+            stale = 0
+        else:
+            stale += 1
+    return chosen, swaps
+
+
+def hit_probability(ticket_masks, match, draws=200_000, rng=None):
+    """무작위 추첨에서 번호 중 하나라도 match 개 이상 맞을 확률 (몬테카를로 추정)"""
+    rng = rng if rng is not None else np.random.default_rng(0)
+    if not len(ticket_masks):
+        return 0.0
+    ticket_bits = mask_bits(ticket_masks, 45)
+    hits = 0
+    step = max(1, BLOCK_PAIRS // len(ticket_bits))
+    for start in range(0, draws, step):
+        count = min(step, draws - start)
+        draw_bits = mask_bits(combo_masks(np.argsort(rng.random((count, 45)), axis=1)[:, :6] + 1), 45)
+        hits += int(((draw_bits @ ticket_bits.T) >= match).any(axis=1).sum())
+    return hits / draws
+
+
+def build_wheel(pool, tickets, match=3, guarantee=None, exclude_ranks=None, seed=None,
+                time_budget=2.0, max_pairs=WHEEL_MAX_PAIRS, max_targets=WHEEL_MAX_TARGETS):
+    """번호 풀에서 tickets 장의 휠(커버링 디자인) 생성
+
+    guarantee 개의 당첨번호가 풀 안에 있을 때 적어도 한 장이 match 개 이상 맞도록
+    (풀 안의 모든 guarantee 개 조합을 덮도록) 욕심쟁이 선택 + 교체 탐색으로 번호를
+    고릅니다. exclude_ranks(역대 1등 조합의 colex 순위)에 있는 조합은 쓰지 않습니다.
+
+    반환: {'tickets', 'coverage', 'covered', 'targets', 'targets_sampled', ...}
+    """
+    pool = sorted(set(int(n) for n in pool))
+    guarantee = guarantee or match
+    n = len(pool)
+    if n < 6 or any(not 1 <= number <= 45 for number in pool):
+        raise ValueError("번호 풀은 1~45 사이의 서로 다른 번호 6개 이상이어야 합니다.")
+    if not 1 <= match <= 6 or not match <= guarantee <= 6:
+        raise ValueError("맞출 개수(match)는 1~6, 조건 개수(guarantee)는 match~6 사이여야 합니다.")
+    if tickets < 1:
+        raise ValueError("번호는 1장 이상이어야 합니다.")
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    pool_numbers = np.array([0] + pool, dtype=np.int64)  # 풀 위치(1..n) -> 실제 번호
+
+    targets, targets_sampled = subsets(n, min(guarantee, n), max_targets, rng)
+    candidate_limit = max(WHEEL_MIN_CANDIDATES, max_pairs // max(1, len(targets)))
+    candidates, candidates_sampled = subsets(n, 6, candidate_limit, rng)
+    excluded = 0
+    if exclude_ranks is not None and len(exclude_ranks):
+        keep = ~np.isin(combo_ranks(pool_numbers[candidates]), exclude_ranks)
+        excluded = int((~keep).sum())
+        candidates = candidates[keep]
+    if not len(candidates):
+        raise ValueError("역대 1등 조합을 빼면 만들 수 있는 번호가 없습니다.")
+
+    problem = CoverageProblem(combo_masks(targets), combo_masks(candidates), n, match)
+    chosen = greedy_cover(problem, tickets)
+    greedy_covered = int(problem.covers(slice(None), chosen).any(axis=1).sum())
+    chosen, swaps = local_search(problem, chosen, rng, max(0.0, time_budget - (time.perf_counter() - started)))
+    covered = int(problem.covers(slice(None), chosen).any(axis=1).sum())
+
+    wheel = np.sort(pool_numbers[candidates[chosen]], axis=1)
+    return {
+        'tickets': wheel.tolist(),
+        'pool': pool,
+        'match': match,
+        'guarantee': guarantee,
+        'targets': len(targets),
+        'targets_total': comb(n, min(guarantee, n)),
+        'targets_sampled': targets_sampled,
+        'candidates': len(candidates),
+        'candidates_sampled': candidates_sampled,
+        'excluded_winners': excluded,
+        'covered': covered,
+        'coverage': round(covered / len(targets), 6),
+        'greedy_coverage': round(greedy_covered / len(targets), 6),
+        'swaps': swaps,
+        'hit_probability': hit_probability(combo_masks(wheel), match, rng=np.random.default_rng(seed)),
+        'elapsed_seconds': round(time.perf_counter() - started, 3)
+    }